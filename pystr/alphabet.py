@@ -12,6 +12,8 @@ class Alphabet:
 
     _map: dict[str, int]
     _revmap: dict[int, str]
+    _table: bytes
+    _known: bytes
 
     def __init__(self, reference: str) -> None:
         """
@@ -38,6 +40,15 @@ class Alphabet:
         assert len(self._map) <= 256, \
             "Cannot handle alphabets we cannot fit into bytes"  # noqal: E501
 
+        # Tables for mapping bytes in bulk with bytes.translate
+        table = bytearray(256)
+        known = bytearray()
+        for a, i in self._map.items():
+            if ord(a) < 256:
+                table[ord(a)] = i
+                known.append(ord(a))
+        self._table, self._known = bytes(table), bytes(known)
+
     def __len__(self) -> int:
         """Return the number of letters in the alphabet."""
         return len(self._map)
@@ -51,6 +62,21 @@ class Alphabet:
         """
         return bytearray(self._map[a] for a in x)
 
+    def map_bytes(self, x: bytes | bytearray) -> bytearray:
+        """
+        Map the bytes in x to their corresponding letters in the alphabet.
+
+        Each byte is the character with that code point, so for ASCII
+        data map_bytes(x) is map(x.decode()), but the whole of x is
+        mapped in one go with bytes.translate, which is much faster for
+        long sequences. If x contains a byte not in the alphabet,
+        map_bytes raises a KeyError.
+        """
+        unknown = x.translate(None, self._known)
+        if unknown:
+            raise KeyError(chr(unknown[0]))
+        return bytearray(x.translate(self._table))
+
     def map_with_sentinel(self, x: typing.Iterable[str]) -> bytearray:
         """
         Map x to the bytes in the alphabet.
@@ -2,6 +2,7 @@
 
 import enum
 import re
+import typing
 
 
 class Edit(enum.Enum):
@@ -12,6 +13,13 @@ class Edit(enum.Enum):
     DELETE = enum.auto()
 
 
+class EditModel(enum.Enum):
+    """Which edit operations an approximative search can use."""
+
+    HAMMING = enum.auto()      # Only mismatches
+    LEVENSHTEIN = enum.auto()  # Mismatches, insertions and deletions
+
+
 EDIT_TO_CIGAR_MAP = {
     Edit.MATCH: "M",
     Edit.INSERT: "I",
@@ -73,3 +81,158 @@ def extract_alignment(x: str, p: str, pos: int, cigar: str) -> tuple[str, str]:
 def count_edits(alignment: tuple[str, str]) -> int:
     """Count how many edits we see in an alignment."""
     return sum(a != b for a, b in zip(*alignment))
+
+
+# SECTION Verifying candidate hits
+
+T = typing.TypeVar('T')
+H = typing.TypeVar('H', bound=typing.Hashable)
+
+
+def banded_table(x: typing.Sequence[T], p: typing.Sequence[T],
+                 diag: int, k: int) -> list[list[int]]:
+    """
+    Fill in the dynamic programming table for banded alignment.
+
+    tbl[j][d] is the smallest number of edits needed to align p[j:]
+    against x[i:e] for some end e, where i = j + diag - k + d is on
+    diagonal diag - k + d. We only fill in the 2k + 1 diagonals around
+    diag. Alignments don't start or end with a deletion, and cells we
+    can't reach have cost len(p) + k + 1, more than we will ever accept.
+    """
+    m, lo = len(p), diag - k
+    inf = m + k + 1
+    width = 2 * k + 1
+    tbl = [[inf] * width for _ in range(m + 1)]
+
+    for d in range(width):
+        if 0 <= m + lo + d <= len(x):
+            tbl[m][d] = 0  # free end
+
+    for j in reversed(range(m)):
+        row, next_row = tbl[j], tbl[j + 1]
+        # Go right to left so the deletion cell is ready
+        for d in reversed(range(width)):
+            i = j + lo + d
+            if not 0 <= i <= len(x):
+                continue
+            best = inf
+            if i < len(x):
+                best = next_row[d] + (x[i] != p[j])       # match
+            if d > 0:
+                best = min(best, next_row[d - 1] + 1)     # insertion
+            if j > 0 and i < len(x) and d + 1 < width:
+                best = min(best, row[d + 1] + 1)          # deletion
+            row[d] = best
+
+    return tbl
+
+
+def banded_traceback(x: typing.Sequence[T], p: typing.Sequence[T],
+                     tbl: list[list[int]], diag: int, k: int,
+                     start: int) -> str:
+    """Get the cigar for the best alignment starting at start."""
+    lo, width = diag - k, 2 * k + 1
+    edits: list[Edit] = []
+    j, d = 0, start - lo
+    while j < len(p):
+        i, cost = j + lo + d, tbl[j][d]
+        if i < len(x) and tbl[j + 1][d] + (x[i] != p[j]) == cost:
+            edits.append(Edit.MATCH)
+            j += 1
+        elif d > 0 and tbl[j + 1][d - 1] + 1 == cost:
+            edits.append(Edit.INSERT)
+            j, d = j + 1, d - 1
+        else:
+            assert j > 0 and d + 1 < width and tbl[j][d + 1] + 1 == cost
+            edits.append(Edit.DELETE)
+            d += 1
+    return edits_to_cigar(edits)
+
+
+def banded_alignments(x: typing.Sequence[T], p: typing.Sequence[T],
+                      diag: int, k: int) \
+        -> typing.Iterator[tuple[int, str, int]]:
+    """
+    Align p against x in a band of 2k + 1 diagonals around diag.
+
+    For each start position in x[diag - k:diag + k + 1] where all of p
+    aligns with at most k edits, report the position, the cigar of the
+    best alignment from there, and the number of edits. This is meant
+    for verifying seed hits; if p[j] is seeded at x[i] then diag is
+    i - j, and all alignments through the seed with at most k edits
+    stay within the band. It runs in O(k m) time and space.
+    """
+    tbl = banded_table(x, p, diag, k)
+    lo = diag - k
+    for d, cost in enumerate(tbl[0]):
+        if cost <= k:
+            yield lo + d, banded_traceback(x, p, tbl, diag, k, lo + d), cost
+
+
+def banded_align(x: typing.Sequence[T], p: typing.Sequence[T],
+                 diag: int, k: int) \
+        -> typing.Optional[tuple[int, str, int]]:
+    """
+    Find the best alignment of p in a band around diag in x.
+
+    Returns the (position, cigar, edits) of the alignment with the
+    fewest edits (leftmost on ties), or None if there is none with at
+    most k edits.
+    """
+    best = None
+    for hit in banded_alignments(x, p, diag, k):
+        if best is None or hit[2] < best[2]:
+            best = hit
+    return best
+
+
+def myers_scores(x: typing.Sequence[H], p: typing.Sequence[H]) \
+        -> typing.Iterator[int]:
+    """
+    Compute the edit distance from p to substrings of x.
+
+    For each index i in x, report the smallest edit distance between p
+    and a substring of x ending at index i. This is Myers' bit-vector
+    algorithm; a column of the dynamic programming table is held in
+    the bits of a few integers, so each character in x costs a
+    constant number of (big) integer operations.
+    """
+    m = len(p)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1) if m else 0
+
+    peq: dict[H, int] = {}
+    for j, a in enumerate(p):
+        peq[a] = peq.get(a, 0) | (1 << j)
+
+    pv, mv, score = mask, 0, m
+    for a in x:
+        eq = peq.get(a, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # We don't shift a one into ph, since a hit can
+        # start anywhere in x
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        yield score
+
+
+def myers_distance(x: typing.Sequence[H], p: typing.Sequence[H]) -> int:
+    """
+    Get the smallest edit distance between p and any substring of x.
+
+    Use this to quickly reject a candidate region x before aligning in
+    it; if the distance is more than k there is no hit with k edits.
+    """
+    return min(myers_scores(x, p), default=len(p))
+
+# !SECTION
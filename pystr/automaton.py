@@ -0,0 +1,227 @@
+"""
+Flat representation of Aho-Corasick automata.
+
+The trie, suffix links and out-lists are packed into int32 arrays
+in a single buffer. The buffer can be written to a file and memory
+mapped back in, and the search runs directly on the mapped arrays,
+so we never have to rebuild the Python node objects.
+
+The layout is a header followed by the arrays:
+
+    magic (8 bytes), byte order (1 byte), padding (3 bytes),
+    number of nodes n (uint32), number of edges e (uint32)
+    label[n], depth[n], suffix_link[n], out_list[n],
+    edge_start[n + 1], edge_char[e], edge_child[e]
+
+Nodes are numbered in breadth-first order with the root as node 0,
+and the out-edges of node v are edge_start[v]:edge_start[v + 1] in the
+edge arrays, sorted by character (code point) so we can binary search
+them. Missing labels, suffix links and out-lists are NO_NODE. The
+arrays are stored in the native byte order of the machine that wrote
+them, which is recorded in the header.
+"""
+
+from __future__ import annotations
+
+import array
+import bisect
+import collections
+import mmap
+import struct
+import sys
+import types
+import typing
+
+from .trie import Trie, TrieNode, depth_first_trie
+
+MAGIC = b"PYSTRAC\x01"
+HEADER = struct.Struct("<8sB3xII")
+BYTE_ORDERS = {"little": 0, "big": 1}
+NO_NODE = -1
+
+
+def number_nodes(trie: Trie) -> list[TrieNode]:
+    """List the nodes in trie in breadth-first order."""
+    nodes = [trie.root]
+    queue = collections.deque[TrieNode]([trie.root])
+    while queue:
+        n = queue.popleft()
+        for a in sorted(n.children):
+            nodes.append(n[a])
+            queue.append(n[a])
+    return nodes
+
+
+def flatten_trie(trie: Trie) -> bytes:
+    """Pack a trie, with suffix links and out-lists, into a flat buffer."""
+    nodes = number_nodes(trie)
+    index = {id(n): i for i, n in enumerate(nodes)}
+
+    def idx(n: typing.Optional[TrieNode]) -> int:
+        return NO_NODE if n is None else index[id(n)]
+
+    label = array.array('i', [NO_NODE]) * len(nodes)
+    depth = array.array('i', [0]) * len(nodes)
+    suffix_link = array.array('i', [NO_NODE]) * len(nodes)
+    out_list = array.array('i', [NO_NODE]) * len(nodes)
+    edge_start = array.array('i', [0]) * (len(nodes) + 1)
+    edge_char = array.array('i')
+    edge_child = array.array('i')
+
+    for i, n in enumerate(nodes):
+        if n.label is not None:
+            label[i] = n.label
+        if not n.is_root:
+            assert n.suffix_link is not None, \
+                "The trie must have suffix links (use depth_first_trie)"
+        suffix_link[i] = idx(n.suffix_link)
+        out_list[i] = idx(n.out_list)
+        for a in sorted(n.children):
+            child = index[id(n[a])]
+            depth[child] = depth[i] + 1
+            edge_char.append(ord(a))
+            edge_child.append(child)
+        edge_start[i + 1] = len(edge_char)
+
+    header = HEADER.pack(MAGIC, BYTE_ORDERS[sys.byteorder],
+                         len(nodes), len(edge_char))
+    return header + b''.join(
+        arr.tobytes() for arr in (label, depth, suffix_link, out_list,
+                                  edge_start, edge_char, edge_child)
+    )
+
+
+class FlatAutomaton:
+    """An Aho-Corasick automaton over flat int32 arrays."""
+
+    label: memoryview
+    depth: memoryview
+    suffix_link: memoryview
+    out_list: memoryview
+    edge_start: memoryview
+    edge_char: memoryview
+    edge_child: memoryview
+
+    _views: list[memoryview]
+    _mmap: typing.Optional[mmap.mmap]
+
+    def __init__(self, buffer: bytes | mmap.mmap,
+                 mapped: typing.Optional[mmap.mmap] = None) -> None:
+        """
+        Wrap a buffer in the flat format.
+
+        If the buffer is a memory mapped file, pass it as mapped as well
+        and the automaton will close it in close().
+        """
+        magic, order, nnodes, nedges = HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Not a flat Aho-Corasick automaton")
+        if order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError("Automaton was written with another byte order")
+
+        raw = memoryview(buffer)
+        self._views = [raw]
+        self._mmap = mapped
+
+        offset = HEADER.size
+
+        def take(k: int) -> memoryview:
+            nonlocal offset
+            view = raw[offset:offset + 4 * k].cast('i')
+            self._views.append(view)
+            offset += 4 * k
+            return view
+
+        self.label = take(nnodes)
+        self.depth = take(nnodes)
+        self.suffix_link = take(nnodes)
+        self.out_list = take(nnodes)
+        self.edge_start = take(nnodes + 1)
+        self.edge_char = take(nedges)
+        self.edge_child = take(nedges)
+
+    @staticmethod
+    def from_trie(trie: Trie) -> FlatAutomaton:
+        """Build a flat automaton from a trie with suffix links."""
+        return FlatAutomaton(flatten_trie(trie))
+
+    @staticmethod
+    def from_patterns(*p: str) -> FlatAutomaton:
+        """Build a flat automaton for the patterns p."""
+        return FlatAutomaton.from_trie(depth_first_trie(*p))
+
+    @staticmethod
+    def load(path: str) -> FlatAutomaton:
+        """Memory map a flat automaton from a file."""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return FlatAutomaton(mapped, mapped)
+
+    def dump(self, path: str) -> None:
+        """Write the automaton to a file."""
+        with open(path, 'wb') as f:
+            f.write(self._views[0])
+
+    def close(self) -> None:
+        """Release the buffer, closing the mapped file if there is one."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self) -> FlatAutomaton:
+        """Use the automaton as a context manager."""
+        return self
+
+    def __exit__(self,
+                 exc_type: typing.Optional[type[BaseException]],
+                 exc: typing.Optional[BaseException],
+                 traceback: typing.Optional[types.TracebackType]) -> None:
+        """Close the automaton when leaving the context."""
+        self.close()
+
+    def __len__(self) -> int:
+        """Get the number of nodes in the automaton."""
+        return len(self.label)
+
+    def child(self, n: int, a: int) -> int:
+        """Get the child of node n along the edge a, or NO_NODE."""
+        lo, hi = self.edge_start[n], self.edge_start[n + 1]
+        i = bisect.bisect_left(self.edge_char, a, lo, hi)
+        if i < hi and self.edge_char[i] == a:
+            return int(self.edge_child[i])
+        return NO_NODE
+
+    def find_out(self, n: int, a: int) -> int:
+        """Find the node we get to with an a move (see aho_corasick)."""
+        while True:
+            child = self.child(n, a)
+            if child != NO_NODE:
+                return child
+            if n == 0:
+                # The root, and in here we cannot extend.
+                return n
+            n = self.suffix_link[n]
+
+    def occurrences(self, n: int) -> typing.Iterator[tuple[int, int]]:
+        """Iterate over (label, length) for the hits in n's out-list."""
+        if self.label[n] != NO_NODE:
+            yield self.label[n], self.depth[n]
+
+        olist = self.out_list[n]
+        while olist != NO_NODE:
+            yield self.label[olist], self.depth[olist]
+            olist = self.out_list[olist]
+
+    def search(self, x: str) -> typing.Iterator[tuple[int, int]]:
+        """Exact pattern matching, reporting (label, position) pairs."""
+        n = 0
+        if self.label[n] != NO_NODE:
+            yield (self.label[n], 0)
+
+        for i, a in enumerate(x):
+            n = self.find_out(n, ord(a))
+            for label, length in self.occurrences(n):
+                yield (label, i - length + 1)
@@ -0,0 +1,293 @@
+"""
+Bidirectional BWT search.
+
+With the O-tables for both x and the reverse of x we can keep a pair
+of synchronised intervals, one in each suffix array, for the string
+we have matched so far, and extend it to the left or to the right.
+
+Approximate search can then use search schemes: split the pattern
+into parts, and run a set of searches that each start in some part
+and extend in both directions, with lower and upper bounds on the
+number of edits after each part. Each search only allows the errors
+that the others don't cover, so we can start with the parts where
+we allow no errors, and prune the search tree much earlier than the
+right-to-left search in bwt.approx_searcher_from_tables.
+
+    - https://arxiv.org/abs/1303.3520 (Kucherov, Salikhov and Tsur)
+"""
+
+import enum
+import typing
+
+from .alphabet import Alphabet
+from .approx import Edit, edits_to_cigar
+from .bwt import ApproxSearchFunc, CTable, RankTable, preprocess_approx
+
+# An interval [fwd, fwd + size) in the suffix array of x together
+# with the interval [rev, rev + size) in the suffix array of the
+# reversed x, for the reversed string.
+BiInterval = typing.NamedTuple(  # noqa: C0103 (type alias)
+    "BiInterval",
+    [("fwd", int), ("rev", int), ("size", int)]
+)
+
+# A search scheme: the order we search the parts in, and the lower
+# and upper bounds on the total edits after each part in that order.
+SearchScheme = typing.NamedTuple(  # noqa: C0103 (type alias)
+    "SearchScheme",
+    [("order", tuple[int, ...]),
+     ("lower", tuple[int, ...]),
+     ("upper", tuple[int, ...])]
+)
+
+
+class Direction(enum.Enum):
+    """Directions we can extend a bidirectional interval in."""
+
+    LEFT = enum.auto()
+    RIGHT = enum.auto()
+
+
+class BidirectionalIndex:
+    """A bidirectional FM-index."""
+
+    alpha: Alphabet
+    sa: list[int]
+    ctab: CTable
+    otab: RankTable
+    rotab: RankTable
+
+    def __init__(self, alpha: Alphabet, sa: list[int],
+                 ctab: CTable, otab: RankTable, rotab: RankTable) -> None:
+        """Create the index from preprocessed tables (preprocess_approx)."""
+        self.alpha = alpha
+        self.sa = sa
+        self.ctab = ctab
+        self.otab = otab
+        self.rotab = rotab
+
+    def full(self) -> BiInterval:
+        """Get the interval for the empty string."""
+        return BiInterval(0, 0, len(self.sa))
+
+    def extend(self, iv: BiInterval, direction: Direction) \
+            -> list[tuple[int, BiInterval]]:
+        """
+        Extend the interval with each letter in the given direction.
+
+        Returns the (letter, interval) pairs for the letters that give
+        non-empty intervals, in alphabetical order.
+        """
+        # We do backwards search in the table for the direction
+        # we extend in, and work out where the other interval moves
+        # from how many letters in this interval are smaller than a.
+        if direction == Direction.LEFT:
+            otab, start, other = self.otab, iv.fwd, iv.rev
+        else:
+            otab, start, other = self.rotab, iv.rev, iv.fwd
+
+        ranks = [(otab[a, start], otab[a, start + iv.size])
+                 for a in range(1, len(self.alpha))]
+        # The sentinel is smaller than all the letters
+        smaller = iv.size - sum(hi - lo for lo, hi in ranks)
+
+        res: list[tuple[int, BiInterval]] = []
+        for a, (lo, hi) in enumerate(ranks, start=1):
+            if hi > lo:
+                if direction == Direction.LEFT:
+                    next_iv = BiInterval(self.ctab[a] + lo, other + smaller,
+                                         hi - lo)
+                else:
+                    next_iv = BiInterval(other + smaller, self.ctab[a] + lo,
+                                         hi - lo)
+                res.append((a, next_iv))
+            smaller += hi - lo
+        return res
+
+    def extend_left(self, iv: BiInterval, a: int) -> BiInterval:
+        """Get the interval for a + w from the interval for w."""
+        for b, next_iv in self.extend(iv, Direction.LEFT):
+            if a == b:
+                return next_iv
+        return BiInterval(0, 0, 0)
+
+    def extend_right(self, iv: BiInterval, a: int) -> BiInterval:
+        """Get the interval for w + a from the interval for w."""
+        for b, next_iv in self.extend(iv, Direction.RIGHT):
+            if a == b:
+                return next_iv
+        return BiInterval(0, 0, 0)
+
+    def locate(self, iv: BiInterval) -> typing.Iterator[int]:
+        """Get the positions in x for an interval."""
+        for i in range(iv.fwd, iv.fwd + iv.size):
+            yield self.sa[i]
+
+
+# Optimal schemes from Kucherov, Salikhov and Tsur for one and two
+# edits. The first search in each scheme only allows edits after the
+# first part.
+KUCHEROV_SCHEMES = {
+    1: [SearchScheme((0, 1), (0, 0), (0, 1)),
+        SearchScheme((1, 0), (0, 0), (0, 1))],
+    2: [SearchScheme((0, 1, 2), (0, 0, 0), (0, 2, 2)),
+        SearchScheme((2, 1, 0), (0, 0, 0), (0, 1, 2)),
+        SearchScheme((1, 0, 2), (0, 0, 1), (0, 1, 2))],
+}
+
+
+def pigeonhole_schemes(edits: int) -> list[SearchScheme]:
+    """
+    Build the pigeonhole search schemes for a number of edits.
+
+    With edits + 1 parts one of them must match exactly. Search i
+    starts with part i, with no edits, then extends to the right and
+    then to the left, allowing all the edits.
+    """
+    parts = edits + 1
+    return [
+        SearchScheme(
+            tuple(range(i, parts)) + tuple(reversed(range(i))),
+            (0,) * parts,
+            (0,) + (edits,) * edits
+        )
+        for i in range(parts)
+    ]
+
+
+def search_schemes(edits: int) -> list[SearchScheme]:
+    """Get search schemes for a number of edits."""
+    if edits == 0:
+        return [SearchScheme((0,), (0,), (0,))]
+    return KUCHEROV_SCHEMES.get(edits) or pigeonhole_schemes(edits)
+
+
+def scheme_plan(m: int, scheme: SearchScheme) \
+        -> list[tuple[int, Direction, int]]:
+    """
+    Work out the order we process the pattern in for a scheme.
+
+    The pattern has length m. Returns a list of (index in pattern,
+    direction, index in scheme order) in the order we process them.
+    """
+    parts = len(scheme.order)
+    bounds = [m * i // parts for i in range(parts + 1)]
+    plan: list[tuple[int, Direction, int]] = []
+    first = scheme.order[0]
+    for t, part in enumerate(scheme.order):
+        start, end = bounds[part], bounds[part + 1]
+        if part >= first:
+            plan.extend((j, Direction.RIGHT, t) for j in range(start, end))
+        else:
+            plan.extend((j, Direction.LEFT, t)
+                        for j in reversed(range(start, end)))
+    return plan
+
+
+def scheme_search(index: BidirectionalIndex, p: bytearray,
+                  scheme: SearchScheme) \
+        -> typing.Iterator[tuple[int, str]]:
+    """
+    Run one search from a search scheme.
+
+    Reports (position, cigar) pairs. The same hit can be reported more
+    than once, both in one search and across the searches of a scheme.
+    """
+    plan = scheme_plan(len(p), scheme)
+    # The edits we do to the left (reversed) and to the right
+    left_ops: list[Edit] = []
+    right_ops: list[Edit] = []
+
+    def done(iv: BiInterval) -> typing.Iterator[tuple[int, str]]:
+        cigar = edits_to_cigar(left_ops[::-1] + right_ops)
+        for pos in index.locate(iv):
+            yield pos, cigar
+
+    def advance(step: int, iv: BiInterval, edits: int) \
+            -> typing.Iterator[tuple[int, str]]:
+        # Check the lower bound when we are done with a part
+        t = plan[step][2]
+        if step + 1 == len(plan) or plan[step + 1][2] != t:
+            if edits < scheme.lower[t]:
+                return
+        if step + 1 == len(plan):
+            yield from done(iv)
+        else:
+            yield from rec(step + 1, iv, edits)
+
+    def rec(step: int, iv: BiInterval, edits: int) \
+            -> typing.Iterator[tuple[int, str]]:
+        j, direction, t = plan[step]
+        upper = scheme.upper[t]
+        ops = right_ops if direction == Direction.RIGHT else left_ops
+        children = index.extend(iv, direction)
+
+        # Match/mismatch
+        for a, child in children:
+            next_edits = edits + (a != p[j])
+            if next_edits <= upper:
+                ops.append(Edit.MATCH)
+                yield from advance(step, child, next_edits)
+                ops.pop()
+
+        if edits + 1 > upper:
+            return
+
+        # Insertion
+        ops.append(Edit.INSERT)
+        yield from advance(step, iv, edits + 1)
+        ops.pop()
+
+        # Deletion, but not before the first or after the last
+        # character in the pattern.
+        if (direction == Direction.RIGHT and j == 0) or \
+                (direction == Direction.LEFT and j == len(p) - 1):
+            return
+        ops.append(Edit.DELETE)
+        for _, child in children:
+            yield from rec(step, child, edits + 1)
+        ops.pop()
+
+    yield from rec(0, index.full(), 0)
+
+
+def bidirectional_searcher_from_tables(
+        alpha: Alphabet,
+        sa: list[int],
+        ctab: CTable,
+        otab: RankTable,
+        rotab: RankTable) -> ApproxSearchFunc:
+    """
+    Build an approximative search function using search schemes.
+
+    It reports the same (position, cigar) pairs as
+    bwt.approx_searcher_from_tables, but not in the same order.
+    """
+    index = BidirectionalIndex(alpha, sa, ctab, otab, rotab)
+
+    def search(p_: str, edits: int) -> typing.Iterator[tuple[int, str]]:
+        assert p_, "We can't do approx search with an empty pattern!"
+        try:
+            p = alpha.map(p_)
+        except KeyError:
+            return  # can't map, so no matches
+
+        schemes = search_schemes(edits)
+        if len(p) < len(schemes[0].order):
+            # Not enough characters for the parts, so
+            # search with a single part instead.
+            schemes = [SearchScheme((0,), (0,), (edits,))]
+
+        seen = set[tuple[int, str]]()
+        for scheme in schemes:
+            for hit in scheme_search(index, p, scheme):
+                if hit not in seen:
+                    seen.add(hit)
+                    yield hit
+
+    return search
+
+
+def bidirectional_preprocess(x: str) -> ApproxSearchFunc:
+    """Build a bidirectional search function for searching in string x."""
+    return bidirectional_searcher_from_tables(*preprocess_approx(x))
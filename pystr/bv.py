@@ -1,18 +1,194 @@
-"""Bit vector implementation."""
+"""
+Bit vector implementation.
 
+Besides getting and setting bits, the vector supports rank and select
+queries. For those we keep a two-level directory over 64-bit words:
+for each superblock of 512 bits the number of ones before it, and
+for each word the number of ones before it in its superblock. Then
+rank is two table lookups and a popcount of part of a word, and
+select is a binary search over the superblocks followed by a scan of
+at most eight words. The words are read straight from the vector's
+bytes, and the counts are in typed arrays, 64 bits per superblock and
+16 per word, so the directory adds 3/8 to the size of the bits.
+
+The directory is built the first time we need it, and thrown away
+when we set a bit, so it is cheap to build a vector bit by bit and
+query it afterwards, but slow to interleave updates and queries.
+
+For bulk operations we treat the whole vector as one Python integer,
+with bit i of the integer being bit i of the vector, so the bitwise
+operators and popcount run over all the bits at C speed. Masks with
+a byte per bit, such as a bytes object or the buffer of a NumPy
+boolean array, are packed into bits and unpacked again with strided
+slices, eight bits at a time.
+"""
+
+from __future__ import annotations
+
+import array
+import bisect
+import sys
 import typing
 
+WORD_BITS = 64
+SUPERBLOCK_WORDS = 8  # 512 bits
+
+
+def select_in_word(w: int, k: int) -> int:
+    """Get the index of the k'th (from zero) set bit in word w."""
+    for _ in range(k):
+        w &= w - 1  # clear the lowest set bit
+    return (w & -w).bit_length() - 1
+
+
+class RankDirectory:
+    """Rank directory over the words of a bit vector."""
+
+    words: memoryview  # the whole words in the vector, not a copy
+    tail: int          # the last, partial, word, or zero
+    superblocks: "array.array[int]"
+    blocks: "array.array[int]"
+
+    def __init__(self, data: bytearray) -> None:
+        """Build the directory for the bits in data."""
+        nbytes = WORD_BITS // 8
+        whole = len(data) // nbytes * nbytes
+        self.words = memoryview(data)[:whole].cast('Q')
+        if sys.byteorder != 'little':
+            # Bit i of the vector must be bit i % 64 of its word
+            swapped = array.array('Q', self.words)
+            swapped.byteswap()
+            self.words = memoryview(swapped)
+        # The tail is also the extra (zero) word, if the vector is
+        # whole words, so rank works at the end of the vector
+        self.tail = int.from_bytes(data[whole:], 'little')
+
+        self.superblocks = array.array('Q')
+        self.blocks = array.array('H', [0]) * self.nwords()
+        total = 0
+        for i in range(self.nwords()):
+            if i % SUPERBLOCK_WORDS == 0:
+                self.superblocks.append(total)
+            self.blocks[i] = total - self.superblocks[-1]
+            total += self.word(i).bit_count()
+
+    def nwords(self) -> int:
+        """Get the number of words, including the tail."""
+        return len(self.words) + 1
+
+    def word(self, w: int) -> int:
+        """Get word number w."""
+        return self.words[w] if w < len(self.words) else self.tail
+
+    def nbytes(self) -> int:
+        """Get the number of bytes the counts take."""
+        return len(self.superblocks) * self.superblocks.itemsize + \
+            len(self.blocks) * self.blocks.itemsize
+
+    def rank1(self, i: int) -> int:
+        """Get the number of ones before index i."""
+        w = i // WORD_BITS
+        mask = (1 << (i % WORD_BITS)) - 1
+        return self.superblocks[w // SUPERBLOCK_WORDS] + self.blocks[w] + \
+            (self.word(w) & mask).bit_count()
+
 
 class BitVector:
     """A bit vector."""
 
     bytes: bytearray
     size: int
+    _rank: typing.Optional[RankDirectory]
 
     def __init__(self, size: int):
         """Create a BitVector that can hold size bits."""
         self.size = size
         self.bytes = bytearray((size + 8 - 1) // 8)
+        self._rank = None
+
+    @classmethod
+    def from_bits(cls, bits: typing.Iterable[bool]) -> BitVector:
+        """Create a BitVector with the bits from an iterable."""
+        data = bytearray()
+        byte = size = 0
+        for b in bits:
+            byte |= bool(b) << (size % 8)
+            size += 1
+            if size % 8 == 0:
+                data.append(byte)
+                byte = 0
+        if size % 8:
+            data.append(byte)
+        bv = cls(0)
+        bv.bytes, bv.size = data, size
+        return bv
+
+    @classmethod
+    def from_mask(cls, mask: typing.Any) -> BitVector:
+        """
+        Create a BitVector from a mask with a byte per bit.
+
+        The mask can be any object with the buffer protocol and
+        single-byte items, e.g. bytes or a NumPy boolean array. Bit i
+        is set if byte i of the mask is not zero.
+        """
+        view = memoryview(mask).cast('B')
+        bv = cls(len(view))
+        bv.set_mask(view)
+        return bv
+
+    @classmethod
+    def _from_int(cls, v: int, size: int) -> BitVector:
+        """Create a BitVector of length size with the bits in v."""
+        bv = cls(size)
+        v &= (1 << size) - 1
+        bv.bytes[:] = v.to_bytes(len(bv.bytes), 'little')
+        return bv
+
+    def _as_int(self) -> int:
+        """Get the bits in the vector as an integer."""
+        return int.from_bytes(self.bytes, 'little')
+
+    def set_mask(self, mask: typing.Any) -> None:
+        """
+        Set the first bits in the vector from a mask with a byte per bit.
+
+        Bit i, for i < len(mask), is set if byte i of the mask is not
+        zero. The remaining bits are left unchanged.
+        """
+        view = memoryview(mask).cast('B')
+        n = len(view)
+        assert n <= self.size, "Mask is longer than the vector"
+        nbytes = (n + 7) // 8
+        # Normalise to 0/1 bytes and pad to whole bytes.
+        ones = bytes(view).translate(bytes([0] + [1] * 255)) + \
+            bytes(8 * nbytes - n)
+        packed = 0
+        for j in range(8):
+            # Byte k of ones[j::8] is bit 8 * k + j
+            packed |= int.from_bytes(ones[j::8], 'little') << j
+        data = bytearray(packed.to_bytes(nbytes, 'little'))
+        if n % 8:
+            # Keep the bits after the mask in the last byte
+            keep = 0xff << (n % 8) & 0xff
+            data[-1] |= self.bytes[nbytes - 1] & keep
+        self._rank = None
+        self.bytes[:nbytes] = data
+
+    def to_mask(self) -> bytearray:
+        """
+        Get the vector as a mask with a zero or one byte per bit.
+
+        Wrap it with numpy.frombuffer(..., dtype=bool) to get a NumPy
+        boolean array.
+        """
+        v, nbytes = self._as_int(), len(self.bytes)
+        low_bits = int.from_bytes(b'\x01' * nbytes, 'little')
+        mask = bytearray(8 * nbytes)
+        for j in range(8):
+            # Byte k of the shifted, masked value is bit 8 * k + j
+            mask[j::8] = ((v >> j) & low_bits).to_bytes(nbytes, 'little')
+        return mask[:self.size]
 
     def __getitem__(self, i: int) -> bool:
         """Get bit number i in the vector."""
@@ -20,6 +196,7 @@ class BitVector:
 
     def __setitem__(self, i: int, v: bool) -> None:
         """Set bit number i in the vector."""
+        self._rank = None
         if v:
             self.bytes[i // 8] = self.bytes[i // 8] | (1 << (i % 8))
         else:
@@ -33,3 +210,124 @@ class BitVector:
         """Iterate through the bits in the vector."""
         for i in range(self.size):
             yield self[i]
+
+    def _directory(self) -> RankDirectory:
+        """Get the rank directory, building it if we don't have it."""
+        if self._rank is None:
+            self._rank = RankDirectory(self.bytes)
+        return self._rank
+
+    def rank1(self, i: int) -> int:
+        """Get the number of ones before index i, i.e., in [0, i)."""
+        assert 0 <= i <= self.size, "Index out of range"
+        return self._directory().rank1(i)
+
+    def rank0(self, i: int) -> int:
+        """Get the number of zeros before index i, i.e., in [0, i)."""
+        return i - self.rank1(i)
+
+    def select1(self, k: int) -> int:
+        """
+        Get the index of the k'th one, counting from zero.
+
+        This is the inverse of rank1, rank1(select1(k)) == k, and
+        raises an IndexError if there are not more than k ones.
+        """
+        d = self._directory()
+        if not 0 <= k < d.rank1(self.size):
+            raise IndexError("Not that many ones in the bit vector")
+        sb = bisect.bisect_right(d.superblocks, k) - 1
+        w = sb * SUPERBLOCK_WORDS
+        k -= d.superblocks[sb]
+        while w + 1 < d.nwords() and \
+                (w + 1) % SUPERBLOCK_WORDS and d.blocks[w + 1] <= k:
+            w += 1
+        return w * WORD_BITS + select_in_word(d.word(w), k - d.blocks[w])
+
+    def select0(self, k: int) -> int:
+        """
+        Get the index of the k'th zero, counting from zero.
+
+        This is the inverse of rank0, rank0(select0(k)) == k, and
+        raises an IndexError if there are not more than k zeros.
+        """
+        d = self._directory()
+        if not 0 <= k < self.size - d.rank1(self.size):
+            raise IndexError("Not that many zeros in the bit vector")
+
+        sb_bits = SUPERBLOCK_WORDS * WORD_BITS
+        lo, hi = 0, len(d.superblocks)
+        while hi - lo > 1:  # last superblock with fewer than k zeros before
+            mid = (lo + hi) // 2
+            if mid * sb_bits - d.superblocks[mid] <= k:
+                lo = mid
+            else:
+                hi = mid
+        w = lo * SUPERBLOCK_WORDS
+        k -= lo * sb_bits - d.superblocks[lo]
+
+        def zeros_before(w: int) -> int:
+            return (w % SUPERBLOCK_WORDS) * WORD_BITS - d.blocks[w]
+
+        while w + 1 < d.nwords() and \
+                (w + 1) % SUPERBLOCK_WORDS and zeros_before(w + 1) <= k:
+            w += 1
+        inverted = ~d.word(w) & ((1 << WORD_BITS) - 1)
+        return w * WORD_BITS + select_in_word(inverted, k - zeros_before(w))
+
+    def _check_size(self, other: BitVector) -> None:
+        """Check that we can combine the vector with other."""
+        assert self.size == other.size, "Bit vectors must have the same size"
+
+    def __and__(self, other: BitVector) -> BitVector:
+        """Get the bitwise and of two vectors of the same size."""
+        self._check_size(other)
+        return BitVector._from_int(self._as_int() & other._as_int(), self.size)
+
+    def __or__(self, other: BitVector) -> BitVector:
+        """Get the bitwise or of two vectors of the same size."""
+        self._check_size(other)
+        return BitVector._from_int(self._as_int() | other._as_int(), self.size)
+
+    def __xor__(self, other: BitVector) -> BitVector:
+        """Get the bitwise xor of two vectors of the same size."""
+        self._check_size(other)
+        return BitVector._from_int(self._as_int() ^ other._as_int(), self.size)
+
+    def __invert__(self) -> BitVector:
+        """Get the vector with all bits flipped."""
+        return BitVector._from_int(~self._as_int(), self.size)
+
+    def __lshift__(self, k: int) -> BitVector:
+        """
+        Shift the bits k positions towards higher indices.
+
+        Bit i of the result is bit i - k of the vector, and bits shifted
+        past the end are lost.
+        """
+        return BitVector._from_int(self._as_int() << k, self.size)
+
+    def __rshift__(self, k: int) -> BitVector:
+        """Shift the bits k positions towards lower indices."""
+        return BitVector._from_int(self._as_int() >> k, self.size)
+
+    def prefix(self, n: int) -> BitVector:
+        """Get a copy of the first n bits."""
+        assert n <= self.size, "Prefix is longer than the vector"
+        return BitVector._from_int(
+            int.from_bytes(self.bytes[:(n + 7) // 8], 'little'), n
+        )
+
+    def count(self) -> int:
+        """Count the set bits."""
+        return self._as_int().bit_count()
+
+    def ones(self) -> typing.Iterator[int]:
+        """Iterate over the indices of the set bits, in increasing order."""
+        nbytes = WORD_BITS // 8
+        for i in range(0, len(self.bytes), nbytes):
+            w = int.from_bytes(self.bytes[i:i + nbytes], 'little')
+            while w:
+                low = w & -w
+                yield 8 * i + low.bit_length() - 1
+                w ^= low
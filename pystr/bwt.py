@@ -1,9 +1,12 @@
 """Implementatin of the Burrows-Wheeler transform and related algorithms."""
 
+import array
+import concurrent.futures
+import itertools
 import typing
 
 from .alphabet import Alphabet
-from .approx import Edit, edits_to_cigar
+from .approx import Edit, EditModel, banded_alignments, edits_to_cigar
 from .sais import sais_alphabet
 from .subseq import SubSeq
 
@@ -18,6 +21,24 @@ ApproxSearchFunc = typing.Callable[
 ]
 
 
+class RankTable(typing.Protocol):
+    """
+    Rank queries over a bwt string.
+
+    For RankTable otab, otab[a,i] is the number of occurrences j < i
+    where bwt[j] == a. OTable is the default; wavelet.WaveletMatrix
+    uses less memory for larger alphabets.
+    """
+
+    def __getitem__(self, idx: tuple[int, int]) -> int:
+        """Get the number of occurrences j < i where bwt[j] == a."""
+        ...  # pragma: no cover
+
+
+# Builds a RankTable from a bwt string and the size of its alphabet
+RankTableFactory = typing.Callable[[bytearray, int], RankTable]
+
+
 def burrows_wheeler_transform_bytes(x: bytearray,
                                     alpha: Alphabet) \
         -> tuple[bytearray, list[int]]:
@@ -49,25 +70,141 @@ def burrows_wheeler_transform(x: str) -> tuple[bytearray, Alphabet, list[int]]:
     return bwt, alpha, sa
 
 
-def reverse_burrows_wheeler_transform(bwt: bytearray) -> bytearray:
+class LFMapping(typing.Protocol):
+    """The LF mapping of a bwt string, lf[i] = C[bwt[i]] + O[bwt[i], i]."""
+
+    def __getitem__(self, i: int) -> int:
+        """Get the row of the suffix one position before row i's."""
+        ...  # pragma: no cover
+
+
+def bucket_starts(bwt: bytes | bytearray,
+                  sentinel_row: typing.Optional[int] = None) -> list[int]:
     """
-    Reverse the Burrows-Wheeler transform.
+    Get the C-table for the bytes in bwt, as a list for all 256 bytes.
 
-    Given a Burrows-Wheeler transformed string, bwt,
-    compute the original string and return it.
+    If sentinel_row is given, the byte in that row is a placeholder
+    for a sentinel that sorts before all the bytes (see lf_array).
     """
-    asize = max(bwt) + 1
-    ctab = CTable(bwt, asize)
-    otab = OTable(bwt, asize)
+    starts, n = [0] * 256, 0
+    counts = [bwt.count(a) for a in range(256)]
+    if sentinel_row is not None:
+        counts[bwt[sentinel_row]] -= 1
+        n = 1
+    for a in range(256):
+        starts[a] = n
+        n += counts[a]
+    return starts
+
+
+def lf_array(bwt: bytes | bytearray,
+             sentinel_row: typing.Optional[int] = None) \
+        -> "array.array[int]":
+    """
+    Compute the LF mapping of a bwt string in a single counting pass.
 
+    Walking through the bwt string, the i'th a goes to the next free
+    row in a's bucket. The result is an array of 32-bit integers, or
+    64-bit integers if the string is too long for that, so it takes
+    4n (or 8n) bytes rather than the asize * n integers in an OTable.
+
+    Usually the sentinel is byte zero, but when all bytes are letters
+    (as in compress) the sentinel is a placeholder in sentinel_row. It
+    sorts before all the bytes, and its own LF value is left at zero.
+    """
+    typecode = 'I' if len(bwt) < 2**32 else 'Q'
+    lf = array.array(typecode, [0]) * len(bwt)
+    nxt = bucket_starts(bwt, sentinel_row)
+    rows: typing.Iterable[tuple[int, int]]
+    if sentinel_row is None:
+        rows = enumerate(bwt)
+    else:
+        view = memoryview(bwt)
+        rows = itertools.chain(enumerate(view[:sentinel_row]),
+                               enumerate(view[sentinel_row + 1:],
+                                         sentinel_row + 1))
+    for i, a in rows:
+        lf[i] = nxt[a]
+        nxt[a] += 1
+    return lf
+
+
+class CheckpointLF:
+    """
+    LF mapping in bounded memory.
+
+    We store the rank of every letter in the bwt string at every
+    block_size'th row, and count the letters from the checkpoint to
+    row i in the bwt string. That takes asize * n / block_size
+    integers instead of n, where asize is the number of different
+    letters in the string.
+    """
+
+    _bwt: bytes | bytearray
+    _block_size: int
+    _starts: list[int]
+    _column: list[int]  # the index of each letter in a checkpoint
+    _checkpoints: list[list[int]]
+
+    def __init__(self, bwt: bytes | bytearray, block_size: int = 1024) -> None:
+        """Build the checkpoints for bwt."""
+        self._bwt, self._block_size = bwt, block_size
+        self._starts = bucket_starts(bwt)
+        letters = sorted(set(bwt))
+        self._column = [0] * 256
+        for k, a in enumerate(letters):
+            self._column[a] = k
+        self._checkpoints = []
+        counts = [0] * len(letters)
+        for start in range(0, len(bwt), block_size):
+            self._checkpoints.append(counts[:])
+            block = bwt[start:start + block_size]
+            for k, a in enumerate(letters):
+                counts[k] += block.count(a)
+
+    def __getitem__(self, i: int) -> int:
+        """Get lf[i]."""
+        a = self._bwt[i]
+        block, start = divmod(i, self._block_size)
+        before = self._bwt.count(a, i - start, i)
+        return self._starts[a] + \
+            self._checkpoints[block][self._column[a]] + before
+
+
+def reverse_bwt_lf(bwt: bytes | bytearray, lf: LFMapping) -> bytearray:
+    """Reverse the Burrows-Wheeler transform, given its LF mapping."""
     i, x = 0, bytearray(len(bwt))
     for j in reversed(range(len(x) - 1)):
-        a = x[j] = bwt[i]
-        i = ctab[a] + otab[a, i]
-
+        x[j] = bwt[i]
+        i = lf[i]
     return x
 
 
+def reverse_bwt_bounded(bwt: bytes | bytearray,
+                        block_size: int = 1024) -> bytearray:
+    """Reverse the Burrows-Wheeler transform with a CheckpointLF."""
+    return reverse_bwt_lf(bwt, CheckpointLF(bwt, block_size))
+
+
+def reverse_bwt_blocks(blocks: typing.Iterable[bytes | bytearray],
+                       processes: typing.Optional[int] = None) \
+        -> list[bytearray]:
+    """
+    Reverse the Burrows-Wheeler transform of independent blocks.
+
+    Each block is a separate bwt string, with its own sentinel. The
+    blocks are reversed in parallel in a pool of processes (as many
+    as the machine has cores if processes is None), or in this
+    process if processes is 1.
+    """
+    if processes == 1:
+        return [reverse_burrows_wheeler_transform(bytearray(b))
+                for b in blocks]
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        return list(pool.map(reverse_burrows_wheeler_transform,
+                             map(bytearray, blocks)))
+
+
 class CTable:
     """
     C-table for other bwt/fm-index search algorithms.
@@ -132,8 +269,11 @@ class OTable:
         # The first column is all zeros, the second
         # should hold a 1 in the row that has character
         # bwt[0]. The we b-1 because of the sentinel and
-        # we use column 0 for the first real column.
-        self._tbl[bwt[0] - 1][0] = 1
+        # we use column 0 for the first real column. The
+        # bwt can start with a sentinel if it has more than
+        # one (see collection), and then we have no 1.
+        if bwt[0]:
+            self._tbl[bwt[0] - 1][0] = 1
 
         # We already have cols 0 and 1. Now we need to
         # go up to (and including) len(bwt).
@@ -154,34 +294,111 @@ class OTable:
         return 0 if i == 0 else self._tbl[a - 1][i - 1]
 
 
-def preprocess_exact(x: str) -> tuple[Alphabet, list[int], CTable, OTable]:
-    """Preprocess tables for exact FM/bwt search."""
+def reverse_burrows_wheeler_transform(
+        bwt: bytearray,
+        otable: typing.Optional[RankTableFactory] = None) -> bytearray:
+    """
+    Reverse the Burrows-Wheeler transform.
+
+    Given a Burrows-Wheeler transformed string, bwt,
+    compute the original string and return it. Reversing
+    only needs the LF mapping, so by default we walk the
+    LF array (see lf_array), which takes 4n bytes. If a
+    rank table factory, otable, is given, we use
+    otable(bwt, asize) and the C-table instead.
+    """
+    if otable is None:
+        return reverse_bwt_lf(bwt, lf_array(bwt))
+
+    asize = max(bwt) + 1
+    ctab = CTable(bwt, asize)
+    otab = otable(bwt, asize)
+
+    i, x = 0, bytearray(len(bwt))
+    for j in reversed(range(len(x) - 1)):
+        a = x[j] = bwt[i]
+        i = ctab[a] + otab[a, i]
+
+    return x
+
+
+def preprocess_exact(x: str, otable: RankTableFactory = OTable) \
+        -> tuple[Alphabet, list[int], CTable, RankTable]:
+    """
+    Preprocess tables for exact FM/bwt search.
+
+    The rank table is built with otable, which can be OTable or
+    any other RankTable implementation, like wavelet.WaveletMatrix.
+    """
     bwt, alpha, sa = burrows_wheeler_transform(x)
     ctab = CTable(bwt, len(alpha))
-    otab = OTable(bwt, len(alpha))
+    otab = otable(bwt, len(alpha))
+    return alpha, sa, ctab, otab
+
+
+def preprocess_exact_mapped(x: bytearray, alpha: Alphabet,
+                            otable: RankTableFactory = OTable) \
+        -> tuple[Alphabet, list[int], CTable, RankTable]:
+    """
+    Preprocess tables for exact FM/bwt search.
+
+    Here x is already mapped to alpha, and doesn't have the sentinel,
+    so we can skip mapping a string, for example when x comes from a
+    sequence file (see seqio).
+    """
+    bwt, sa = burrows_wheeler_transform_bytes(x + b'\x00', alpha)
+    ctab = CTable(bwt, len(alpha))
+    otab = otable(bwt, len(alpha))
     return alpha, sa, ctab, otab
 
 
-def preprocess_rotab(x: str) -> OTable:
+def preprocess_rotab(x: str, otable: RankTableFactory = OTable) -> RankTable:
     """Build reverse O-table for approximate searching."""
     bwt, alpha, _ = burrows_wheeler_transform(x[::-1])
-    rotab = OTable(bwt, len(alpha))
+    rotab = otable(bwt, len(alpha))
     return rotab
 
 
-def preprocess_approx(x: str
-                      ) -> tuple[Alphabet, list[int], CTable, OTable, OTable]:
+def preprocess_approx(x: str, otable: RankTableFactory = OTable) \
+        -> tuple[Alphabet, list[int], CTable, RankTable, RankTable]:
     """Preprocess tables for approximative bwa search."""
-    exact = preprocess_exact(x)
-    rotab = preprocess_rotab(x)
+    exact = preprocess_exact(x, otable)
+    rotab = preprocess_rotab(x, otable)
+    return (*exact, rotab)
+
+
+def preprocess_approx_mapped(x: bytearray, alpha: Alphabet,
+                             otable: RankTableFactory = OTable) \
+        -> tuple[Alphabet, list[int], CTable, RankTable, RankTable]:
+    """Preprocess approximative search tables for x mapped to alpha."""
+    exact = preprocess_exact_mapped(x, alpha, otable)
+    rbwt, _ = burrows_wheeler_transform_bytes(x[::-1] + b'\x00', alpha)
+    rotab = otable(rbwt, len(alpha))
     return (*exact, rotab)
 
 
+def backward_search(p: bytearray, n: int,
+                    ctab: CTable, otab: RankTable) -> tuple[int, int]:
+    """
+    Find the interval of suffixes that start with p.
+
+    The suffix array has length n. If there are no matches, the
+    interval we return is empty.
+    """
+    left, right = 0, n
+    for a in reversed(p):
+        left = ctab[a] + otab[a, left]
+        right = ctab[a] + otab[a, right]
+        if left >= right:
+            return left, left  # no matches
+    return left, right
+
+
 def exact_searcher_from_tables(
         alpha: Alphabet,
-        sa: list[int],
+        sa: typing.Sequence[int],
         ctab: CTable,
-        otab: OTable) -> ExactSearchFunc:
+        otab: RankTable) -> ExactSearchFunc:
     """Build an exact search function from preprocessed tables."""
 
     def search(p_: str) -> typing.Iterator[int]:
@@ -191,12 +408,7 @@ def exact_searcher_from_tables(
             return  # can't map, so no matches
 
         # Find interval of matches...
-        left, right = 0, len(sa)
-        for a in reversed(p):
-            left = ctab[a] + otab[a, left]
-            right = ctab[a] + otab[a, right]
-            if left >= right:
-                return  # no matches
+        left, right = backward_search(p, len(sa), ctab, otab)
 
         # Report the matches
         for i in range(left, right):
@@ -205,16 +417,17 @@ def exact_searcher_from_tables(
     return search
 
 
-def exact_preprocess(x: str) -> ExactSearchFunc:
+def exact_preprocess(x: str,
+                     otable: RankTableFactory = OTable) -> ExactSearchFunc:
     """Build an exact search function for searching in string x."""
-    return exact_searcher_from_tables(*preprocess_exact(x))
+    return exact_searcher_from_tables(*preprocess_exact(x, otable))
 
 
 BwtApproxTables = typing.NamedTuple(  # noqa: C0103 (type alias)
     "BwtApproxTables",
     [("alpha", Alphabet), ("sa", list[int]),
-     ("ctab", CTable), ("otab", OTable),
-     ("rotab", OTable), ("dtab", list[int]),
+     ("ctab", CTable), ("otab", RankTable),
+     ("rotab", RankTable), ("dtab", list[int]),
      ("edit_ops", list[Edit]), ("p", bytearray)]
 )
 
@@ -282,7 +495,7 @@ def rec_search(tbls: BwtApproxTables,
 
 
 def build_dtab(p: bytearray, sa: list[int],
-               ctab: CTable, rotab: OTable) \
+               ctab: CTable, rotab: RankTable) \
         -> list[int]:
     """Build the D table for the approximative search."""
     dtab = [0] * len(p)
@@ -298,13 +511,19 @@ def build_dtab(p: bytearray, sa: list[int],
     return dtab
 
 
-def approx_searcher_from_tables(
+def rec_approx_searcher_from_tables(
         alpha: Alphabet,
         sa: list[int],
         ctab: CTable,
-        otab: OTable,
-        rotab: OTable) -> ApproxSearchFunc:
-    """Build an exact search function from preprocessed tables."""
+        otab: RankTable,
+        rotab: RankTable) -> ApproxSearchFunc:
+    """
+    Build an approximative search function from preprocessed tables.
+
+    This version explores the search tree with recursive generators.
+    It gives the same result as approx_searcher_from_tables, but
+    is slower.
+    """
 
     def search(p_: str, edits: int) -> typing.Iterator[tuple[int, str]]:
         assert p_, "We can't do approx search with an empty pattern!"
@@ -327,6 +546,225 @@ def approx_searcher_from_tables(
     return search
 
 
-def approx_preprocess(x: str) -> ApproxSearchFunc:
+# The edit operations on a path in the search tree, as a linked
+# list with the most recent operation first. We only build the
+# cigar from it when we have a hit.
+EditList = typing.Optional[tuple[Edit, "EditList"]]
+
+# A node in the search tree: the pattern index we are at, the
+# suffix array interval, the edits, mismatches and indels we have
+# left, the operations that got us here and whether we can make a
+# deletion from here.
+SearchFrame = tuple[int, int, int, int, int, int, EditList, bool]
+
+
+def edit_list_cigar(ops: EditList) -> str:
+    """Get the cigar for the operations in an edit list."""
+    # The list has the most recent operation first, and since we
+    # search from the end of the pattern that is the first operation
+    # in the alignment.
+    edits: list[Edit] = []
+    while ops is not None:
+        edit, ops = ops
+        edits.append(edit)
+    return edits_to_cigar(edits)
+
+
+def approx_searcher_from_tables(
+        alpha: Alphabet,
+        sa: list[int],
+        ctab: CTable,
+        otab: RankTable,
+        rotab: RankTable,
+        model: EditModel = EditModel.LEVENSHTEIN,
+        max_mismatches: typing.Optional[int] = None,
+        max_indels: typing.Optional[int] = None) -> ApproxSearchFunc:
+    """
+    Build an approximative search function from preprocessed tables.
+
+    The search tree is explored depth-first with an explicit stack,
+    in the same order as rec_search, so the hits are reported in the
+    same order.
+
+    The search function takes the maximal number of edits. With
+    the Hamming model we only search for mismatches. We can also put
+    separate caps on the number of mismatches and the number of
+    insertions plus deletions (indels); by default only the total
+    number of edits is capped.
+    """
+    # The letters we can extend with (not the sentinel) and their
+    # C-table values, so we only look them up once.
+    letters = [(a, ctab[a]) for a in range(1, len(alpha))]
+    allow_indels = model == EditModel.LEVENSHTEIN
+
+    def search(p_: str, edits: int) -> typing.Iterator[tuple[int, str]]:
+        assert p_, "We can't do approx search with an empty pattern!"
+        try:
+            p = alpha.map(p_)
+        except KeyError:
+            return  # can't map, so no matches
+
+        # The D-table gives us a lower bound on the number of edits we
+        # need for the rest of the pattern. The bound holds for any
+        # mix of edits, but under our model we can only make as many
+        # edits as the mismatches and indels we have left.
+        dtab = build_dtab(p, sa, ctab, rotab)
+        mismatches = edits if max_mismatches is None else max_mismatches
+        indels = 0 if not allow_indels else \
+            edits if max_indels is None else max_indels
+
+        def budget(edits: int, mismatches: int, indels: int) -> int:
+            return min(edits, mismatches + indels)
+
+        # We don't allow deletions from the first node, to avoid
+        # deletions in the beginning (end) of the search
+        stack: list[SearchFrame] = [
+            (len(p) - 1, 0, len(sa), edits, mismatches, indels, None, False)
+        ]
+        while stack:
+            i, left, right, edits_left, mismatches_left, indels_left, \
+                ops, deletions = stack.pop()
+            if i < 0:
+                # We are through the pattern, so we have hits
+                cigar = edit_list_cigar(ops)
+                for j in range(left, right):
+                    yield sa[j], cigar
+                continue
+
+            # The intervals we get by extending with each letter. We
+            # use them for both matches and deletions, so we compute
+            # them once.
+            children = []
+            for a, c in letters:
+                next_left = c + otab[a, left]
+                next_right = c + otab[a, right]
+                if next_left < next_right:
+                    children.append((a, next_left, next_right))
+
+            # We push the children in reverse order of rec_search,
+            # deletions first and matches last, so the matches are
+            # popped first. We only push nodes where the D-table says
+            # we can still get a hit.
+            next_edits, next_indels = edits_left - 1, indels_left - 1
+            if deletions and next_indels >= 0 and \
+                    budget(next_edits, mismatches_left,
+                           next_indels) >= dtab[i]:
+                for a, next_left, next_right in reversed(children):
+                    stack.append((i, next_left, next_right, next_edits,
+                                  mismatches_left, next_indels,
+                                  (Edit.DELETE, ops), True))
+
+            min_edits = dtab[i - 1] if i > 0 else 0
+            if next_indels >= 0 and \
+                    budget(next_edits, mismatches_left,
+                           next_indels) >= min_edits:
+                stack.append((i - 1, left, right, next_edits,
+                              mismatches_left, next_indels,
+                              (Edit.INSERT, ops), True))
+            for a, next_left, next_right in reversed(children):
+                mismatch = a != p[i]
+                match_edits = edits_left - mismatch
+                match_mismatches = mismatches_left - mismatch
+                if match_mismatches >= 0 and \
+                        budget(match_edits, match_mismatches,
+                               indels_left) >= min_edits:
+                    stack.append((i - 1, next_left, next_right,
+                                  match_edits, match_mismatches, indels_left,
+                                  (Edit.MATCH, ops), True))
+
+    return search
+
+
+def approx_preprocess(x: str,
+                      otable: RankTableFactory = OTable) -> ApproxSearchFunc:
     """Build an approximative search function for searching in string x."""
-    return approx_searcher_from_tables(*preprocess_approx(x))
+    return approx_searcher_from_tables(*preprocess_approx(x, otable))
+
+
+def best_hits_searcher(search: ApproxSearchFunc) -> ApproxSearchFunc:
+    """
+    Build a search function that only reports the best hits.
+
+    Searching for p with up to k edits, we search with 0, 1, ..., k
+    edits and stop with the first number of edits that gives us hits,
+    so all the hits have the smallest number of edits possible. Each
+    position is only reported once, with the first cigar we find for it.
+    """
+
+    def best(p: str, edits: int) -> typing.Iterator[tuple[int, str]]:
+        for stratum in range(edits + 1):
+            seen = set[int]()
+            for pos, cigar in search(p, stratum):
+                if pos not in seen:
+                    seen.add(pos)
+                    yield pos, cigar
+            if seen:
+                return
+
+    return best
+
+
+def approx_best_preprocess(x: str) -> ApproxSearchFunc:
+    """Build a best-hits search function for searching in string x."""
+    return best_hits_searcher(approx_preprocess(x))
+
+
+def preprocess_seed(x: str) \
+        -> tuple[bytearray, Alphabet, list[int], CTable, RankTable]:
+    """Preprocess tables for seed-and-extend search."""
+    alpha, sa, ctab, otab = preprocess_exact(x)
+    # We need the text itself (without the sentinel) for the
+    # alignments when we extend the seeds.
+    return alpha.map(x), alpha, sa, ctab, otab
+
+
+def seed_searcher_from_tables(
+        x: bytearray,
+        alpha: Alphabet,
+        sa: list[int],
+        ctab: CTable,
+        otab: RankTable) -> ApproxSearchFunc:
+    """
+    Build a seed-and-extend approximative search function.
+
+    If p matches with at most k edits, then one of k + 1 pieces of p
+    must match exactly (the pigeonhole principle). We find the pieces
+    with backward search and then align p in a band around each hit.
+    The search reports the same positions as the backtracking search,
+    but with only the best cigar for each position.
+    """
+
+    def search(p_: str, edits: int) -> typing.Iterator[tuple[int, str]]:
+        assert p_, "We can't do approx search with an empty pattern!"
+        assert edits < len(p_), "We need a non-empty piece for each edit"
+        try:
+            p = alpha.map(p_)
+        except KeyError:
+            return  # can't map, so no matches
+
+        # Best (edits, cigar) for each position
+        hits: dict[int, tuple[int, str]] = {}
+        seen = set[int]()
+
+        pieces = edits + 1
+        bounds = [len(p) * i // pieces for i in range(pieces + 1)]
+        for start, end in zip(bounds, bounds[1:]):
+            left, right = backward_search(p[start:end], len(sa), ctab, otab)
+            for i in range(left, right):
+                diag = sa[i] - start
+                if diag in seen:
+                    continue  # another piece got us here already
+                seen.add(diag)
+                for pos, cigar, cost in banded_alignments(x, p, diag, edits):
+                    if pos not in hits or cost < hits[pos][0]:
+                        hits[pos] = (cost, cigar)
+
+        for pos in sorted(hits):
+            yield pos, hits[pos][1]
+
+    return search
+
+
+def approx_seed_preprocess(x: str) -> ApproxSearchFunc:
+    """Build a seed-and-extend search function for searching in x."""
+    return seed_searcher_from_tables(*preprocess_seed(x))
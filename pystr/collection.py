@@ -0,0 +1,152 @@
+"""
+Generalized suffix arrays and FM-indices over collections of strings.
+
+We concatenate the documents with a separator after each, and the
+separators are all different and smaller than the letters, so
+suffixes that are equal up to a separator are ordered by document.
+For sorting, we map the string to integers: the sentinel is zero,
+the separator after document i is i + 1, and the letters come after
+them, so we can use SA-IS with a larger alphabet than fits in bytes.
+
+In the bwt string, we collapse all the separators to the sentinel,
+zero, so the bwt fits in bytes over the usual Alphabet. The
+searches never extend with the sentinel, so they never match across
+a separator and we can use the ordinary bwt search functions.
+"""
+
+import array
+import bisect
+import typing
+
+from .alphabet import Alphabet
+from .bv import BitVector
+from .bwt import (CTable, OTable, RankTable, RankTableFactory,
+                  approx_searcher_from_tables, backward_search,
+                  exact_searcher_from_tables)
+from .sais import sais_rec
+from .subseq import MSubSeq, SubSeq
+
+
+def generalized_suffix_array(docs: typing.Sequence[str], alpha: Alphabet) \
+        -> tuple[list[int], list[int]]:
+    """
+    Build the suffix array for a collection of documents.
+
+    Returns the concatenated string, mapped to integers as described
+    above, and its suffix array.
+    """
+    nseps = len(docs)
+    x: list[int] = []
+    for i, doc in enumerate(docs):
+        x.extend(a + nseps for a in alpha.map(doc))
+        x.append(i + 1)
+    x.append(0)
+    sa = [0] * len(x)
+    sais_rec(SubSeq[int](x), MSubSeq[int](sa), len(alpha) + nseps,
+             BitVector(len(x)))
+    return x, sa
+
+
+def generalized_bwt(x: list[int], sa: list[int], nseps: int) -> bytearray:
+    """Get the bwt string with the separators collapsed to the sentinel."""
+    return bytearray(max(0, x[j - 1] - nseps) for j in sa)
+
+
+class DocumentCollection:
+    """An FM-index over a collection of documents."""
+
+    n_docs: int
+    alpha: Alphabet
+    sa: list[int]
+    ctab: CTable
+    otab: RankTable
+    starts: list[int]             # where each document starts
+    doc_array: "array.array[int]"  # the document of each suffix
+
+    _reversed: list[str]
+    _otable: RankTableFactory
+    _rotab: typing.Optional[RankTable]
+
+    def __init__(self, docs: typing.Sequence[str],
+                 otable: RankTableFactory = OTable) -> None:
+        """Build the index for docs, with rank tables from otable."""
+        self.n_docs = len(docs)
+        self.alpha = Alphabet(''.join(docs))
+        x, self.sa = generalized_suffix_array(docs, self.alpha)
+        bwt = generalized_bwt(x, self.sa, len(docs))
+        self.ctab = CTable(bwt, len(self.alpha))
+        self.otab = otable(bwt, len(self.alpha))
+
+        self.starts, n = [], 0
+        for doc in docs:
+            self.starts.append(n)
+            n += len(doc) + 1
+        # With no documents, the only suffix, the sentinel, is in none
+        self.doc_array = array.array(
+            'I', (self.document(j) for j in self.sa) if docs else ()
+        )
+
+        # We only need the reversed collection for approximate search
+        self._reversed = [doc[::-1] for doc in reversed(docs)]
+        self._otable = otable
+        self._rotab = None
+
+    def document(self, pos: int) -> int:
+        """
+        Get the document that position pos in the concatenation is in.
+
+        Raises an IndexError if pos is outside the concatenation, or
+        if there are no documents.
+        """
+        if not 0 <= pos < len(self.sa) or not self.n_docs:
+            raise IndexError("Position not in any document")
+        return min(bisect.bisect_right(self.starts, pos) - 1,
+                   self.n_docs - 1)  # the final sentinel goes in the last
+
+    def locate(self, pos: int) -> tuple[int, int]:
+        """Translate a position in the concatenation to (doc, offset)."""
+        doc = self.document(pos)
+        return doc, pos - self.starts[doc]
+
+    def search(self, p: str) -> typing.Iterator[tuple[int, int]]:
+        """Find the occurrences of p as (doc, offset) pairs."""
+        search = exact_searcher_from_tables(
+            self.alpha, self.sa, self.ctab, self.otab
+        )
+        for pos in search(p):
+            yield self.locate(pos)
+
+    def interval(self, p_: str) -> tuple[int, int]:
+        """Get the suffix array interval of the suffixes starting with p."""
+        try:
+            p = self.alpha.map(p_)
+        except KeyError:
+            return 0, 0  # can't map, so no matches
+        return backward_search(p, len(self.sa), self.ctab, self.otab)
+
+    def documents(self, p: str) -> list[int]:
+        """List the documents that contain p, each once, in order."""
+        left, right = self.interval(p)
+        return sorted(set(self.doc_array[left:right]))
+
+    def count_documents(self, p: str) -> int:
+        """Count the documents that contain p."""
+        return len(self.documents(p))
+
+    def _reverse_otable(self) -> RankTable:
+        """Build the rank table for the reversed collection."""
+        if self._rotab is None:
+            x, sa = generalized_suffix_array(self._reversed, self.alpha)
+            bwt = generalized_bwt(x, sa, self.n_docs)
+            self._rotab = self._otable(bwt, len(self.alpha))
+        return self._rotab
+
+    def approx_search(self, p: str, edits: int) \
+            -> typing.Iterator[tuple[int, int, str]]:
+        """Find approximate occurrences of p as (doc, offset, cigar)."""
+        search = approx_searcher_from_tables(
+            self.alpha, self.sa, self.ctab, self.otab, self._reverse_otable()
+        )
+        for pos, cigar in search(p, edits):
+            doc, offset = self.locate(pos)
+            yield doc, offset, cigar
@@ -0,0 +1,318 @@
+"""
+Block-sorting compression, in the style of bzip2.
+
+The data is split into blocks, and each block goes through
+
+    - the Burrows-Wheeler transform, which puts equal letters together,
+    - move-to-front, which turns runs of equal letters into runs of zeros,
+    - run-length encoding of the zeros, with the RUNA/RUNB symbols,
+    - Huffman coding with a canonical code.
+
+The blocks are independent, so we can compress and decompress them
+in parallel in a pool of processes.
+
+We transform the bytes of a block over an alphabet of 257 letters,
+the 256 byte values shifted up by one and the sentinel as zero, and
+store the bwt string without the sentinel plus the row the sentinel
+was in (the "primary index") so the bwt fits in bytes.
+
+The stream format is MAGIC followed by the blocks, each prefixed with
+its length as a 32-bit integer, and a zero length to end the stream.
+A block is
+
+    original length (uint32), primary index (uint32),
+    the symbols we use (a bit vector of NSYMBOLS bits),
+    their code lengths (a byte each), the Huffman coded symbols
+
+    - https://sourceware.org/bzip2/ (Julian Seward)
+"""
+
+import concurrent.futures
+import heapq
+import io
+import itertools
+import os
+import struct
+import typing
+
+from .bv import BitVector
+from .bwt import lf_array, reverse_bwt_lf
+from .sais import sais_rec
+from .subseq import MSubSeq, SubSeq
+
+MAGIC = b"PYSTRBZ\x01"
+BLOCK_SIZE = 100_000
+BLOCK_LENGTH = struct.Struct("<I")
+BLOCK_HEADER = struct.Struct("<II")
+
+# Symbols after run-length encoding: RUNA and RUNB encode runs of
+# zeros, the move-to-front value v > 0 becomes v + 1, and EOB ends
+# the block.
+RUNA, RUNB = 0, 1
+EOB = 257
+NSYMBOLS = 258
+USED_BYTES = (NSYMBOLS + 7) // 8
+
+
+def block_bwt(data: bytes) -> tuple[bytearray, int]:
+    """
+    Get the bwt of a block of bytes and its primary index.
+
+    The bwt string has the letter before each suffix, except for
+    the suffix that starts at zero, where we leave out the sentinel.
+    """
+    x = [a + 1 for a in data]
+    x.append(0)
+    sa = [0] * len(x)
+    sais_rec(SubSeq[int](x), MSubSeq[int](sa), 257, BitVector(len(x)))
+    primary = sa.index(0)
+    bwt = bytearray(x[j - 1] - 1 for j in sa if j != 0)
+    return bwt, primary
+
+
+def reverse_block_bwt(bwt: bytearray, primary: int) -> bytes:
+    """Reverse block_bwt with the LF mapping (see bwt.lf_array)."""
+    # Put a placeholder back where the sentinel was; reverse_bwt_lf
+    # never reads it.
+    full = bwt[:primary] + b'\x00' + bwt[primary:]
+    lf = lf_array(full, sentinel_row=primary)
+    return bytes(reverse_bwt_lf(full, lf)[:-1])
+
+
+def move_to_front(x: bytes | bytearray) -> bytearray:
+    """Replace each byte with its index in a list of recently seen bytes."""
+    recent = list(range(256))
+    res = bytearray(len(x))
+    for i, a in enumerate(x):
+        j = res[i] = recent.index(a)
+        if j:
+            del recent[j]
+            recent.insert(0, a)
+    return res
+
+
+def reverse_move_to_front(x: bytes | bytearray) -> bytearray:
+    """Reverse move_to_front."""
+    recent = list(range(256))
+    res = bytearray(len(x))
+    for i, j in enumerate(x):
+        a = res[i] = recent[j]
+        if j:
+            del recent[j]
+            recent.insert(0, a)
+    return res
+
+
+def run_length_encode(x: bytes | bytearray) -> list[int]:
+    """
+    Encode runs of zeros in move-to-front output.
+
+    A run of length k is written as k in bijective base two, least
+    significant digit first, with RUNA for one and RUNB for two.
+    Other values v become v + 1, and we end with EOB.
+    """
+    res: list[int] = []
+    for a, group in itertools.groupby(x):
+        if a:
+            res.extend(itertools.repeat(a + 1, sum(1 for _ in group)))
+            continue
+        k = sum(1 for _ in group)
+        while k:
+            k -= 1
+            res.append(RUNB if k & 1 else RUNA)
+            k >>= 1
+    res.append(EOB)
+    return res
+
+
+def run_length_decode(symbols: typing.Iterable[int]) -> bytearray:
+    """Reverse run_length_encode."""
+    res = bytearray()
+    run, weight = 0, 1
+    for s in symbols:
+        if s in (RUNA, RUNB):
+            run += weight << (s == RUNB)
+            weight <<= 1
+            continue
+        res.extend(bytes(run))
+        run, weight = 0, 1
+        if s == EOB:
+            break
+        res.append(s - 1)
+    return res
+
+
+def huffman_code_lengths(freqs: list[int]) -> list[int]:
+    """Get Huffman code lengths for symbols with frequencies freqs."""
+    lengths = [0] * len(freqs)
+    heap = [(f, [s]) for s, f in enumerate(freqs) if f]
+    if len(heap) == 1:
+        lengths[heap[0][1][0]] = 1
+        return lengths
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        f1, s1 = heapq.heappop(heap)
+        f2, s2 = heapq.heappop(heap)
+        for s in itertools.chain(s1, s2):
+            lengths[s] += 1
+        heapq.heappush(heap, (f1 + f2, s1 + s2))
+    return lengths
+
+
+def canonical_codes(lengths: list[int]) -> dict[int, str]:
+    """
+    Get the canonical Huffman code for the code lengths.
+
+    Symbols are sorted by code length and then by symbol, and get
+    consecutive codes, so we only need to store the lengths.
+    """
+    codes: dict[int, str] = {}
+    code, prev = 0, 0
+    for length, s in sorted((length, s) for s, length in enumerate(lengths)
+                            if length):
+        code <<= length - prev
+        codes[s] = format(code, f"0{length}b")
+        code, prev = code + 1, length
+    return codes
+
+
+def huffman_encode(symbols: list[int]) -> tuple[list[int], bytes]:
+    """Huffman encode symbols, returning the code lengths and the bits."""
+    freqs = [0] * NSYMBOLS
+    for s in symbols:
+        freqs[s] += 1
+    lengths = huffman_code_lengths(freqs)
+    codes = canonical_codes(lengths)
+    bits = ''.join(codes[s] for s in symbols)
+    bits += '0' * (-len(bits) % 8)  # pad to whole bytes
+    return lengths, int(bits, 2).to_bytes(len(bits) // 8, 'big')
+
+
+def huffman_decode(lengths: list[int], data: bytes) -> typing.Iterator[int]:
+    """Decode Huffman coded symbols, until the data runs out."""
+    decode = {code: s for s, code in canonical_codes(lengths).items()}
+    bits = format(int.from_bytes(data, 'big'), f"0{8 * len(data)}b")
+    code = ''
+    for bit in bits:
+        code += bit
+        if code in decode:
+            yield decode[code]
+            code = ''
+
+
+def pack_code_lengths(lengths: list[int]) -> bytes:
+    """Pack code lengths as a bit vector of used symbols and their lengths."""
+    used = BitVector.from_bits(length > 0 for length in lengths)
+    return bytes(used.bytes) + bytes(length for length in lengths if length)
+
+
+def unpack_code_lengths(data: bytes) -> tuple[list[int], int]:
+    """Unpack code lengths, returning them and the bytes we used."""
+    used = BitVector(NSYMBOLS)
+    used.bytes[:] = data[:USED_BYTES]
+    lengths = [0] * NSYMBOLS
+    k = USED_BYTES
+    for s in used.ones():
+        lengths[s] = data[k]
+        k += 1
+    return lengths, k
+
+
+def compress_block(data: bytes) -> bytes:
+    """Compress a single block."""
+    bwt, primary = block_bwt(data)
+    symbols = run_length_encode(move_to_front(bwt))
+    lengths, coded = huffman_encode(symbols)
+    return BLOCK_HEADER.pack(len(data), primary) + \
+        pack_code_lengths(lengths) + coded
+
+
+def decompress_block(block: bytes) -> bytes:
+    """Decompress a single block."""
+    n, primary = BLOCK_HEADER.unpack_from(block)
+    lengths, k = unpack_code_lengths(block[BLOCK_HEADER.size:])
+    symbols = huffman_decode(lengths, block[BLOCK_HEADER.size + k:])
+    bwt = reverse_move_to_front(run_length_decode(symbols))
+    data = reverse_block_bwt(bwt, primary)
+    if len(data) != n:
+        raise ValueError("Corrupt block")
+    return data
+
+
+def map_blocks(f: typing.Callable[[bytes], bytes],
+               blocks: typing.Iterable[bytes],
+               processes: typing.Optional[int]) -> typing.Iterator[bytes]:
+    """
+    Apply f to blocks, in parallel, keeping the order of the blocks.
+
+    With processes == 1 we work in this process. Otherwise, we only
+    keep a few blocks per process in flight, so we don't read all of
+    a stream into memory.
+    """
+    if processes == 1:
+        yield from map(f, blocks)
+        return
+    batch = 2 * (processes or os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+        blocks = iter(blocks)
+        while chunk := list(itertools.islice(blocks, batch)):
+            yield from pool.map(f, chunk)
+
+
+def read_blocks(src: typing.BinaryIO,
+                block_size: int) -> typing.Iterator[bytes]:
+    """Read a stream in blocks of block_size bytes."""
+    while block := src.read(block_size):
+        yield block
+
+
+def read_compressed_blocks(src: typing.BinaryIO) -> typing.Iterator[bytes]:
+    """Read the blocks in a compressed stream."""
+    if src.read(len(MAGIC)) != MAGIC:
+        raise ValueError("Not a compressed stream")
+    while True:
+        header = src.read(BLOCK_LENGTH.size)
+        if len(header) != BLOCK_LENGTH.size:
+            raise ValueError("Truncated stream")
+        (length,) = BLOCK_LENGTH.unpack(header)
+        if length == 0:
+            return
+        block = src.read(length)
+        if len(block) != length:
+            raise ValueError("Truncated stream")
+        yield block
+
+
+def compress_stream(src: typing.BinaryIO, dst: typing.BinaryIO,
+                    block_size: int = BLOCK_SIZE,
+                    processes: typing.Optional[int] = None) -> None:
+    """Compress the bytes from src and write them to dst."""
+    dst.write(MAGIC)
+    for block in map_blocks(compress_block, read_blocks(src, block_size),
+                            processes):
+        dst.write(BLOCK_LENGTH.pack(len(block)))
+        dst.write(block)
+    dst.write(BLOCK_LENGTH.pack(0))
+
+
+def decompress_stream(src: typing.BinaryIO, dst: typing.BinaryIO,
+                      processes: typing.Optional[int] = None) -> None:
+    """Decompress the stream in src and write the bytes to dst."""
+    for block in map_blocks(decompress_block, read_compressed_blocks(src),
+                            processes):
+        dst.write(block)
+
+
+def compress(data: bytes, block_size: int = BLOCK_SIZE,
+             processes: typing.Optional[int] = None) -> bytes:
+    """Compress data."""
+    dst = io.BytesIO()
+    compress_stream(io.BytesIO(data), dst, block_size, processes)
+    return dst.getvalue()
+
+
+def decompress(data: bytes, processes: typing.Optional[int] = None) -> bytes:
+    """Decompress data."""
+    dst = io.BytesIO()
+    decompress_stream(io.BytesIO(data), dst, processes)
+    return dst.getvalue()
@@ -0,0 +1,281 @@
+"""
+Suffix array construction by prefix doubling, sorted in parallel.
+
+After round k, the rank of a suffix is the number of suffixes that
+are smaller when we only look at their first 2^k letters, so the
+suffixes with the same rank r form a group that sits in the suffix
+array from index r. We sort the suffixes in each group by the rank
+h = 2^k further on, rank[i + h], and that splits the group into
+groups for prefixes twice as long. A group with a single suffix is
+done, and once they all are, the ranks are the inverse suffix array.
+This takes O(log n) rounds, each sorting the groups left.
+
+As in Larsson and Sadakane's algorithm, the rounds skip the suffixes
+that are done: a run of finished groups in the suffix array is
+replaced by its negated length at its first index, so a round jumps
+over it, and we only put the suffix array back together, from the
+ranks, at the end. When a group is split, its new singletons are left
+for the next round to join to the runs around them.
+
+The rounds parallelise, too. Groups never mix, so if we split the
+suffix array at group boundaries, each range is refined independently
+of the rest. The suffix array and the ranks are in shared memory, and
+a worker builds the sort keys, sorts the groups in its range, and
+writes the new order and the new ranks for its range straight back,
+so all the per-suffix work happens in the workers and only the range
+boundaries go between processes. The workers read the ranks from one
+buffer and write them to another, since a key can look at a rank in
+any range, and we swap the buffers between rounds.
+
+What is left in the parent is serial: sorting the suffixes by their
+first letter and finding the range boundaries. It is a few percent
+of a build, so Amdahl's law allows a large speedup, but starting the
+pool, a task per range and round, and ranges that hold more of the
+long groups than others cost on top of that. tests/doubling_benchmark.py
+measures the serial fraction and the speedup on the machine it runs
+on; on a single core the pool is pure overhead, so use processes=1
+there.
+
+    - https://doi.org/10.1016/j.tcs.2007.07.017 (Larsson and Sadakane)
+"""
+
+import concurrent.futures
+import itertools
+import multiprocessing.sharedctypes
+import os
+import typing
+
+from .alphabet import Alphabet
+
+# Sort key for a suffix in a group, (rank[i], rank[i + h], i)
+RankPair = tuple[int, int, int]
+
+PARTS_PER_PROCESS = 4
+
+
+def refined_ranks(triples: typing.Iterable[RankPair]) \
+        -> typing.Iterator[tuple[int, int, bool]]:
+    """
+    Split groups by the ranks further on.
+
+    The triples are the (rank[i], rank[i + h], i) keys for all the
+    suffixes in the groups we split, in sorted order. We yield
+    (i, new rank, whether i still shares its rank with others), a
+    suffix at a time, so we never hold more than one of a group.
+    """
+    held: typing.Optional[tuple[int, int]] = None  # maybe a singleton
+    key, group, start, pos = (-1, -1), -1, 0, 0
+    for r1, r2, i in triples:
+        if r1 != group:
+            group, pos = r1, r1
+        if (r1, r2) != key:
+            if held is not None:
+                yield held[0], held[1], False
+            key, start, held = (r1, r2), pos, (i, pos)
+        else:
+            if held is not None:
+                yield held[0], held[1], True
+                held = None
+            yield i, start, True
+        pos += 1
+    if held is not None:
+        yield held[0], held[1], False
+
+
+def as_view(buf: typing.Any) -> memoryview:
+    """View a buffer of 64-bit integers, such as a shared array."""
+    return memoryview(buf).cast('B').cast('q')
+
+
+class SuffixRanks:
+    """The suffix array and the two rank buffers the rounds refine."""
+
+    sa: memoryview
+    ranks: tuple[memoryview, memoryview]
+
+    def __init__(self, sa: typing.Any, rank: typing.Any,
+                 new_rank: typing.Any) -> None:
+        """Wrap buffers of 64-bit integers."""
+        self.sa = as_view(sa)
+        self.ranks = (as_view(rank), as_view(new_rank))
+
+    def refine_range(self, lo: int, hi: int, h: int, parity: int) -> int:
+        """
+        Refine the groups in sa[lo:hi] by the ranks h further on.
+
+        lo and hi must be group boundaries. The ranks are read from
+        ranks[parity] and written to the other buffer. Returns the
+        number of suffixes that are still in groups with others.
+        """
+        sa, rank, new_rank = self.sa, self.ranks[parity], \
+            self.ranks[1 - parity]
+        n, pending = len(sa), 0
+        done: typing.Optional[int] = None  # the start of a finished run
+        j = lo
+        while j < hi:
+            if sa[j] < 0:  # a run of finished groups
+                done = j if done is None else done
+                j -= sa[j]
+                continue
+            end = j + 1
+            while end < hi and sa[end] >= 0 and rank[sa[end]] == j:
+                end += 1
+            if end - j == 1:
+                # A singleton from the last round; its rank is final,
+                # so put it in both buffers before we skip it.
+                new_rank[sa[j]] = j
+                done = j if done is None else done
+                j = end
+                continue
+
+            if done is not None:
+                sa[done] = -(j - done)
+                done = None
+            keys = sorted((rank[i + h] if i + h < n else -1, i)
+                          for i in sa[j:end])
+            refined = refined_ranks((j, key, i) for key, i in keys)
+            for k, (i, r, shared) in enumerate(refined, j):
+                sa[k] = i
+                new_rank[i] = r
+                pending += shared
+            j = end
+        if done is not None:
+            sa[done] = -(min(j, hi) - done)
+        return pending
+
+    def place_range(self, lo: int, hi: int, parity: int) -> None:
+        """Put suffixes lo to hi in the suffix array by their final ranks."""
+        sa, rank = self.sa, self.ranks[parity]
+        for i in range(lo, hi):
+            sa[rank[i]] = i
+
+
+def initial_order(x: bytearray, sa: memoryview, rank: memoryview) -> None:
+    """Sort the suffixes by their first letter, and rank them by it."""
+    counts = [0] * 256
+    for a in x:
+        counts[a] += 1
+    starts, n = [], 0
+    for c in counts:
+        starts.append(n)
+        n += c
+    nxt = starts[:]
+    for i, a in enumerate(x):
+        rank[i] = starts[a]
+        sa[nxt[a]] = i
+        nxt[a] += 1
+
+
+def range_boundaries(sa: memoryview, rank: memoryview,
+                     nparts: int) -> list[int]:
+    """Split sa into at most nparts ranges at group boundaries."""
+    n = len(sa)
+    bounds = [0]
+    for p in range(1, nparts):
+        j = max(bounds[-1] + 1, p * n // nparts)
+        while j < n and sa[j] >= 0 and rank[sa[j]] != j:
+            j += 1  # move past the group that j is inside
+        if j >= n:
+            break
+        bounds.append(j)
+    bounds.append(n)
+    return bounds
+
+
+# Applies SuffixRanks.refine_range or place_range to ranges given by
+# their boundaries, in this process or in a pool, with the remaining
+# arguments after the boundaries
+RangeRefiner = typing.Callable[[list[int], int, int], typing.Iterable[int]]
+RangePlacer = typing.Callable[[list[int], int], typing.Iterable[None]]
+
+
+def double_prefixes(x: bytearray, ranks: SuffixRanks, nparts: int,
+                    refine: RangeRefiner, place: RangePlacer) -> None:
+    """Double the prefixes until ranks.sa is the suffix array of x."""
+    sa = ranks.sa
+    initial_order(x, sa, ranks.ranks[0])
+    h, parity = 1, 0
+    while True:
+        bounds = range_boundaries(sa, ranks.ranks[parity], nparts)
+        pending = sum(refine(bounds, h, parity))
+        h, parity = 2 * h, 1 - parity
+        if pending == 0:
+            break
+    n = len(sa)
+    bounds = [p * n // nparts for p in range(nparts)] + [n]
+    for _ in place(bounds, parity):
+        pass
+
+
+# The arrays in a pool process; set with share_arrays
+_shared: typing.Optional[SuffixRanks] = None
+
+
+def share_arrays(sa: typing.Any, rank: typing.Any,
+                 new_rank: typing.Any) -> None:
+    """Set the arrays the pool processes work on (a pool initializer)."""
+    global _shared
+    _shared = SuffixRanks(sa, rank, new_rank)
+
+
+def refine_shared(lo: int, hi: int, h: int, parity: int) -> int:
+    """Call refine_range on the shared arrays."""
+    assert _shared is not None, "The arrays must be shared first"
+    return _shared.refine_range(lo, hi, h, parity)
+
+
+def place_shared(lo: int, hi: int, parity: int) -> None:
+    """Call place_range on the shared arrays."""
+    assert _shared is not None, "The arrays must be shared first"
+    _shared.place_range(lo, hi, parity)
+
+
+def parallel_suffix_array(x: str,
+                          processes: typing.Optional[int] = None) \
+        -> list[int]:
+    """
+    Build the suffix array of x, with the sentinel, as sais does.
+
+    The work is done in a pool of processes, os.cpu_count() of
+    them if processes is None. With processes == 1 we work in this
+    process, without shared memory.
+    """
+    x_, _ = Alphabet.mapped_string_with_sentinel(x)
+    n = len(x_)
+
+    if processes == 1:
+        ranks = SuffixRanks(*(bytearray(8 * n) for _ in range(3)))
+        double_prefixes(
+            x_, ranks, 1,
+            lambda bounds, h, parity: map(
+                ranks.refine_range, bounds[:-1], bounds[1:],
+                itertools.repeat(h), itertools.repeat(parity)
+            ),
+            lambda bounds, parity: map(
+                ranks.place_range, bounds[:-1], bounds[1:],
+                itertools.repeat(parity)
+            )
+        )
+        return ranks.sa.tolist()
+
+    sa_buf, rank_buf, new_rank_buf = (
+        multiprocessing.sharedctypes.RawArray('q', n) for _ in range(3)
+    )
+    ranks = SuffixRanks(sa_buf, rank_buf, new_rank_buf)
+    nparts = PARTS_PER_PROCESS * (processes or os.cpu_count() or 1)
+    with concurrent.futures.ProcessPoolExecutor(
+            processes, initializer=share_arrays,
+            initargs=(sa_buf, rank_buf, new_rank_buf)
+    ) as pool:
+        double_prefixes(
+            x_, ranks, nparts,
+            lambda bounds, h, parity: pool.map(
+                refine_shared, bounds[:-1], bounds[1:],
+                itertools.repeat(h), itertools.repeat(parity)
+            ),
+            lambda bounds, parity: pool.map(
+                place_shared, bounds[:-1], bounds[1:],
+                itertools.repeat(parity)
+            )
+        )
+    return ranks.sa.tolist()
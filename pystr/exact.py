@@ -1,7 +1,9 @@
 """Simple exact matching algorithms."""
 
-import collections
+import functools
+import mmap
 import typing
+import weakref
 
 from .alphabet import Alphabet
 from .border_array import border_array, strict_border_array
@@ -60,81 +62,491 @@ def kmp(x: str, p: str) -> typing.Iterator[int]:
                 j = ba[j - 1]
 
 
+class BmhMatcher:
+    """Boyer-Moore-Horspool search for a preprocessed pattern."""
+
+    p: str
+    jump: dict[str, int]
+
+    def __init__(self, p: str) -> None:
+        """Build the jump table for p."""
+        self.p = p
+        self.jump = {}
+        for j, a in enumerate(p[:-1]):  # skip last index!
+            self.jump[a] = len(p) - j - 1
+
+    def __call__(self, x: str) -> typing.Iterator[int]:
+        """Run the Boyer-Moore-Horspool algorithm."""
+        p, jump = self.p, self.jump
+
+        # Can't handle empty strings directly
+        if not p:
+            yield from range(len(x) + 1)
+            return
+
+        i, j = 0, 0
+        while i < len(x) - len(p) + 1:
+            for j in reversed(range(len(p))):
+                if x[i + j] != p[j]:
+                    break
+            else:
+                yield i
+
+            i += jump.get(x[i + len(p) - 1], len(p))
+
+
+class BmhBytesMatcher:
+    """Boyer-Moore-Horspool search in bytes for a preprocessed pattern."""
+
+    p: bytes
+    jump: list[int]
+
+    def __init__(self, p: bytes) -> None:
+        """Build the jump table for p."""
+        self.p = p
+        self.jump = [len(p)] * 256  # 256 different bytes
+        for j, a in enumerate(p[:-1]):  # skip last index!
+            self.jump[a] = len(p) - j - 1
+
+    def __call__(self, x: bytes) -> typing.Iterator[int]:
+        """Run the Boyer-Moore-Horspool algorithm."""
+        p, jump = self.p, self.jump
+
+        # Can't handle empty strings directly
+        if not p:
+            yield from range(len(x) + 1)
+            return
+
+        i, j = 0, 0
+        while i < len(x) - len(p) + 1:
+            for j in reversed(range(len(p))):
+                if x[i + j] != p[j]:
+                    break
+            else:
+                yield i
+
+            i += jump[x[i + len(p) - 1]]
+
+
+class BmhAlphaMatcher:
+    """
+    Boyer-Moore-Horspool search over mapped strings.
+
+    The pattern is mapped to the alphabet of each text we search in,
+    and the mapped pattern and jump table are kept for each alphabet
+    we have seen, so searching the same text again doesn't repeat the
+    preprocessing.
+    """
+
+    p: str
+    _tables: weakref.WeakKeyDictionary[
+        Alphabet, typing.Optional[tuple[bytearray, list[int]]]
+    ]
+
+    def __init__(self, p: str) -> None:
+        """Prepare a matcher for p."""
+        self.p = p
+        # Weak keys, so we forget the tables when the alphabet
+        # (and the text it was built from) is gone.
+        self._tables = weakref.WeakKeyDictionary()
+
+    def tables(self, alpha: Alphabet) \
+            -> typing.Optional[tuple[bytearray, list[int]]]:
+        """Get the mapped pattern and jump table for alphabet alpha."""
+        if alpha not in self._tables:
+            try:
+                p = alpha.map(self.p)
+            except KeyError:
+                # If we can't map, we can't have a hit
+                self._tables[alpha] = None
+                return None
+
+            jump: list[int] = [len(p)] * len(alpha)
+            # Strings don't alow slicing outside the valid range
+            # so the p[:-1] trick isn't safe if len(p) == 1.
+            # It's a design choice; I'd rather have errors than
+            # silent unexpected behaviour.
+            for j in range(len(p) - 1):
+                jump[p[j]] = len(p) - j - 1
+            self._tables[alpha] = (p, jump)
+
+        return self._tables[alpha]
+
+    def __call__(self, x_: str) -> typing.Iterator[int]:
+        """Run the Boyer-Moore-Horspool algorithm."""
+        x, alpha = mapped_text(x_)
+        tables = self.tables(alpha)
+        if tables is None:
+            return
+        p, jump = tables
+
+        # Can't handle empty strings directly
+        if not p:
+            yield from range(len(x) + 1)
+            return
+
+        i, j = 0, 0
+        while i < len(x) - len(p) + 1:
+            for j in reversed(range(len(p))):
+                if x[i + j] != p[j]:
+                    break
+            else:
+                yield i
+
+            i += jump[x[i + len(p) - 1]]
+
+
+# Number of preprocessed patterns we keep around.
+CACHE_SIZE = 128
+# Number of mapped texts we keep around. Each holds on to a whole
+# text and its mapped copy, so we only keep the last few, enough for
+# searching for several patterns in the same text.
+TEXT_CACHE_SIZE = 4
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def mapped_text(x: str) -> tuple[bytes, Alphabet]:
+    """Map x to its own alphabet, remembering the last few texts."""
+    x_, alpha = Alphabet.mapped_string(x)
+    return bytes(x_), alpha  # immutable, since calls share it
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_bmh(p: str) -> BmhMatcher:
+    """Get a Boyer-Moore-Horspool matcher for p."""
+    return BmhMatcher(p)
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def _compile_bmh_b(p: bytes) -> BmhBytesMatcher:
+    return BmhBytesMatcher(p)
+
+
+def compile_bmh_b(p: bytes | bytearray) -> BmhBytesMatcher:
+    """Get a Boyer-Moore-Horspool matcher for the bytes p."""
+    # Go through bytes so bytearrays can be cache keys as well
+    return _compile_bmh_b(bytes(p))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_bmh_alpha(p: str) -> BmhAlphaMatcher:
+    """Get a Boyer-Moore-Horspool matcher for p over mapped strings."""
+    return BmhAlphaMatcher(p)
+
+
 def bmh(x: str, p: str) -> typing.Iterator[int]:
     """Run the Boyer-Moore-Horspool algorithm."""
-    # Can't handle empty strings directly
+    return compile_bmh(p)(x)
+
+
+def bmh_b(x: bytes, p: bytes) -> typing.Iterator[int]:
+    """Run the Boyer-Moore-Horspool algorithm."""
+    return compile_bmh_b(p)(x)
+
+
+# If p has the sentinel, it can only match the end of x.
+# The function assumes that you don't have sentinels you do not
+# want.
+def bmh_alpha(x_: str, p_: str) -> typing.Iterator[int]:
+    """Run the Boyer-Moore-Horspool algorithm."""
+    return compile_bmh_alpha(p_)(x_)
+
+
+def last_occurrence(p: str) -> dict[str, int]:
+    """Map each character in p to the last index where it occurs."""
+    return {a: j for j, a in enumerate(p)}
+
+
+def good_suffix_table(p: str) -> list[int]:
+    """
+    Build the strong good suffix shift table for p.
+
+    If we have matched p[j+1:] and see a mismatch at j, we can shift
+    the pattern shift[j + 1] positions. After a full match we can
+    shift shift[0], the period of p.
+
+    The table is built from the widest borders of the suffixes of p,
+    which we get from the border array of the reversed pattern.
+    """
+    m = len(p)
+    # bpos[i] is the start of the widest border of p[i:].
+    # p[i:] reversed is rev[:m-i], so its widest border has
+    # length rba[m-i-1] and starts at m - rba[m-i-1] in p.
+    rba = border_array(p[::-1])
+    bpos = [m - rba[m - i - 1] for i in range(m)] + [m + 1]
+
+    shift = [0] * (m + 1)
+    # Borders of p[i:] that can't be extended with p[i-1] give us
+    # shifts to suffixes that occur elsewhere, preceded by a
+    # different character (the strong rule)
+    for i in range(m, 0, -1):
+        j = bpos[i]
+        while j <= m and p[i - 1] != p[j - 1]:
+            if shift[j] == 0:
+                shift[j] = j - i
+            j = bpos[j]
+
+    # Where that didn't give us a shift, we shift so the longest
+    # border of p that fits in the matched suffix aligns.
+    j = bpos[0]
+    for i in range(m + 1):
+        if shift[i] == 0:
+            shift[i] = j
+        if i == j:
+            j = bpos[j]
+
+    return shift
+
+
+def bm(x: str, p: str) -> typing.Iterator[int]:
+    """Run the Boyer-Moore algorithm (bad character + good suffix)."""
     if not p:
         yield from range(len(x) + 1)
         return
 
-    jump: dict[str, int] = collections.defaultdict(lambda: len(p))
-    for j, a in enumerate(p[:-1]):  # skip last index!
-        jump[a] = len(p) - j - 1
+    m = len(p)
+    last = last_occurrence(p)
+    shift = good_suffix_table(p)
 
-    i, j = 0, 0
-    while i < len(x) - len(p) + 1:
-        for j in reversed(range(len(p))):
-            if x[i + j] != p[j]:
-                break
-        else:
+    i = 0
+    while i < len(x) - m + 1:
+        j = m - 1
+        while j >= 0 and x[i + j] == p[j]:
+            j -= 1
+        if j < 0:
             yield i
+            i += shift[0]
+        else:
+            i += max(shift[j + 1], j - last.get(x[i + j], -1))
 
-        i += jump[x[i + len(p) - 1]]
 
+def bm_galil(x: str, p: str) -> typing.Iterator[int]:
+    """
+    Run the Boyer-Moore algorithm with the Galil rule.
 
-def bmh_b(x: bytes, p: bytes) -> typing.Iterator[int]:
-    """Run the Boyer-Moore-Horspool algorithm."""
-    # Can't handle empty strings directly
+    After a match we shift by the period of p, and then we know
+    that the first m - period characters already match, so we
+    don't compare them again. That makes the worst case linear.
+    """
     if not p:
         yield from range(len(x) + 1)
         return
 
-    jump: list[int] = [len(p)] * 256  # 256 different bytes
-    for j, a in enumerate(p[:-1]):  # skip last index!
-        jump[a] = len(p) - j - 1
+    m = len(p)
+    last = last_occurrence(p)
+    shift = good_suffix_table(p)
+    period = shift[0]
 
-    i, j = 0, 0
-    while i < len(x) - len(p) + 1:
-        for j in reversed(range(len(p))):
-            if x[i + j] != p[j]:
-                break
+    i, known = 0, 0  # x[i:i+known] is known to match p[:known]
+    while i < len(x) - m + 1:
+        j = m - 1
+        while j >= known and x[i + j] == p[j]:
+            j -= 1
+        if j < known:
+            yield i
+            i += period
+            known = m - period
         else:
+            i += max(shift[j + 1], j - last.get(x[i + j], -1))
+            known = 0
+
+
+def turbo_bm(x: str, p: str) -> typing.Iterator[int]:
+    """
+    Run the Turbo-Boyer-Moore algorithm.
+
+    We remember the factor of the text that matched the pattern in the
+    previous attempt, jump over it when we reach it, and use it for
+    turbo shifts. This makes the worst case linear as well.
+    """
+    if not p:
+        yield from range(len(x) + 1)
+        return
+
+    m = len(p)
+    last = last_occurrence(p)
+    shift = good_suffix_table(p)
+
+    # u is the length of the memorised factor, and s the last shift
+    i, u, s = 0, 0, m
+    while i < len(x) - m + 1:
+        j = m - 1
+        while j >= 0 and x[i + j] == p[j]:
+            j -= 1
+            if u != 0 and j == m - 1 - s:
+                j -= u  # jump over the memorised factor
+        if j < 0:
             yield i
+            s = shift[0]
+            u = m - s
+        else:
+            v = m - 1 - j  # length of the matched suffix
+            turbo_shift = u - v
+            bc_shift = j - last.get(x[i + j], -1)
+            s = max(turbo_shift, bc_shift, shift[j + 1])
+            if s == shift[j + 1]:
+                u = min(m - s, v)
+            else:
+                if turbo_shift < bc_shift:
+                    s = max(s, u + 1)
+                u = 0
+        i += s
 
-        i += jump[x[i + len(p) - 1]]
 
+def find_all(x: str, p: str) -> typing.Iterator[int]:
+    """
+    Find all occurrences of p in x using str.find.
 
-# If p has the sentinel, it can only match the end of x.
-# The function assumes that you don't have sentinels you do not
-# want.
-def bmh_alpha(x_: str, p_: str) -> typing.Iterator[int]:
-    """Run the Boyer-Moore-Horspool algorithm."""
-    x, alpha = Alphabet.mapped_string(x_)
-    try:
-        p = alpha.map(p_)
-    except KeyError:
-        # If we can't map, we can't have a hit
+    The built-in search is implemented in C (with the two-way
+    algorithm for longer patterns), so this is by far the fastest
+    engine we have. We restart the search one position after each
+    hit, so we also get overlapping occurrences.
+    """
+    if not p:
+        yield from range(len(x) + 1)
         return
 
-    # Can't handle empty strings directly
+    i = x.find(p)
+    while i >= 0:
+        yield i
+        i = x.find(p, i + 1)
+
+
+# Texts we can search with a built-in find method. The pattern
+# can be any buffer, including a memoryview.
+ByteText = bytes | bytearray | mmap.mmap
+BytePattern = bytes | bytearray | memoryview
+
+
+def find_all_b(x: ByteText, p: BytePattern) -> typing.Iterator[int]:
+    """
+    Find all occurrences of p in x using the built-in bytes find.
+
+    The text can be bytes, a bytearray (e.g. a string mapped with an
+    Alphabet) or a memory mapped file, and the pattern any buffer.
+    """
     if not p:
         yield from range(len(x) + 1)
         return
 
-    jump: list[int] = [len(p)] * len(alpha)
-    # Strings don't alow slicing outside the valid range
-    # so the p[:-1] trick isn't safe if len(p) == 1.
-    # It's a design choice; I'd rather have errors than
-    # silent unexpected behaviour.
-    for j in range(len(p) - 1):
-        jump[p[j]] = len(p) - j - 1
-
-    i, j = 0, 0
-    while i < len(x) - len(p) + 1:
-        for j in reversed(range(len(p))):
-            if x[i + j] != p[j]:
-                break
+    i = x.find(p)
+    while i >= 0:
+        yield i
+        i = x.find(p, i + 1)
+
+
+@typing.overload
+def search(x: str, p: str) -> typing.Iterator[int]:
+    """Search in a string."""
+    ...  # pragma: no cover
+
+
+@typing.overload
+def search(x: ByteText, p: BytePattern) -> typing.Iterator[int]:
+    """Search in a bytes-like text."""
+    ...  # pragma: no cover
+
+
+def search(x: str | ByteText,
+           p: str | BytePattern) -> typing.Iterator[int]:
+    """
+    Find all occurrences of p in x with the best engine we have.
+
+    The built-in find already picks its algorithm from the pattern
+    length (memchr for single characters, a Horspool variant for short
+    patterns and two-way for long ones), and no pure Python engine
+    comes close to it, so all we have to do here is pick the find for
+    the type of text.
+    """
+    if isinstance(x, str):
+        assert isinstance(p, str), "Can't search for bytes in a string"
+        return find_all(x, p)
+    assert not isinstance(p, str), "Can't search for a string in bytes"
+    return find_all_b(x, p)
+
+
+def maximal_suffix(p: str, reverse: bool) -> tuple[int, int]:
+    """
+    Compute the maximal suffix of p and its period.
+
+    Returns (i, per) where p[i+1:] is the lexicographically largest
+    suffix of p (the smallest if reverse is True) and per is its
+    period. Uses constant extra space.
+    """
+    i, j, k, per = -1, 0, 1, 1
+    while j + k < len(p):
+        a, b = p[j + k], p[i + k]
+        if (a > b) if reverse else (a < b):
+            j += k
+            k = 1
+            per = j - i
+        elif a == b:
+            if k != per:
+                k += 1
+            else:
+                j += per
+                k = 1
         else:
-            yield i
+            i, j = j, j + 1
+            k = per = 1
+    return i, per
+
+
+def two_way(x: str, p: str) -> typing.Iterator[int]:
+    """
+    Run the Crochemore-Perrin two-way algorithm.
+
+    The pattern is split at a critical factorisation p = p[:ell+1] +
+    p[ell+1:]. We match the right part left to right, then the left
+    part right to left, and use the period of p to shift. It runs in
+    linear time and only uses a constant amount of extra space.
+    """
+    if not p:
+        yield from range(len(x) + 1)
+        return
+
+    m = len(p)
+    # The critical factorisation is the later of the two maximal
+    # suffixes under the two orderings of the alphabet.
+    i, per_i = maximal_suffix(p, False)
+    j, per_j = maximal_suffix(p, True)
+    ell, per = (i, per_i) if i > j else (j, per_j)
 
-        i += jump[x[i + len(p) - 1]]
+    # Is p periodic with period per, i.e. is p[:ell+1] a suffix
+    # of p[per:per+ell+1]? (Compared in place to save space).
+    if all(p[k] == p[k + per] for k in range(ell + 1)):
+        # Here we can use the period, and we remember how much
+        # of the prefix we have already matched
+        s, memory = 0, -1
+        while s <= len(x) - m:
+            k = max(ell, memory) + 1
+            while k < m and p[k] == x[s + k]:
+                k += 1
+            if k >= m:
+                k = ell
+                while k > memory and p[k] == x[s + k]:
+                    k -= 1
+                if k <= memory:
+                    yield s
+                s += per
+                memory = m - per - 1
+            else:
+                s += k - ell
+                memory = -1
+    else:
+        # Otherwise we can shift past the larger part
+        per = max(ell + 1, m - ell - 1) + 1
+        s = 0
+        while s <= len(x) - m:
+            k = ell + 1
+            while k < m and p[k] == x[s + k]:
+                k += 1
+            if k >= m:
+                k = ell
+                while k >= 0 and p[k] == x[s + k]:
+                    k -= 1
+                if k < 0:
+                    yield s
+                s += per
+            else:
+                s += k - ell
@@ -0,0 +1,300 @@
+"""
+Suffix arrays on disk, for texts too large for the lists in sais.
+
+We sort the suffixes by prefix doubling, as in doubling, but with the
+ranks in a memory-mapped file and the sorting done on disk. After
+round k, the rank of a suffix is the number of suffixes that are
+smaller by their first 2^k letters, and the suffixes that share their
+rank with others are pending. For those, a round sorts the keys
+(rank[i], rank[i + h], i), h = 2^k, in runs small enough for the
+memory budget, writes each sorted run to a temporary file, and merges
+the runs with heapq.merge, reading each run a block at a time.
+Splitting the groups in the merged order, with doubling.refined_ranks,
+gives the ranks for prefixes twice as long, and we write them back to
+the rank file and the positions still pending to a new file. We merge
+at most FAN_IN runs at a time, so we don't run out of file
+descriptors; with more runs than that, we merge in several passes,
+each writing fewer, longer runs. Once nothing is pending, the ranks
+are the inverse suffix array, and we scatter the positions into the
+suffix array file.
+
+The text is sorted as raw bytes with an implicit sentinel at the end,
+the smallest suffix, which is the order Alphabet maps to, so the
+suffix array is the one sais gives for the same text. As there, byte
+zero is the sentinel, so the text can't contain it, and that leaves
+255 possible letters.
+
+This isn't one of the I/O-efficient algorithms, such as DC3 or
+eSAIS, but a round is a sort of the pending keys, and there are
+O(log r) rounds, where r is the length of the longest repeat in the
+text, so repetitive text costs more rounds rather than longer
+comparisons. Memory is the mapped text and ranks, which the operating
+system pages in and out as needed, one run of keys while sorting, and
+one block per merged run while merging.
+
+The suffix array file is a sequence of 64-bit integers in native byte
+order, with the sentinel suffix first, and load_suffix_array maps it
+back as a memoryview that can stand in for the list from sais.
+"""
+
+import array
+import contextlib
+import heapq
+import itertools
+import mmap
+import os
+import tempfile
+import typing
+
+from .alphabet import Alphabet
+from .bwt import (CTable, ExactSearchFunc, RankTableFactory,
+                  exact_searcher_from_tables)
+from .doubling import RankPair, refined_ranks
+from .wavelet import WaveletMatrix
+
+DEFAULT_MEMORY = 64 * 2**20
+KEY_BYTES = 160    # rough cost of a key in a run we are sorting
+FAN_IN = 64        # the most runs we merge at once
+MIN_BLOCK = 1024   # the fewest keys we read from a run at once
+SCAN_BLOCK = 2**20  # the bytes or positions we scan at a time
+
+
+@contextlib.contextmanager
+def map_text(path: str) -> typing.Iterator[typing.Any]:
+    """Memory-map a file read-only; an empty file gives empty bytes."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''  # we can't map an empty file
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as text:
+            yield text
+
+
+@contextlib.contextmanager
+def map_integers(path: str, n: int) -> typing.Iterator[memoryview]:
+    """Create a file of n > 0 64-bit integers and memory-map it."""
+    with open(path, 'w+b') as f:
+        f.truncate(8 * n)
+        with mmap.mmap(f.fileno(), 0) as buf:
+            view = memoryview(buf).cast('q')
+            try:
+                yield view
+            finally:
+                view.release()  # we can't close the map while it is viewed
+
+
+def text_letters(text: typing.Any) -> bytes:
+    """
+    Get the distinct bytes in text, in sorted order.
+
+    The sentinel is byte zero, so the text can't contain it, and that
+    leaves room for 255 letters; otherwise we raise a ValueError.
+    """
+    seen = bytearray()
+    for k in range(0, len(text), SCAN_BLOCK):
+        # Each byte we haven't seen yet costs a pass over the block,
+        # but there are at most 256 of them in all
+        new = text[k:k + SCAN_BLOCK].translate(None, seen)
+        while new:
+            seen.append(new[0])
+            new = new.translate(None, seen)
+    if len(seen) == 256:
+        raise ValueError("The text has all 256 byte values, but we can "
+                         "only handle 255 letters besides the sentinel")
+    if 0 in seen:
+        raise ValueError("The text contains byte zero, the sentinel")
+    return bytes(sorted(seen))
+
+
+def write_integers(path: str, integers: typing.Iterable[int]) -> int:
+    """Write integers to a file a block at a time, and count them."""
+    n = 0
+    with open(path, 'wb') as f:
+        buf = array.array('q')
+        for i in integers:
+            buf.append(i)
+            if len(buf) == SCAN_BLOCK:
+                buf.tofile(f)
+                n += len(buf)
+                del buf[:]
+        buf.tofile(f)
+    return n + len(buf)
+
+
+def read_integers(path: str, block: int) -> typing.Iterator[int]:
+    """Read the integers in a file, block integers at a time."""
+    with open(path, 'rb') as f:
+        while True:
+            buf = array.array('q')
+            try:
+                buf.fromfile(f, block)
+            except EOFError:
+                pass  # the last block is short, but buf has what we got
+            if not buf:
+                return
+            yield from buf
+
+
+def first_letter_ranks(text: typing.Any,
+                       rank: memoryview) -> typing.Iterator[int]:
+    """
+    Rank the suffixes by their first letter.
+
+    Yields the positions that share their first letter with others.
+    """
+    counts = [0] * 256
+    for k in range(0, len(text), SCAN_BLOCK):
+        block = text[k:k + SCAN_BLOCK]
+        for a in set(block):
+            counts[a] += block.count(a)
+    starts, n = [0] * 256, 1  # the sentinel is the smallest suffix
+    for a, c in enumerate(counts):
+        starts[a] = n
+        n += c
+
+    rank[len(text)] = 0
+    for k in range(0, len(text), SCAN_BLOCK):
+        block = text[k:k + SCAN_BLOCK]
+        rank[k:k + len(block)] = \
+            array.array('q', map(starts.__getitem__, block))
+        yield from (i for i, a in enumerate(block, k) if counts[a] > 1)
+
+
+def update_ranks(rank: memoryview,
+                 keys: typing.Iterable[RankPair]) -> typing.Iterator[int]:
+    """
+    Update the ranks from the sorted keys of the pending suffixes.
+
+    Yields the positions that are still pending.
+    """
+    for i, r, shared in refined_ranks(keys):
+        rank[i] = r
+        if shared:
+            yield i
+
+
+def sorted_runs(keys: typing.Iterable[RankPair], run_length: int,
+                tmpdir: str) -> list[str]:
+    """Sort keys in runs, and get the files of the runs."""
+    runs: list[str] = []
+    keys = iter(keys)
+    while True:
+        run = sorted(itertools.islice(keys, run_length))
+        if not run:
+            return runs
+        fd, path = tempfile.mkstemp(dir=tmpdir, suffix='.run')
+        with os.fdopen(fd, 'wb') as f:
+            array.array('q', (x for key in run for x in key)).tofile(f)
+        runs.append(path)
+
+
+def read_run(path: str, block: int) -> typing.Iterator[RankPair]:
+    """Read the keys in a run file, block keys at a time."""
+    integers = read_integers(path, 3 * block)
+    return zip(integers, integers, integers)
+
+
+def merged_runs(runs: list[str], block: int, tmpdir: str,
+                fan_in: int) -> typing.Iterator[RankPair]:
+    """
+    Merge sorted run files, at most fan_in at a time.
+
+    While there are more than fan_in runs, we merge them into fewer,
+    longer runs in tmpdir, and the last merge is the iterator we return.
+    """
+    while len(runs) > fan_in:
+        merged = []
+        for k in range(0, len(runs), fan_in):
+            fd, path = tempfile.mkstemp(dir=tmpdir, suffix='.run')
+            os.close(fd)
+            keys = heapq.merge(*(read_run(run, block)
+                                 for run in runs[k:k + fan_in]))
+            write_integers(path, (x for key in keys for x in key))
+            for run in runs[k:k + fan_in]:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+    return heapq.merge(*(read_run(run, block) for run in runs))
+
+
+def external_suffix_array(text_path: str, sa_path: str,
+                          memory: int = DEFAULT_MEMORY,
+                          tmpdir: typing.Optional[str] = None,
+                          fan_in: int = FAN_IN) -> int:
+    """
+    Build the suffix array of the text in text_path and write it to sa_path.
+
+    The memory parameter bounds, in bytes and roughly, what we use
+    besides the mapped text and ranks. The ranks, the pending
+    positions, and the sorted runs go in temporary files in tmpdir,
+    or the default temporary directory, and we merge at most fan_in
+    runs at a time. Returns the length of the suffix array, the
+    length of the text plus one. The text can't contain byte zero,
+    which is the sentinel; see text_letters.
+    """
+    assert fan_in >= 2, "We must merge at least two runs at a time"
+    run_length = max(1, memory // KEY_BYTES)
+    # A block for each run we merge and one for the output
+    block = max(MIN_BLOCK, memory // (24 * (fan_in + 1)))
+    with map_text(text_path) as text, \
+            tempfile.TemporaryDirectory(dir=tmpdir) as workdir:
+        text_letters(text)
+        n = len(text) + 1
+        pending_path = os.path.join(workdir, 'pending')
+        with map_integers(os.path.join(workdir, 'ranks'), n) as rank:
+            pending = write_integers(pending_path,
+                                     first_letter_ranks(text, rank))
+            h = 1
+            while pending:
+                with tempfile.TemporaryDirectory(dir=workdir) as rundir:
+                    keys = ((rank[i], rank[i + h] if i + h < n else -1, i)
+                            for i in read_integers(pending_path,
+                                                   SCAN_BLOCK))
+                    runs = sorted_runs(keys, run_length, rundir)
+                    # All the keys are in the runs now, so we can update
+                    # the ranks in place while we merge them
+                    merged = merged_runs(runs, block, rundir, fan_in)
+                    pending = write_integers(
+                        os.path.join(rundir, 'pending'),
+                        update_ranks(rank, merged)
+                    )
+                    os.replace(os.path.join(rundir, 'pending'),
+                               pending_path)
+                h *= 2
+
+            with map_integers(sa_path, n) as sa:
+                for i, r in enumerate(rank):
+                    sa[r] = i
+        return n
+
+
+def load_suffix_array(sa_path: str) -> memoryview:
+    """Memory-map a suffix array file as a sequence of integers."""
+    with open(sa_path, 'rb') as f:
+        sa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(sa).cast('q')
+
+
+def external_exact_preprocess(text_path: str, sa_path: str,
+                              otable: RankTableFactory = WaveletMatrix) \
+        -> ExactSearchFunc:
+    """
+    Build an exact search function from a text and its suffix array file.
+
+    The suffix array stays on disk, and we build the bwt string from
+    it and the mapped text a block of positions at a time, so besides
+    the bwt and the rank table we don't hold any of them in memory.
+    The default rank table is a wavelet matrix, which takes a few bits
+    per letter, where an OTable holds a count per letter for every row.
+    """
+    with map_text(text_path) as text:
+        alpha = Alphabet(text_letters(text).decode('latin-1'))
+        sa = load_suffix_array(sa_path)
+        bwt = bytearray(len(sa))
+        for k in range(0, len(sa), SCAN_BLOCK):
+            raw = bytes(text[j - 1] if j else 0
+                        for j in sa[k:k + SCAN_BLOCK])
+            bwt[k:k + len(raw)] = alpha.map_bytes(raw)
+    return exact_searcher_from_tables(
+        alpha, sa, CTable(bwt, len(alpha)), otable(bwt, len(alpha))
+    )
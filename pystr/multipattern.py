@@ -0,0 +1,170 @@
+"""
+Hash-based multi-pattern exact matching.
+
+Both algorithms here have the same interface as aho_corasick: they
+take a text and any number of patterns and report (label, position)
+pairs, where the label is the index of the pattern. The text and the
+patterns are mapped to the text's alphabet first, so the hashing
+works on small integers in bytearrays. Unlike aho_corasick, the
+patterns do not have to be unique. The hits are reported in order of
+position.
+"""
+
+import heapq
+import math
+import typing
+
+from .alphabet import Alphabet
+
+# Modulus for the rolling hash; a Mersenne prime, 2^61 - 1.
+MODULUS = (1 << 61) - 1
+
+Hit = tuple[int, int]  # (label, position)
+
+
+def map_patterns(alpha: Alphabet, p: typing.Sequence[str]) \
+        -> tuple[list[int], list[tuple[int, bytearray]]]:
+    """
+    Map the patterns to alphabet alpha.
+
+    Returns the labels of the empty patterns and the (label, mapped)
+    pairs of the non-empty patterns. Patterns with characters not in
+    alpha can't match, so we leave them out.
+    """
+    empty: list[int] = []
+    mapped: list[tuple[int, bytearray]] = []
+    for label, q in enumerate(p):
+        if not q:
+            empty.append(label)
+            continue
+        try:
+            mapped.append((label, alpha.map(q)))
+        except KeyError:
+            pass  # can't map, so no matches
+    return empty, mapped
+
+
+def empty_hits(n: int, labels: list[int]) -> typing.Iterator[Hit]:
+    """Report the empty patterns at all positions in a text of length n."""
+    for i in range(n + 1):
+        for label in labels:
+            yield (label, i)
+
+
+def hit_position(hit: Hit) -> int:
+    """Get the position of a hit, for merging."""
+    return hit[1]
+
+
+def rolling_hash_scan(x: bytearray, m: int, base: int,
+                      table: dict[int, list[tuple[int, bytearray]]]) \
+        -> typing.Iterator[Hit]:
+    """Find the length m patterns in table with a rolling hash over x."""
+    if m > len(x):
+        return
+
+    high = pow(base, m - 1, MODULUS)  # weight of the character we drop
+    h = 0
+    for a in x[:m]:
+        h = (h * base + a) % MODULUS
+
+    for i in range(len(x) - m + 1):
+        if h in table:
+            # Verify, since different strings can have the same hash
+            window = x[i:i + m]
+            for label, q in table[h]:
+                if window == q:
+                    yield (label, i)
+        if i + m < len(x):
+            h = ((h - x[i] * high) * base + x[i + m]) % MODULUS
+
+
+def rabin_karp(x: str, *p: str) -> typing.Iterator[Hit]:
+    """
+    Exact pattern matching with the Rabin-Karp algorithm.
+
+    All patterns of the same length are found in a single scan over the
+    text by looking the rolling hash of each window up in a hash table,
+    so the cost depends on the number of different pattern lengths and
+    not on the number of patterns.
+    """
+    x_, alpha = Alphabet.mapped_string(x)
+    empty, mapped = map_patterns(alpha, p)
+    base = len(alpha)
+
+    by_length: dict[int, dict[int, list[tuple[int, bytearray]]]] = {}
+    for label, q in mapped:
+        h = 0
+        for a in q:
+            h = (h * base + a) % MODULUS
+        table = by_length.setdefault(len(q), {})
+        table.setdefault(h, []).append((label, q))
+
+    scans = [rolling_hash_scan(x_, m, base, table)
+             for m, table in sorted(by_length.items())]
+    yield from heapq.merge(empty_hits(len(x_), empty), *scans,
+                           key=hit_position)
+
+
+def block_size(asize: int, npatterns: int, m: int) -> int:
+    """
+    Pick the block size for Wu-Manber.
+
+    We want about 2 * npatterns * m different blocks, so most blocks in
+    the text are not in the patterns and give us a long shift. The
+    block can't be longer than the shortest pattern.
+    """
+    if asize <= 1:
+        return 1
+    b = math.ceil(math.log(2 * npatterns * m, asize))
+    return max(1, min(b, m))
+
+
+def block(x: bytearray, i: int, b: int) -> int:
+    """Get the block of length b that ends at index i in x as an integer."""
+    return int.from_bytes(x[i - b + 1:i + 1], 'big')
+
+
+def wu_manber(x: str, *p: str) -> typing.Iterator[Hit]:
+    """
+    Exact pattern matching with the Wu-Manber algorithm.
+
+    We look at blocks of b characters at the end of a window of the
+    length of the shortest pattern, m. The shift table tells us how far
+    we can move the window before the block can be part of the first m
+    characters of a pattern. When the shift is zero, the block ends the
+    first m characters of some patterns, and we verify those.
+    """
+    x_, alpha = Alphabet.mapped_string(x)
+    empty, mapped = map_patterns(alpha, p)
+    if not mapped:
+        yield from empty_hits(len(x_), empty)
+        return
+
+    m = min(len(q) for _, q in mapped)
+    b = block_size(len(alpha), len(mapped), m)
+    default_shift = m - b + 1
+
+    shift: dict[int, int] = {}
+    candidates: dict[int, list[tuple[int, bytearray]]] = {}
+    for label, q in mapped:
+        for j in range(b - 1, m):
+            h = block(q, j, b)
+            shift[h] = min(shift.get(h, default_shift), m - 1 - j)
+        candidates.setdefault(block(q, m - 1, b), []).append((label, q))
+
+    def scan() -> typing.Iterator[Hit]:
+        i = m - 1  # end of the current window
+        while i < len(x_):
+            h = block(x_, i, b)
+            s = shift.get(h, default_shift)
+            if s == 0:
+                start = i - m + 1
+                for label, q in candidates[h]:
+                    if x_[start:start + len(q)] == q:
+                        yield (label, start)
+                s = 1
+            i += s
+
+    yield from heapq.merge(empty_hits(len(x_), empty), scan(),
+                           key=hit_position)
@@ -0,0 +1,191 @@
+"""
+Run-length compressed BWT and r-index locate.
+
+For repetitive texts the bwt string has few runs of equal letters,
+r, compared to its length, n. Here we keep only the runs: rank is a
+binary search over the runs of one letter, and instead of the full
+suffix array we keep the suffix array values at the run boundaries.
+
+Backward search then keeps track of one suffix array value in the
+current interval, the "toehold", the value for the last row. If the
+bwt has letter a in the last row, the toehold moves along with it;
+if not, the last a in the interval ends a run, and we have its
+suffix array value as a sample. The rest of the interval follows from
+the toehold with the φ function, φ(SA[i]) = SA[i - 1], which we can
+compute from the samples at the run starts.
+
+The tables take O(r) space, but we build them from the full bwt and
+suffix array, so construction still needs O(n) memory.
+
+    - https://doi.org/10.1145/3375890 (Gagie, Navarro and Prezza)
+"""
+
+import bisect
+import typing
+
+from .alphabet import Alphabet
+from .bwt import CTable, ExactSearchFunc, burrows_wheeler_transform
+
+
+class RunLengthBWT:
+    """
+    Run-length encoded bwt string with rank queries.
+
+    It can be used in place of bwt.OTable; rlbwt[a, i] is the number
+    of occurrences j < i where bwt[j] == a.
+    """
+
+    heads: bytearray      # the letter in each run
+    starts: list[int]     # where each run starts, with n at the end
+    _runs: list[list[int]]   # for each letter, the runs of that letter
+    _before: list[list[int]]  # for each letter, occurrences before its runs
+
+    def __init__(self, bwt: bytearray, asize: int) -> None:
+        """Compress a bwt string over an alphabet of size asize."""
+        self.heads, self.starts = bytearray(), []
+        for i, a in enumerate(bwt):
+            if not self.heads or a != self.heads[-1]:
+                self.heads.append(a)
+                self.starts.append(i)
+        self.starts.append(len(bwt))
+
+        self._runs = [[] for _ in range(asize)]
+        self._before = [[] for _ in range(asize)]
+        counts = [0] * asize
+        for k, a in enumerate(self.heads):
+            self._runs[a].append(k)
+            self._before[a].append(counts[a])
+            counts[a] += self.run_length(k)
+
+    def __len__(self) -> int:
+        """Get the length of the bwt string."""
+        return self.starts[-1]
+
+    def runs(self) -> int:
+        """Get the number of runs."""
+        return len(self.heads)
+
+    def run_length(self, k: int) -> int:
+        """Get the length of run k."""
+        return self.starts[k + 1] - self.starts[k]
+
+    def run_of(self, i: int) -> int:
+        """Get the run that contains index i."""
+        return bisect.bisect_right(self.starts, i) - 1
+
+    def access(self, i: int) -> int:
+        """Get the letter at index i."""
+        return self.heads[self.run_of(i)]
+
+    def _last(self, a: int, i: int) -> int:
+        """Get the index, in _runs[a], of the last a-run starting before i."""
+        runs = self._runs[a]
+        lo, hi = 0, len(runs)
+        while lo < hi:  # bisect on the start positions of the runs
+            mid = (lo + hi) // 2
+            if self.starts[runs[mid]] < i:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def last_run(self, a: int, i: int) -> typing.Optional[int]:
+        """Get the last run of letter a that starts before index i."""
+        j = self._last(a, i)
+        return self._runs[a][j] if j >= 0 else None
+
+    def rank(self, a: int, i: int) -> int:
+        """Get the number of occurrences j < i where bwt[j] == a."""
+        j = self._last(a, i)
+        if j < 0:
+            return 0
+        k = self._runs[a][j]
+        return self._before[a][j] + \
+            min(i - self.starts[k], self.run_length(k))
+
+    def __getitem__(self, idx: tuple[int, int]) -> int:
+        """Get the number of occurrences j < i where bwt[j] == a."""
+        a, i = idx
+        return self.rank(a, i)
+
+
+class RIndex:
+    """An r-index: a run-length bwt with suffix array samples."""
+
+    alpha: Alphabet
+    rlbwt: RunLengthBWT
+    ctab: CTable
+    end_samples: list[int]  # SA value at the end of each run
+    phi_keys: list[int]     # SA values at run starts, sorted...
+    phi_values: list[int]   # ...and the SA values in the rows above them
+
+    def __init__(self, x: str) -> None:
+        """Build the r-index for string x."""
+        bwt, self.alpha, sa = burrows_wheeler_transform(x)
+        self.rlbwt = RunLengthBWT(bwt, len(self.alpha))
+        self.ctab = CTable(bwt, len(self.alpha))
+
+        starts = self.rlbwt.starts
+        self.end_samples = [sa[starts[k + 1] - 1]
+                            for k in range(self.rlbwt.runs())]
+        phi = sorted((sa[starts[k]], sa[starts[k] - 1])
+                     for k in range(1, self.rlbwt.runs()))
+        self.phi_keys = [key for key, _ in phi]
+        self.phi_values = [value for _, value in phi]
+
+    def phi(self, t: int) -> int:
+        """Get SA[i - 1] from t = SA[i], for i > 0."""
+        k = bisect.bisect_right(self.phi_keys, t) - 1
+        return self.phi_values[k] + (t - self.phi_keys[k])
+
+    def backward_search(self, p: bytearray) -> tuple[int, int, int]:
+        """
+        Find the interval of suffixes that start with p, and a toehold.
+
+        Returns the interval [left, right) and SA[right - 1]. If the
+        interval is empty, the toehold is meaningless.
+        """
+        rlbwt, ctab = self.rlbwt, self.ctab
+        left, right, toehold = 0, len(rlbwt), self.end_samples[-1]
+        for a in reversed(p):
+            k = rlbwt.last_run(a, right)
+            if k is None:
+                return 0, 0, 0
+            if rlbwt.starts[k + 1] >= right:
+                # The last row has an a, so we just step back with it
+                toehold -= 1
+            else:
+                # The last a in the interval is at the end of run k
+                toehold = self.end_samples[k] - 1
+            left = ctab[a] + rlbwt[a, left]
+            right = ctab[a] + rlbwt[a, right]
+            if left >= right:
+                return left, left, 0
+        return left, right, toehold
+
+    def count(self, p_: str) -> int:
+        """Count the occurrences of p_."""
+        try:
+            p = self.alpha.map(p_)
+        except KeyError:
+            return 0  # can't map, so no matches
+        left, right, _ = self.backward_search(p)
+        return right - left
+
+    def locate(self, p_: str) -> typing.Iterator[int]:
+        """Find the positions where p_ occurs, from the last row up."""
+        try:
+            p = self.alpha.map(p_)
+        except KeyError:
+            return  # can't map, so no matches
+        left, right, t = self.backward_search(p)
+        if left < right:
+            yield t
+            for _ in range(left + 1, right):
+                t = self.phi(t)
+                yield t
+
+
+def rindex_preprocess(x: str) -> ExactSearchFunc:
+    """Build an exact search function, with an r-index, for string x."""
+    return RIndex(x).locate
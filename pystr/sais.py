@@ -1,6 +1,20 @@
-"""Implementation of the SAIS algorithm."""
-
+"""
+Implementation of the SAIS algorithm.
+
+There are two versions here. sais works on lists through SubSeq
+views and builds new Buckets on each level. sais_lean allocates its
+working space up front, in a SaisWorkspace: the suffix array as an
+array of 64-bit integers, with the reduced strings and their suffix
+arrays inside it (as in Nong, Zhang and Chan's original design), and
+the S/L and LMS bits for all the levels, about 3n / 8 bytes. The
+bucket positions go in free space in the suffix array when there is
+room, as in Mori's sais-lite, so the peak is close to 8n bytes plus
+the bits. Measure the difference with peak_memory.
+"""
+
+import array
 import itertools
+import tracemalloc
 import typing
 
 from .alphabet import Alphabet
@@ -11,12 +25,20 @@ T = typing.TypeVar('T')
 UNDEFINED = -1  # Undefined val in SA
 
 
-def classify_sl(is_s: BitVector, x: SubSeq[int]) -> None:
-    """Classify positions into S or L."""
+def classify_sl(is_s: BitVector, x: typing.Sequence[int]) -> None:
+    """
+    Classify positions into S or L.
+
+    We build the classification in a byte mask and set the first
+    len(x) bits of is_s from it in one go.
+    """
     last = len(x) - 1
-    is_s[last] = True
+    mask = bytearray(len(x))
+    mask[last] = s = True
     for i in reversed(range(last)):
-        is_s[i] = x[i] < x[i + 1] or (x[i] == x[i + 1] and is_s[i + 1])
+        s = x[i] < x[i + 1] or (x[i] == x[i + 1] and s)
+        mask[i] = s
+    is_s.set_mask(mask)
 
 
 def is_lms(is_s: BitVector, i: int) -> bool:
@@ -24,6 +46,20 @@ def is_lms(is_s: BitVector, i: int) -> bool:
     return is_s[i] and not is_s[i - 1] if i > 0 else False
 
 
+def lms_vector(is_s: BitVector, n: int) -> BitVector:
+    """
+    Get a bit vector with the LMS indices of a string of length n.
+
+    An index is LMS if it is S and the index before it is L, and the
+    first index is never LMS. We compute the bits a byte at a time
+    straight into the new vector, as sais_lean does, so is_s can be
+    longer than n and we don't build temporary vectors on the way.
+    """
+    lms = BitVector(n)
+    lean_lms(is_s.bytes, memoryview(lms.bytes), n)
+    return lms
+
+
 class Buckets:
     """Buckets for bucketing suffixes."""
 
@@ -75,14 +111,13 @@ class Buckets:
 
 
 def bucket_lms(x: SubSeq[int], sa: MSubSeq[int],
-               buckets: Buckets, is_s: BitVector) \
+               buckets: Buckets, lms: BitVector) \
         -> None:
     """Place LMS strings in their correct buckets."""
     next_end = buckets.calc_ends()
     sa[:] = UNDEFINED
-    for i, _ in enumerate(x):
-        if is_lms(is_s, i):
-            sa[next_end(x[i])] = i
+    for i in lms.ones():
+        sa[next_end(x[i])] = i
 
 
 def induce_l(x: SubSeq[int], sa: MSubSeq[int],
@@ -90,11 +125,12 @@ def induce_l(x: SubSeq[int], sa: MSubSeq[int],
         -> None:
     """Induce L suffixes from the LMS strings."""
     next_front = buckets.calc_fronts()
+    bits = is_s.bytes  # test bits directly in the hot loop
     for i in range(len(x)):
         j = sa[i] - 1
         if sa[i] == 0 or sa[i] == UNDEFINED:
             continue
-        if is_s[j]:
+        if bits[j >> 3] >> (j & 7) & 1:
             continue
         sa[next_front(x[j])] = j
 
@@ -104,24 +140,26 @@ def induce_s(x: SubSeq[int], sa: MSubSeq[int],
         -> None:
     """Induce S suffixes from the L suffixes."""
     next_end = buckets.calc_ends()
+    bits = is_s.bytes  # test bits directly in the hot loop
     for i in reversed(range(len(x))):
         j = sa[i] - 1
         if sa[i] == 0:
             continue  # noqa: 701
-        if not is_s[j]:
+        if not bits[j >> 3] >> (j & 7) & 1:
             continue  # noqa: 701
         sa[next_end(x[j])] = j
 
 
-def equal_lms(x: SubSeq[int], is_s: BitVector, i: int, j: int) -> bool:
+def equal_lms(x: typing.Sequence[int], lms: BitVector,
+              i: int, j: int) -> bool:
     """Test if two LMS strings are identical."""
     if i == j:
         # This happens as a special case in the beginning of placing them.
         return True
 
     for k in itertools.count():  # k goes from 0 to infinity
-        i_lms = is_lms(is_s, i + k)
-        j_lms = is_lms(is_s, j + k)
+        i_lms = lms[i + k]
+        j_lms = lms[j + k]
         if k > 0 and i_lms and j_lms:
             return True
         if i_lms != j_lms or x[i + k] != x[j + k]:
@@ -150,12 +188,12 @@ def compact_seq(x: MSubSeq[T],
     return k
 
 
-def reduce_lms(x: SubSeq[int], sa: MSubSeq[int], is_s: BitVector) \
+def reduce_lms(x: SubSeq[int], sa: MSubSeq[int], lms: BitVector) \
         -> tuple[MSubSeq[int], MSubSeq[int], int]:
     """Construct reduced string from LMS strings."""
     # Compact all the LMS indices in the first
     # part of the suffix array...
-    k = compact_seq(sa, lambda j: is_lms(is_s, j))
+    k = compact_seq(sa, lambda j: lms[j])
 
     # Create the alphabet and write the translation
     # into the buffer in the right order
@@ -163,7 +201,7 @@ def reduce_lms(x: SubSeq[int], sa: MSubSeq[int], is_s: BitVector) \
     buffer[:] = UNDEFINED
     prev, letter = compact[0], 0
     for j in compact:
-        if not equal_lms(x, is_s, prev, j):
+        if not equal_lms(x, lms, prev, j):
             letter += 1
         buffer[j // 2] = letter
         prev = j
@@ -177,12 +215,12 @@ def reduce_lms(x: SubSeq[int], sa: MSubSeq[int], is_s: BitVector) \
 def reverse_reduction(x: SubSeq[int], sa: MSubSeq[int],
                       offsets: MSubSeq[int], red_sa: MSubSeq[int],
                       buckets: Buckets,
-                      is_s: BitVector) -> None:
+                      lms: BitVector) -> None:
     """Get the LMS string order back from the reduced suffix array."""
     # Work out where the LMS strings are in the
     # original string. Compact those indices
     # into the buffer offsets
-    compact_seq(offsets, lambda i: is_lms(is_s, i), range(len(x)))
+    compact_seq(offsets, lambda _: True, lms.ones())
 
     # Compact the original indices into sa
     for i, j in enumerate(red_sa):
@@ -209,13 +247,14 @@ def sais_rec(x: SubSeq[int],
 
     else:  # recursive case...
         classify_sl(is_s, x)
+        lms = lms_vector(is_s, len(x))
         buckets: Buckets = Buckets(x, asize)
 
-        bucket_lms(x, sa, buckets, is_s)
+        bucket_lms(x, sa, buckets, lms)
         induce_l(x, sa, buckets, is_s)
         induce_s(x, sa, buckets, is_s)
 
-        red, red_sa, red_asize = reduce_lms(x, sa, is_s)
+        red, red_sa, red_asize = reduce_lms(x, sa, lms)
 
         del buckets  # Save memory in the recursive call
         sais_rec(red, red_sa, red_asize, is_s)
@@ -223,7 +262,7 @@ def sais_rec(x: SubSeq[int],
         classify_sl(is_s, x)
         buckets = Buckets(x, asize)
 
-        reverse_reduction(x, sa, red, red_sa, buckets, is_s)
+        reverse_reduction(x, sa, red, red_sa, buckets, lms)
         induce_l(x, sa, buckets, is_s)
         induce_s(x, sa, buckets, is_s)
 
@@ -240,3 +279,260 @@ def sais(x: str) -> list[int]:
     """Run the sais algorithm from a string."""
     x_, alpha = Alphabet.mapped_subseq_with_sentinel(x)
     return sais_alphabet(x_, alpha)
+
+
+FILL_CHUNK = 1024
+
+
+class SaisWorkspace:
+    """
+    Working space for sais_lean, allocated once and reused.
+
+    The S/L classification is redone on each level in is_s, and each
+    level keeps its LMS bits, which it needs after the recursion, in
+    its own bytes of lms; with at most half as many LMS positions as
+    letters, the levels fit in n / 4 bytes plus a byte per level. The
+    bucket positions go in free space in the parent's suffix array if
+    there is room, and otherwise in buckets, which only grows if we
+    see an alphabet larger than any we have seen before.
+    """
+
+    sa: "array.array[int]"
+    is_s: BitVector
+    lms: BitVector
+    buckets: "array.array[int]"
+
+    def __init__(self, n: int, asize: int) -> None:
+        """Allocate space for a string of length n over asize letters."""
+        self.sa = array.array('q', [0]) * n
+        self.is_s = BitVector(n)
+        self.lms = BitVector(8 * (n // 4 + n.bit_length() + 1))
+        self.buckets = array.array('q', [0]) * asize
+
+    def bucket_space(self, asize: int, free: memoryview) -> memoryview:
+        """Get space for asize bucket positions, in free if it fits."""
+        if len(free) >= asize:
+            return free[:asize]
+        if len(self.buckets) < asize:
+            self.buckets = array.array('q', [0]) * asize
+        return memoryview(self.buckets)[:asize]
+
+
+def fill(view: memoryview, value: int) -> None:
+    """Set all the values in a view of a 64-bit array to value."""
+    chunk = memoryview(array.array('q', [value]) * min(len(view), FILL_CHUNK))
+    for i in range(0, len(view), FILL_CHUNK):
+        k = min(FILL_CHUNK, len(view) - i)
+        view[i:i + k] = chunk[:k]
+
+
+def count_letters(x: typing.Sequence[int], pos: memoryview) -> None:
+    """Count the occurrences of each letter in x into pos."""
+    fill(pos, 0)
+    for a in x:
+        pos[a] += 1
+
+
+def bucket_fronts(x: typing.Sequence[int], pos: memoryview) -> None:
+    """Set pos to the front of each bucket."""
+    count_letters(x, pos)
+    total = 0
+    for a, count in enumerate(pos):
+        pos[a] = total
+        total += count
+
+
+def bucket_ends(x: typing.Sequence[int], pos: memoryview) -> None:
+    """Set pos to one past the end of each bucket."""
+    count_letters(x, pos)
+    total = 0
+    for a, count in enumerate(pos):
+        total += count
+        pos[a] = total
+
+
+def lean_classify(x: typing.Sequence[int], is_s: bytearray) -> None:
+    """Classify the positions in x into S or L, bit by bit in is_s."""
+    last = len(x) - 1
+    is_s[last >> 3] |= 1 << (last & 7)
+    s = True
+    for i in reversed(range(last)):
+        s = x[i] < x[i + 1] or (x[i] == x[i + 1] and s)
+        if s:
+            is_s[i >> 3] |= 1 << (i & 7)
+        else:
+            is_s[i >> 3] &= ~(1 << (i & 7))
+
+
+def lean_lms(is_s: bytearray, lms: memoryview, n: int) -> None:
+    """
+    Set the LMS bits for a string of length n, a byte at a time.
+
+    The bits in is_s from n and on can be left from a longer string,
+    so we mask them out of the last byte.
+    """
+    carry = 1  # the first index is never LMS
+    for k in range((n + 7) // 8):
+        s = is_s[k]
+        lms[k] = s & ~(s << 1 | carry) & 0xff
+        carry = s >> 7
+    if n % 8:
+        lms[(n - 1) // 8] &= (1 << (n % 8)) - 1
+
+
+def lms_positions(lms: memoryview) -> typing.Iterator[int]:
+    """Iterate over the LMS positions, in increasing order."""
+    for k, byte in enumerate(lms):
+        while byte:
+            low = byte & -byte
+            yield 8 * k + low.bit_length() - 1
+            byte ^= low
+
+
+def lean_equal_lms(x: typing.Sequence[int], lms: memoryview,
+                   i: int, j: int) -> bool:
+    """Test if two LMS strings are identical (see equal_lms)."""
+    if i == j:
+        return True
+    for k in itertools.count():
+        i_lms = lms[(i + k) >> 3] >> ((i + k) & 7) & 1
+        j_lms = lms[(j + k) >> 3] >> ((j + k) & 7) & 1
+        if k > 0 and i_lms and j_lms:
+            return True
+        if i_lms != j_lms or x[i + k] != x[j + k]:
+            return False
+    assert False, "We only leave the loop with a return."  # pragma: no cover
+    return False  # just for the linter
+
+
+def lean_induce(x: typing.Sequence[int], sa: memoryview,
+                pos: memoryview, is_s: bytearray) -> None:
+    """Induce L suffixes and then S suffixes from the LMS suffixes."""
+    bucket_fronts(x, pos)
+    for i in range(len(x)):
+        j = sa[i] - 1
+        if j < 0 or is_s[j >> 3] >> (j & 7) & 1:
+            continue  # sentinel, undefined, or not L
+        a = x[j]
+        sa[pos[a]] = j
+        pos[a] += 1
+
+    bucket_ends(x, pos)
+    for i in reversed(range(len(x))):
+        j = sa[i] - 1
+        if j < 0 or not is_s[j >> 3] >> (j & 7) & 1:
+            continue  # sentinel or not S
+        a = x[j]
+        pos[a] -= 1
+        sa[pos[a]] = j
+
+
+def lean_rec(x: typing.Sequence[int], sa: memoryview, asize: int,
+             ws: SaisWorkspace, lms_offset: int, free: memoryview) -> None:
+    """
+    Recursive SAIS algorithm working in the workspace ws.
+
+    This level's LMS bits go in ws.lms from byte lms_offset, and free
+    is space the caller doesn't use while we run.
+    """
+    n = len(x)
+    if n == asize:
+        # base case...
+        for i, a in enumerate(x):
+            sa[a] = i
+        return
+
+    is_s = ws.is_s.bytes
+    lean_classify(x, is_s)
+    nbytes = (n + 7) // 8
+    lms = memoryview(ws.lms.bytes)[lms_offset:lms_offset + nbytes]
+    lean_lms(is_s, lms, n)
+
+    # Place the LMS suffixes at the end of their buckets and induce
+    pos = ws.bucket_space(asize, free)
+    fill(sa, UNDEFINED)
+    bucket_ends(x, pos)
+    for i in lms_positions(lms):
+        a = x[i]
+        pos[a] -= 1
+        sa[pos[a]] = i
+    lean_induce(x, sa, pos, is_s)
+
+    # Compact the LMS suffixes, now sorted by their LMS strings, into
+    # the front of sa, name them in the rest of sa, and compact the
+    # names into the reduced string after the LMS suffixes.
+    k = 0
+    for i in range(n):
+        j = sa[i]
+        if lms[j >> 3] >> (j & 7) & 1:
+            sa[k] = j
+            k += 1
+    buffer = sa[k:]
+    fill(buffer, UNDEFINED)
+    prev, letter = sa[0], 0
+    for i in range(k):
+        j = sa[i]
+        if not lean_equal_lms(x, lms, prev, j):
+            letter += 1
+        buffer[j // 2] = letter
+        prev = j
+    m = 0
+    for i in range(len(buffer)):
+        if buffer[i] != UNDEFINED:
+            buffer[m] = buffer[i]
+            m += 1
+
+    # The buckets are recomputed after the recursion, so the space
+    # after the reduced string is free for the recursion to use.
+    red, red_sa = buffer[:k], sa[:k]
+    lean_rec(red, red_sa, letter + 1, ws, lms_offset + nbytes, sa[2 * k:])
+
+    # restore state...
+    lean_classify(x, is_s)
+    pos = ws.bucket_space(asize, free)
+
+    # Map the reduced suffixes back to LMS positions, using the
+    # space of the reduced string, and put them in their buckets.
+    for m, i in enumerate(lms_positions(lms)):
+        red[m] = i
+    for i in range(k):
+        sa[i] = red[sa[i]]
+    fill(sa[k:], UNDEFINED)
+    bucket_ends(x, pos)
+    for i in reversed(range(k)):
+        j, sa[i] = sa[i], UNDEFINED
+        a = x[j]
+        pos[a] -= 1
+        sa[pos[a]] = j
+    lean_induce(x, sa, pos, is_s)
+
+
+def sais_lean_alphabet(x: typing.Sequence[int],
+                       asize: int) -> "array.array[int]":
+    """
+    Run the memory-lean sais algorithm on a mapped string.
+
+    x must end with the sentinel, zero, and its letters must be
+    smaller than asize.
+    """
+    ws = SaisWorkspace(len(x), asize)
+    lean_rec(x, memoryview(ws.sa), asize, ws, 0, memoryview(ws.sa)[:0])
+    return ws.sa
+
+
+def sais_lean(x: str) -> "array.array[int]":
+    """Run the memory-lean sais algorithm from a string."""
+    x_, alpha = Alphabet.mapped_string_with_sentinel(x)
+    return sais_lean_alphabet(x_, len(alpha))
+
+
+def peak_memory(f: typing.Callable[..., T], *args: typing.Any) \
+        -> tuple[T, int]:
+    """Call f(*args) and get the result and the peak memory it used."""
+    tracemalloc.start()
+    try:
+        res = f(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return res, peak
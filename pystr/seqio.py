@@ -0,0 +1,237 @@
+"""
+Reading FASTA and FASTQ files and searching in them.
+
+The readers stream records from binary files, so we never hold more
+than one record in memory, and if we give them an alphabet they map
+the sequences in bulk with Alphabet.map_bytes.
+
+To search in a whole reference genome, we concatenate its records
+into one mapped string with a separator letter between them, build
+the search tables over that, and translate the hits back to
+(record, position in record). Hits that span a separator are not real
+hits, so the batch searchers filter them out.
+"""
+
+from __future__ import annotations
+
+import bisect
+import typing
+
+from .alphabet import Alphabet
+from .approx import Edit, cigar_to_edits
+from .bwt import (approx_searcher_from_tables, exact_searcher_from_tables,
+                  preprocess_approx_mapped, preprocess_exact_mapped)
+
+# The letter we put between records when we concatenate them.
+SEPARATOR = "\x01"
+
+# A record from a FASTA or FASTQ file. The FASTA records have no
+# qualities. The sequence is the raw bytes from the file, or the
+# mapped sequence if we read with an alphabet.
+Record = typing.NamedTuple(  # noqa: C0103 (type alias)
+    "Record",
+    [("name", str), ("seq", bytes | bytearray),
+     ("qual", typing.Optional[bytes])]
+)
+
+# (read name, reference record name, position in record)
+ExactHit = tuple[str, str, int]
+# (read name, reference record name, position in record, cigar)
+ApproxHit = tuple[str, str, int, str]
+
+BatchExactFunc = typing.Callable[
+    [typing.Iterable[Record]],
+    typing.Iterator[ExactHit]
+]
+BatchApproxFunc = typing.Callable[
+    [typing.Iterable[Record], int],
+    typing.Iterator[ApproxHit]
+]
+
+
+def record_name(header: bytes) -> str:
+    """Get the name from a header line; the first word after > or @."""
+    words = header[1:].split()
+    return words[0].decode() if words else ""
+
+
+def make_record(name: str, seq: bytes | bytearray,
+                qual: typing.Optional[bytes],
+                alpha: typing.Optional[Alphabet]) -> Record:
+    """Make a record, mapping the sequence if we have an alphabet."""
+    if alpha is not None:
+        return Record(name, alpha.map_bytes(seq), qual)
+    return Record(name, bytes(seq), qual)
+
+
+def read_fasta(f: typing.BinaryIO,
+               alpha: typing.Optional[Alphabet] = None) \
+        -> typing.Iterator[Record]:
+    """
+    Read the records in a FASTA file.
+
+    The file must be opened in binary mode. If alpha is given, the
+    sequences are mapped to it, and we raise a KeyError if a sequence
+    has letters that are not in alpha.
+    """
+    name: typing.Optional[str] = None
+    seq = bytearray()
+    for line in f:
+        line = line.strip()
+        if line.startswith(b">"):
+            if name is not None:
+                yield make_record(name, seq, None, alpha)
+            name, seq = record_name(line), bytearray()
+        elif line:
+            if name is None:
+                raise ValueError("FASTA sequence before the first header")
+            seq.extend(line)
+    if name is not None:
+        yield make_record(name, seq, None, alpha)
+
+
+def read_fastq(f: typing.BinaryIO,
+               alpha: typing.Optional[Alphabet] = None) \
+        -> typing.Iterator[Record]:
+    """
+    Read the records in a FASTQ file.
+
+    The file must be opened in binary mode, and each record must have
+    its sequence and qualities on a single line. If alpha is given,
+    the sequences are mapped to it.
+    """
+    lines = (line.strip() for line in f)
+    for header in lines:
+        if not header:
+            continue  # allow blank lines between records
+        seq, plus, qual = next(lines, None), next(lines, None), \
+            next(lines, None)
+        if not header.startswith(b"@") or seq is None or \
+                plus is None or not plus.startswith(b"+") or \
+                qual is None or len(qual) != len(seq):
+            raise ValueError(f"Malformed FASTQ record: {header!r}")
+        yield make_record(record_name(header), seq, qual, alpha)
+
+
+def sequence_alphabet(letters: str) -> Alphabet:
+    """Make an alphabet for sequences over letters we can concatenate."""
+    return Alphabet(letters + SEPARATOR)
+
+
+class Concatenation:
+    """
+    Records concatenated into a single mapped string.
+
+    The records are separated by the SEPARATOR letter, so the alphabet
+    must contain it (see sequence_alphabet).
+    """
+
+    alpha: Alphabet
+    text: bytearray
+    names: list[str]
+    starts: list[int]
+    ends: list[int]
+
+    def __init__(self, records: typing.Iterable[Record],
+                 alpha: Alphabet) -> None:
+        """
+        Concatenate records, already mapped to alpha.
+
+        Read the records with read_fasta(f, alpha) to get them mapped.
+        """
+        sep = alpha.map(SEPARATOR)
+        self.alpha = alpha
+        self.text = bytearray()
+        self.names, self.starts, self.ends = [], [], []
+        for rec in records:
+            if self.names:
+                self.text.extend(sep)
+            self.names.append(rec.name)
+            self.starts.append(len(self.text))
+            self.text.extend(rec.seq)
+            self.ends.append(len(self.text))
+
+    def __len__(self) -> int:
+        """Get the number of records."""
+        return len(self.names)
+
+    def locate(self, pos: int) -> tuple[int, int]:
+        """
+        Translate a position in the text to (record, position in record).
+
+        Raises a ValueError if the position is on a separator.
+        """
+        i = bisect.bisect_right(self.starts, pos) - 1
+        if i < 0 or pos >= self.ends[i]:
+            raise ValueError(f"Position {pos} is not in a record")
+        return i, pos - self.starts[i]
+
+    def within(self, pos: int, length: int) \
+            -> typing.Optional[tuple[int, int]]:
+        """
+        Translate a text interval to (record, position in record).
+
+        The interval is [pos, pos + length), and we get None if it
+        doesn't fit inside a single record.
+        """
+        i = bisect.bisect_right(self.starts, pos) - 1
+        if i < 0 or pos + length > self.ends[i]:
+            return None
+        return i, pos - self.starts[i]
+
+
+def text_length(cigar: str) -> int:
+    """Get the length of the text an alignment covers."""
+    return sum(op != Edit.INSERT for op in cigar_to_edits(cigar))
+
+
+def exact_batch_searcher(refs: Concatenation) -> BatchExactFunc:
+    """
+    Build a search function for batches of reads.
+
+    The tables are built once, and the search function takes any
+    number of reads, with unmapped sequences (read_fastq(f)), and
+    reports where they occur in the reference records. Empty reads
+    have no hits.
+    """
+    search = exact_searcher_from_tables(
+        *preprocess_exact_mapped(refs.text, refs.alpha)
+    )
+
+    def batch(reads: typing.Iterable[Record]) \
+            -> typing.Iterator[ExactHit]:
+        for read in reads:
+            if not read.seq:
+                continue  # an empty read matches everywhere; skip it
+            p = read.seq.decode('latin-1')
+            for pos in search(p):
+                hit = refs.within(pos, len(p))
+                if hit is not None:
+                    yield read.name, refs.names[hit[0]], hit[1]
+
+    return batch
+
+
+def approx_batch_searcher(refs: Concatenation) -> BatchApproxFunc:
+    """
+    Build an approximative search function for batches of reads.
+
+    Like exact_batch_searcher, but the search function also takes the
+    number of edits and reports the cigar for each hit.
+    """
+    search = approx_searcher_from_tables(
+        *preprocess_approx_mapped(refs.text, refs.alpha)
+    )
+
+    def batch(reads: typing.Iterable[Record], edits: int) \
+            -> typing.Iterator[ApproxHit]:
+        for read in reads:
+            if not read.seq:
+                continue  # the searcher can't handle empty patterns
+            p = read.seq.decode('latin-1')
+            for pos, cigar in search(p, edits):
+                hit = refs.within(pos, text_length(cigar))
+                if hit is not None:
+                    yield read.name, refs.names[hit[0]], hit[1], cigar
+
+    return batch
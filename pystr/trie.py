@@ -21,6 +21,10 @@ class TrieNode:
     children: dict[str, TrieNode] = \
         dataclasses.field(default_factory=dict)
 
+    # Number of labelled nodes in the sub-trie rooted here
+    # (including this node). Used to bound completion queries.
+    count: int = dataclasses.field(default=0, repr=False)
+
     # These are only needed for the Aho-Corasick algorithm, not for
     # basic use of a trie.
     parent: typing.Optional[TrieNode] = \
@@ -93,16 +97,80 @@ class Trie:
             if a not in n:
                 n[a] = TrieNode(parent=n)
             n = n[a]
+
+        if n.label is None:
+            # A new string, so all the nodes on the path
+            # up to the root get one more string below them.
+            v: typing.Optional[TrieNode] = n
+            while v is not None:
+                v.count += 1
+                v = v.parent
         n.label = label
 
+    def find_node(self, x: str) -> typing.Optional[TrieNode]:
+        """Get the node at the end of path x, or None if there isn't one."""
+        n = self.root
+        for a in x:
+            if a not in n:
+                return None
+            n = n[a]
+        return n
+
     def __contains__(self, x: str) -> bool:
         """Test if x is in the trie."""
+        n = self.find_node(x)
+        return n is not None and n.label is not None
+
+    def __len__(self) -> int:
+        """Get the number of strings in the trie."""
+        return self.root.count
+
+    def all_prefixes(self, x: str) -> typing.Iterator[tuple[int, int]]:
+        """
+        Iterate over all strings in the trie that are prefixes of x.
+
+        Reports (label, length) pairs, from the shortest to the longest
+        prefix.
+        """
         n = self.root
-        for a in x:
+        if n.label is not None:
+            yield n.label, 0
+        for i, a in enumerate(x):
             if a not in n:
-                return False
+                return
             n = n[a]
-        return n.label is not None
+            if n.label is not None:
+                yield n.label, i + 1
+
+    def longest_prefix(self, x: str) -> typing.Optional[tuple[int, int]]:
+        """
+        Find the longest string in the trie that is a prefix of x.
+
+        Returns the (label, length) pair for the string, or None if
+        no string in the trie is a prefix of x.
+        """
+        longest = None
+        for hit in self.all_prefixes(x):
+            longest = hit
+        return longest
+
+    def count_completions(self, prefix: str) -> int:
+        """Count the strings in the trie that start with prefix."""
+        n = self.find_node(prefix)
+        return 0 if n is None else n.count
+
+    def complete(self, prefix: str, k: int) -> list[tuple[int, str]]:
+        """
+        Get (at most) k strings from the trie that start with prefix.
+
+        The strings are reported as (label, string) pairs in
+        lexicographical order.
+        """
+        n = self.find_node(prefix)
+        res: list[tuple[int, str]] = []
+        if n is not None:
+            collect_completions(n, list(prefix), k, res)
+        return res
 
     def to_dot(self) -> str:
         """Create a dot representation of the trie."""
@@ -117,6 +185,31 @@ class Trie:
         return self.root == other.root
 
 
+def collect_completions(n: TrieNode, path: list[str], k: int,
+                        res: list[tuple[int, str]]) -> None:
+    """
+    Collect up to k labelled strings from the sub-trie at n into res.
+
+    The path is the path label of n, as a list of characters, and it
+    is restored before we return.
+    """
+    if k <= 0:
+        return
+    if n.label is not None:
+        res.append((n.label, ''.join(path)))
+        k -= 1
+    for a in sorted(n.children):
+        if k <= 0:
+            break  # We have all we need, so don't look at the rest
+        child = n[a]
+        path.append(a)
+        collect_completions(child, path, k, res)
+        path.pop()
+        # The child's count tells us how many strings we got from it,
+        # without having to look at res.
+        k -= min(k, child.count)
+
+
 def depth_first_trie(*strings: str) -> Trie:
     """Build a trie in a depth-first manner."""
     # This is all it takes to build the trie.
@@ -171,7 +264,7 @@ def breadth_first_trie(*strings: str) -> Trie:
     labelled = list(LS(i, SubSeq[str](x)) for i, x in enumerate(strings))
 
     root_lab, root_groups = group_strings(labelled)
-    root = TrieNode(label=root_lab)
+    root = TrieNode(label=root_lab, count=len(labelled))
 
     queue = collections.deque[tuple[TrieNode, dict[str, list[LS]]]]()
     queue.append((root, root_groups))
@@ -180,7 +273,8 @@ def breadth_first_trie(*strings: str) -> Trie:
         parent, groups = queue.popleft()
         for edge, group in groups.items():
             node_lab, node_groups = group_strings(group)
-            parent.children[edge] = TrieNode(label=node_lab, parent=parent)
+            parent.children[edge] = TrieNode(label=node_lab, parent=parent,
+                                             count=len(group))
             queue.append((parent[edge], node_groups))
             set_suffix_link(parent[edge], edge)
 
@@ -1,5 +1,7 @@
 """Test alphabet code."""
 
+import pytest
+
 from pystr.alphabet import Alphabet
 
 
@@ -19,6 +21,16 @@ def test_alphabet() -> None:
         assert alpha.revmap(subs) == x
 
 
+def test_map_bytes() -> None:
+    """Test mapping bytes in bulk."""
+    alpha = Alphabet("acgt")
+    for x in ["", "acgt", "gattaca", "tttt"]:
+        assert alpha.map_bytes(x.encode()) == alpha.map(x)
+        assert alpha.map_bytes(bytearray(x.encode())) == alpha.map(x)
+    with pytest.raises(KeyError):
+        alpha.map_bytes(b"acgn")
+
+
 if __name__ == '__main__':
     for name, f in list(globals().items()):
         if name.startswith("test_"):
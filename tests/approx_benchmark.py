@@ -0,0 +1,34 @@
+"""Benchmarking the iterative against the recursive approximate search."""
+
+import time
+from typing import Iterator
+
+from helpers import pick_random_patterns_len, random_string
+from pystr.bwt import (ApproxSearchFunc, approx_searcher_from_tables,
+                       preprocess_approx, rec_approx_searcher_from_tables)
+
+
+def consume(itr: Iterator[tuple[int, str]]) -> None:
+    """Read everything from an iterator."""
+    for _ in itr:
+        pass
+
+
+def time_search(search: ApproxSearchFunc,
+                patterns: list[str], edits: int) -> float:
+    """Measure the time it takes to search for all the patterns."""
+    now = time.perf_counter()
+    for p in patterns:
+        consume(search(p, edits))
+    return time.perf_counter() - now
+
+
+x = random_string(5000, alpha="acgt")
+tables = preprocess_approx(x)
+pats = list(pick_random_patterns_len(x, 20, 30))
+for k in [1, 2, 3]:
+    print(f"edits={k}:",
+          "recursive", time_search(
+              rec_approx_searcher_from_tables(*tables), pats, k),
+          "iterative", time_search(
+              approx_searcher_from_tables(*tables), pats, k))
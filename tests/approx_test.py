@@ -1,7 +1,9 @@
 """Testing approximative matching support code."""
 
-from pystr.approx import (Edit, cigar_to_edits, count_edits, edits_to_cigar,
-                          extract_alignment)
+from helpers import random_string
+from pystr.approx import (Edit, banded_align, banded_alignments,
+                          cigar_to_edits, count_edits, edits_to_cigar,
+                          extract_alignment, myers_distance, myers_scores)
 
 
 def test_cigar_mapping() -> None:
@@ -17,3 +19,50 @@ def test_extract_and_count() -> None:
     assert count_edits(
         extract_alignment('aacgt', 'agt', 1, '1M1D1M')
     ) == 1
+
+
+def edit_distances(x: str, p: str) -> list[int]:
+    """Best edit distance of p to substrings ending at each index of x."""
+    col = list(range(len(p) + 1))
+    res = []
+    for a in x:
+        new = [0]
+        for j, b in enumerate(p):
+            new.append(min(col[j] + (a != b), col[j + 1] + 1, new[j] + 1))
+        col = new
+        res.append(col[-1])
+    return res
+
+
+def test_myers() -> None:
+    """Test Myers' bit-vector algorithm against dynamic programming."""
+    assert myers_distance("aacgt", "agt") == 1
+    assert myers_distance("", "agt") == 3
+    for _ in range(50):
+        x = random_string(30, alpha="acgt")
+        p = random_string(8, alpha="acgt")
+        assert list(myers_scores(x, p)) == edit_distances(x, p)
+
+
+def test_banded_align() -> None:
+    """Test banded alignment."""
+    hit = banded_align('aacgt', 'agt', 2, 1)
+    assert hit is not None
+    pos, cigar, edits = hit
+    assert (pos, edits) == (1, 1)
+    assert count_edits(extract_alignment('aacgt', 'agt', pos, cigar)) == 1
+    assert banded_align('aaaaa', 'ccc', 1, 1) is None
+
+    for _ in range(50):
+        x = random_string(40, alpha="acgt")
+        p = random_string(10, alpha="acgt")
+        for diag in range(-2, 35, 4):
+            for pos, cigar, edits in banded_alignments(x, p, diag, 3):
+                assert abs(pos - diag) <= 3
+                assert edits <= 3
+                assert cigar_to_edits(cigar)[0] != Edit.DELETE
+                assert cigar_to_edits(cigar)[-1] != Edit.DELETE
+                align = extract_alignment(x, p, pos, cigar)
+                assert count_edits(align) == edits
+                # The best hit can never beat the best over all of x
+                assert edits >= myers_distance(x, p)
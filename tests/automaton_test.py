@@ -0,0 +1,62 @@
+"""Test flat Aho-Corasick automata."""
+
+import os
+import tempfile
+
+import pytest
+
+from helpers import fibonacci_string, pick_random_patterns, random_string
+from pystr.aho_corasick import aho_corasick
+from pystr.automaton import FlatAutomaton
+from pystr.trie import breadth_first_trie
+
+
+def check_against_trie(x: str, pats: list[str]) -> None:
+    """Check that the flat automaton finds what the trie version finds."""
+    expected = sorted(aho_corasick(x, *pats))
+    automaton = FlatAutomaton.from_patterns(*pats)
+    assert sorted(automaton.search(x)) == expected
+
+    automaton = FlatAutomaton.from_trie(breadth_first_trie(*pats))
+    assert sorted(automaton.search(x)) == expected
+
+
+def test_abc() -> None:
+    """Do basic tests."""
+    x = "abcabcab"
+    p = ["abc", "a", "b", ""]
+    check_against_trie(x, p)
+    automaton = FlatAutomaton.from_patterns(*p)
+    for label, i in automaton.search(x):
+        assert x[i:].startswith(p[label])
+
+
+def test_random() -> None:
+    """Compare with the trie-based Aho-Corasick on random data."""
+    for _ in range(10):
+        x = random_string(100, alpha="abcd")
+        check_against_trie(x, list(set(pick_random_patterns(x, 10))))
+    for n in range(10, 15):
+        x = fibonacci_string(n)
+        check_against_trie(x, list(set(pick_random_patterns(x, 10))))
+
+
+def test_dump_load() -> None:
+    """Test that we can write an automaton to disk and map it back in."""
+    x = random_string(200, alpha="acgt")
+    pats = list(set(pick_random_patterns(x, 20)))
+    automaton = FlatAutomaton.from_patterns(*pats)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "automaton.bin")
+        automaton.dump(path)
+        with FlatAutomaton.load(path) as loaded:
+            assert len(loaded) == len(automaton)
+            assert list(loaded.search(x)) == list(automaton.search(x))
+    automaton.close()
+
+
+def test_bad_magic() -> None:
+    """Test that we reject buffers that are not automata."""
+    with pytest.raises(ValueError):
+        FlatAutomaton(bytes(64))
@@ -0,0 +1,221 @@
+"""
+Benchmark suite for the matching algorithms.
+
+Run it as a script, for example
+
+    python benchmark.py --n 1000 10000 --m 10 50 --sigma 4 26 \
+        --repetitiveness 0 0.9 --repeats 5 --output bench.json
+
+For each combination of text length (n), pattern length (m), alphabet
+size (sigma) and repetitiveness in the grid, we generate a seeded
+random corpus, pick patterns from it, and time every engine on it. We
+time preprocessing of the text once and the searches for all the
+patterns --repeats times, with time.perf_counter, and write the
+timings as JSON so runs can be compared for regressions.
+"""
+
+import argparse
+import itertools
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Iterator
+
+from helpers import random_corpus
+from pystr import bidirectional, bwt, exact, multipattern
+from pystr.aho_corasick import aho_corasick
+from pystr.automaton import FlatAutomaton
+from pystr.suffixtree import mccreight_st_construction
+
+# Searching for a list of patterns, returning the number of hits
+Query = Callable[[list[str]], int]
+# Preprocessing a text, returning the query function
+Prepare = Callable[[str], Query]
+# (name, group, preprocessing)
+Engine = tuple[str, str, Prepare]
+
+Exact = Callable[[str, str], Iterator[int]]
+Multi = Callable[..., Iterator[tuple[int, int]]]
+
+
+def count(itr: Iterator[Any]) -> int:
+    """Read everything from an iterator and count it."""
+    return sum(1 for _ in itr)
+
+
+def bmh_b(x: str, p: str) -> Iterator[int]:
+    """Wrap bmh_b to exact interface."""
+    return exact.bmh_b(x.encode(), p.encode())
+
+
+def flat_automaton(x: str, *p: str) -> Iterator[tuple[int, int]]:
+    """Wrap the flat automaton to the multi-pattern interface."""
+    return FlatAutomaton.from_patterns(*p).search(x)
+
+
+def exact_engine(algo: Exact) -> Prepare:
+    """Benchmark a single-pattern algorithm, one pattern at a time."""
+    def prepare(x: str) -> Query:
+        return lambda pats: sum(count(algo(x, p)) for p in pats)
+    return prepare
+
+
+def multi_engine(algo: Multi) -> Prepare:
+    """Benchmark a multi-pattern algorithm, all patterns at once."""
+    def prepare(x: str) -> Query:
+        return lambda pats: count(algo(x, *pats))
+    return prepare
+
+
+def index_engine(build: Callable[[str], bwt.ExactSearchFunc]) -> Prepare:
+    """Benchmark an index, preprocessing the text first."""
+    def prepare(x: str) -> Query:
+        search = build(x)
+        return lambda pats: sum(count(search(p)) for p in pats)
+    return prepare
+
+
+def suffix_tree(x: str) -> bwt.ExactSearchFunc:
+    """Build a suffix tree and return its search function."""
+    return mccreight_st_construction(x).search
+
+
+def approx_engine(build: Callable[[str], bwt.ApproxSearchFunc],
+                  edits: int) -> Prepare:
+    """Benchmark an approximate index, preprocessing the text first."""
+    def prepare(x: str) -> Query:
+        search = build(x)
+        return lambda pats: sum(count(search(p, edits)) for p in pats)
+    return prepare
+
+
+def engines(edits: int) -> list[Engine]:
+    """Get all the engines we benchmark."""
+    exact_algos: list[Exact] = [
+        exact.naive, exact.border, exact.kmp,
+        exact.bmh, bmh_b, exact.bmh_alpha,
+        exact.bm, exact.bm_galil, exact.turbo_bm,
+        exact.two_way, exact.find_all,
+    ]
+    multi_algos: list[Multi] = [
+        aho_corasick, flat_automaton,
+        multipattern.rabin_karp, multipattern.wu_manber,
+    ]
+    approx_builders: list[Callable[[str], bwt.ApproxSearchFunc]] = [
+        bwt.approx_preprocess, bwt.approx_seed_preprocess,
+        bwt.approx_best_preprocess,
+        bidirectional.bidirectional_preprocess,
+    ]
+    return [
+        *((algo.__name__, "exact", exact_engine(algo))
+          for algo in exact_algos),
+        *((algo.__name__, "multi", multi_engine(algo))
+          for algo in multi_algos),
+        ("bwt", "index", index_engine(bwt.exact_preprocess)),
+        ("suffix_tree", "index", index_engine(suffix_tree)),
+        *((build.__name__, "approx", approx_engine(build, edits))
+          for build in approx_builders),
+    ]
+
+
+def pick_patterns(x: str, m: int, k: int, rng: random.Random) -> list[str]:
+    """Pick k distinct patterns of length m from x."""
+    pats = [x[i:i + m] for i in
+            (rng.randrange(0, len(x) - m + 1) for _ in range(k))]
+    return list(dict.fromkeys(pats))  # remove duplicates, keep order
+
+
+def run_engine(prepare: Prepare, x: str, pats: list[str],
+               repeats: int) -> dict[str, Any]:
+    """Time an engine on a text and a list of patterns."""
+    now = time.perf_counter()
+    query = prepare(x)
+    preprocess = time.perf_counter() - now
+
+    times, hits = [], 0
+    for _ in range(repeats):
+        now = time.perf_counter()
+        hits = query(pats)
+        times.append(time.perf_counter() - now)
+
+    return {
+        "preprocess": preprocess,
+        "times": times,
+        "min": min(times),
+        "median": statistics.median(times),
+        "hits": hits,
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    """Run the benchmarks on the parameter grid."""
+    selected = [
+        engine for engine in engines(args.edits)
+        if (not args.engines or engine[0] in args.engines) and
+        (not args.groups or engine[1] in args.groups)
+    ]
+
+    results = []
+    grid = itertools.product(args.n, args.m, args.sigma, args.repetitiveness)
+    for n, m, sigma, rep in grid:
+        if m > n:
+            continue
+        rng = random.Random(args.seed)
+        x = random_corpus(n, sigma, rep, rng)
+        pats = pick_patterns(x, m, args.patterns, rng)
+        for name, group, prepare in selected:
+            if group == "approx" and m <= args.edits:
+                continue  # Some approximate engines need longer patterns
+            print(f"n={n} m={m} sigma={sigma} rep={rep}: {name}",
+                  file=sys.stderr)
+            res = run_engine(prepare, x, pats, args.repeats)
+            results.append({
+                "engine": name, "group": group,
+                "n": n, "m": m, "sigma": sigma, "repetitiveness": rep,
+                **res
+            })
+
+    return {"parameters": vars(args), "results": results}
+
+
+def main() -> None:
+    """Parse the command line and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--n", type=int, nargs="+", default=[1000, 10000],
+                        help="text lengths")
+    parser.add_argument("--m", type=int, nargs="+", default=[10, 50],
+                        help="pattern lengths")
+    parser.add_argument("--sigma", type=int, nargs="+", default=[4, 26],
+                        help="alphabet sizes")
+    parser.add_argument("--repetitiveness", type=float, nargs="+",
+                        default=[0.0, 0.9],
+                        help="probability of copying earlier blocks")
+    parser.add_argument("--patterns", type=int, default=5,
+                        help="number of patterns per text")
+    parser.add_argument("--edits", type=int, default=1,
+                        help="edits for the approximate engines")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="number of times to repeat each search")
+    parser.add_argument("--seed", type=int, default=1,
+                        help="seed for the random corpus")
+    parser.add_argument("--engines", nargs="*",
+                        help="only run these engines")
+    parser.add_argument("--groups", nargs="*",
+                        choices=["exact", "multi", "index", "approx"],
+                        help="only run engines in these groups")
+    parser.add_argument("--output", help="write JSON here (default stdout)")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Test bidirectional BWT search."""
+
+from helpers import pick_random_patterns, random_string
+from pystr import approx, bwt
+from pystr.bidirectional import (BidirectionalIndex,
+                                 bidirectional_preprocess,
+                                 pigeonhole_schemes, search_schemes)
+
+
+def test_extend() -> None:
+    """Test that intervals extended both ways match backward search."""
+    for _ in range(10):
+        x = random_string(50, alpha="acgt")
+        tables = bwt.preprocess_approx(x)
+        alpha, sa, ctab, otab, rotab = tables
+        rsa = bwt.preprocess_exact(x[::-1])[1]
+        index = BidirectionalIndex(*tables)
+        for p in pick_random_patterns(x, 5):
+            p_ = alpha.map(p)
+            # Build the interval from the middle and out
+            mid = len(p_) // 2
+            iv = index.full()
+            for a in p_[mid:]:
+                iv = index.extend_right(iv, a)
+            for a in reversed(p_[:mid]):
+                iv = index.extend_left(iv, a)
+
+            left, right = bwt.backward_search(p_, len(sa), ctab, otab)
+            assert (iv.fwd, iv.fwd + iv.size) == (left, right)
+            rleft, rright = bwt.backward_search(p_[::-1], len(sa),
+                                                ctab, rotab)
+            assert (iv.rev, iv.rev + iv.size) == (rleft, rright)
+            assert sorted(index.locate(iv)) == \
+                sorted(len(x) - j - len(p) for j in rsa[rleft:rright])
+
+
+def test_schemes_cover_edits() -> None:
+    """Check that the schemes cover all distributions of edits."""
+    for edits in range(1, 5):
+        for schemes in [search_schemes(edits), pigeonhole_schemes(edits)]:
+            parts = len(schemes[0].order)
+            for dist in range((edits + 1) ** parts):
+                errs = [(dist // (edits + 1) ** i) % (edits + 1)
+                        for i in range(parts)]
+                if sum(errs) > edits:
+                    continue
+                assert any(
+                    all(s.lower[t] <=
+                        sum(errs[q] for q in s.order[:t + 1]) <=
+                        s.upper[t]
+                        for t in range(parts))
+                    for s in schemes
+                ), (edits, errs)
+
+
+def test_against_backtracking() -> None:
+    """Test that we get the same hits as the backtracking search."""
+    for _ in range(5):
+        x = random_string(60, alpha="acgt")
+        search = bwt.approx_preprocess(x)
+        bidir = bidirectional_preprocess(x)
+        for edits in [0, 1, 2, 3]:
+            for p in pick_random_patterns(x, 5):
+                p = p[:10]
+                hits = list(bidir(p, edits))
+                assert len(hits) == len(set(hits))
+                assert set(hits) == set(search(p, edits))
+                for pos, cigar in hits:
+                    align = approx.extract_alignment(x, p, pos, cigar)
+                    assert approx.count_edits(align) <= edits
@@ -4,7 +4,7 @@ import time
 from typing import Callable, Iterator
 
 from helpers import random_string
-from pystr.exact import bmh, bmh_alpha, bmh_b
+from pystr.exact import bm, bm_galil, bmh, bmh_alpha, bmh_b, turbo_bm
 
 Algo = Callable[[str, str], Iterator[int]]
 
@@ -35,3 +35,6 @@ def time_algo(algo: Algo, n: int, m: int, k: int) -> float:
 print("BMH:      ", time_algo(bmh, 50000, 200, 10))
 print("BMH-B:    ", time_algo(bmh_b_wrap, 50000, 200, 10))
 print("BMH-Alpha:", time_algo(bmh_alpha, 50000, 200, 10))
+print("BM:       ", time_algo(bm, 50000, 200, 10))
+print("BM-Galil: ", time_algo(bm_galil, 50000, 200, 10))
+print("Turbo-BM: ", time_algo(turbo_bm, 50000, 200, 10))
@@ -1,6 +1,10 @@
 """Test of bitvectors."""
 
-from pystr.bv import BitVector
+import random
+
+import pytest
+
+from pystr.bv import BitVector, RankDirectory
 
 
 def test_v() -> None:
@@ -24,3 +28,89 @@ def test_v() -> None:
     bvec[3] = False
     for i in range(4):
         assert not bvec[i]
+
+
+def test_from_bits() -> None:
+    """Test building bit vectors from iterables."""
+    for n in [0, 1, 7, 8, 9, 100]:
+        bits = [random.random() < 0.5 for _ in range(n)]
+        bvec = BitVector.from_bits(bits)
+        assert len(bvec) == n
+        assert list(bvec) == bits
+
+
+def test_rank_select() -> None:
+    """Test rank and select against a linear scan."""
+    for n in [0, 1, 63, 64, 65, 511, 512, 513, 2000]:
+        for density in [0.0, 0.1, 0.5, 0.9, 1.0]:
+            bits = [random.random() < density for _ in range(n)]
+            bvec = BitVector.from_bits(bits)
+            ones = [i for i, b in enumerate(bits) if b]
+            zeros = [i for i, b in enumerate(bits) if not b]
+            for i in range(n + 1):
+                assert bvec.rank1(i) == sum(bits[:i])
+                assert bvec.rank0(i) == i - sum(bits[:i])
+            for k, i in enumerate(ones):
+                assert bvec.select1(k) == i
+                assert bvec.rank1(bvec.select1(k)) == k
+            for k, i in enumerate(zeros):
+                assert bvec.select0(k) == i
+                assert bvec.rank0(bvec.select0(k)) == k
+            with pytest.raises(IndexError):
+                bvec.select1(len(ones))
+            with pytest.raises(IndexError):
+                bvec.select0(len(zeros))
+
+
+def test_rank_after_update() -> None:
+    """Test that rank sees the bits we set after building the directory."""
+    bvec = BitVector(100)
+    assert bvec.rank1(100) == 0
+    bvec[10] = True
+    bvec[70] = True
+    assert bvec.rank1(100) == 2
+    assert bvec.select1(1) == 70
+    bvec[10] = False
+    assert bvec.select1(0) == 70
+
+
+def test_directory_size() -> None:
+    """Test that the rank directory is small compared to the bits."""
+    for size in [0, 1, 63, 64, 1000, 100_000]:
+        bvec = BitVector.from_bits(random.random() < 0.5 for _ in range(size))
+        directory = RankDirectory(bvec.bytes)
+        # 16 bits per word and 64 per eight words, plus the extra word
+        assert directory.nbytes() <= 3 * size // 64 + 16
+        assert directory.rank1(size) == bvec.count()
+
+
+def test_masks() -> None:
+    """Test converting to and from byte masks."""
+    for n in [0, 1, 7, 8, 9, 100]:
+        bits = [random.random() < 0.5 for _ in range(n)]
+        mask = bytes(b * random.randint(1, 255) for b in bits)
+        bvec = BitVector.from_mask(mask)
+        assert list(bvec) == bits
+        assert bvec.to_mask() == bytes(bits)
+
+    bvec = BitVector.from_bits([True] * 10)
+    bvec.set_mask(b"\0\1\0")
+    assert list(bvec) == [False, True, False] + [True] * 7
+
+
+def test_bulk_operations() -> None:
+    """Test the word-parallel operations against bit-by-bit ones."""
+    for n in [0, 1, 9, 64, 100]:
+        xs = [random.random() < 0.5 for _ in range(n)]
+        ys = [random.random() < 0.5 for _ in range(n)]
+        x, y = BitVector.from_bits(xs), BitVector.from_bits(ys)
+        assert list(x & y) == [a and b for a, b in zip(xs, ys)]
+        assert list(x | y) == [a or b for a, b in zip(xs, ys)]
+        assert list(x ^ y) == [a != b for a, b in zip(xs, ys)]
+        assert list(~x) == [not a for a in xs]
+        for k in [0, 1, 5, n]:
+            assert list(x << k) == ([False] * k + xs)[:n]
+            assert list(x >> k) == (xs[k:] + [False] * k)[:n]
+        assert x.count() == sum(xs)
+        assert list(x.ones()) == [i for i, a in enumerate(xs) if a]
+        assert list(x.prefix(n // 2)) == xs[:n // 2]
@@ -1,6 +1,6 @@
 """Test bwt."""
 
-from helpers import check_matches
+from helpers import check_matches, pick_random_patterns_len, random_string
 from pystr import alphabet, approx, bwt, sais
 
 
@@ -23,6 +23,40 @@ def test_bw_transform_bytes() -> None:
     assert alpha.revmap(revb[:-1]) == x_
 
 
+def test_reverse_bwt_lf() -> None:
+    """Test reversing the bwt with the LF mapping."""
+    for x in ["a", "mississippi", random_string(500, "acgt"),
+              random_string(300, "abcdefghijklmnopqrstuvwxyz")]:
+        b, alpha, _ = bwt.burrows_wheeler_transform(x)
+        otab = bwt.OTable(b, len(alpha))
+        ctab = bwt.CTable(b, len(alpha))
+        lf = bwt.lf_array(b)
+        expected = [ctab[a] + (otab[a, i] if a else 0)
+                    for i, a in enumerate(b)]
+        assert list(lf) == expected
+        for block_size in [1, 7, 16, 1024]:
+            checkpoints = bwt.CheckpointLF(b, block_size)
+            assert [checkpoints[i] for i in range(len(b))] == expected
+
+        expected_x = alpha.map_with_sentinel(x)
+        assert bwt.reverse_burrows_wheeler_transform(b) == expected_x
+        assert bwt.reverse_burrows_wheeler_transform(b, bwt.OTable) \
+            == expected_x
+        for block_size in [1, 16]:
+            assert bwt.reverse_bwt_bounded(b, block_size) == expected_x
+
+
+def test_reverse_bwt_blocks() -> None:
+    """Test reversing independent blocks."""
+    blocks = [random_string(100, "acgt") for _ in range(4)]
+    transformed = [bwt.burrows_wheeler_transform(x) for x in blocks]
+    bwts = [b for b, _, _ in transformed]
+    for processes in [1, 2]:
+        reversed_blocks = bwt.reverse_bwt_blocks(bwts, processes)
+        assert [alpha.revmap(y[:-1]) for y, (_, alpha, _) in
+                zip(reversed_blocks, transformed)] == blocks
+
+
 def test_ctable() -> None:
     """Test C-table."""
     x, alpha = alphabet.Alphabet.mapped_string_with_sentinel("aabca")
@@ -84,3 +118,102 @@ def test_mississippi_aprox_edit() -> None:
             for pos, cigar in search(p, edits):
                 align = approx.extract_alignment(x, p, pos, cigar)
                 assert approx.count_edits(align) <= edits
+
+
+def test_seed_search() -> None:
+    """Test seed-and-extend search against the backtracking search."""
+    for _ in range(5):
+        x = random_string(100, alpha="acgt")
+        search = bwt.approx_preprocess(x)
+        seed_search = bwt.approx_seed_preprocess(x)
+        for edits in [0, 1, 2, 3]:
+            for p in pick_random_patterns_len(x, 5, 8):
+                if len(p) <= edits:
+                    continue
+                hits = list(seed_search(p, edits))
+                for pos, cigar in hits:
+                    align = approx.extract_alignment(x, p, pos, cigar)
+                    assert approx.count_edits(align) <= edits
+                assert [pos for pos, _ in hits] == \
+                    sorted({pos for pos, _ in search(p, edits)})
+
+
+def test_iterative_search() -> None:
+    """Test that the iterative search gives the same as the recursive."""
+    for _ in range(5):
+        x = random_string(100, alpha="acgt")
+        tables = bwt.preprocess_approx(x)
+        search = bwt.approx_searcher_from_tables(*tables)
+        rec_search = bwt.rec_approx_searcher_from_tables(*tables)
+        for edits in [0, 1, 2, 3]:
+            for p in pick_random_patterns_len(x, 5, 8):
+                assert list(search(p, edits)) == list(rec_search(p, edits))
+            assert list(search("acgx", edits)) == []
+
+
+def count_ops(x: str, p: str, pos: int, cigar: str) -> tuple[int, int]:
+    """Count the mismatches and indels in an alignment."""
+    x_, p_ = approx.extract_alignment(x, p, pos, cigar)
+    indels = sum(a == '-' or b == '-' for a, b in zip(x_, p_))
+    return approx.count_edits((x_, p_)) - indels, indels
+
+
+def test_hamming_search() -> None:
+    """Test mismatch-only search against brute force."""
+    for _ in range(5):
+        x = random_string(100, alpha="acgt")
+        search = bwt.approx_searcher_from_tables(
+            *bwt.preprocess_approx(x), model=approx.EditModel.HAMMING
+        )
+        for edits in [0, 1, 2, 3]:
+            for p in pick_random_patterns_len(x, 5, 8):
+                expected = [
+                    (i, f"{len(p)}M") for i in range(len(x) - len(p) + 1)
+                    if sum(a != b for a, b in zip(x[i:], p)) <= edits
+                ]
+                assert sorted(search(p, edits)) == expected
+
+
+def test_edit_caps() -> None:
+    """Test that capping mismatches and indels only removes hits."""
+    for _ in range(5):
+        x = random_string(100, alpha="acgt")
+        tables = bwt.preprocess_approx(x)
+        search = bwt.approx_searcher_from_tables(*tables)
+        for max_mismatches, max_indels in [(0, 2), (1, 1), (2, 0)]:
+            capped = bwt.approx_searcher_from_tables(
+                *tables,
+                max_mismatches=max_mismatches, max_indels=max_indels
+            )
+            for p in pick_random_patterns_len(x, 5, 8):
+                expected = []
+                for pos, cigar in search(p, 2):
+                    mismatches, indels = count_ops(x, p, pos, cigar)
+                    if mismatches <= max_mismatches and indels <= max_indels:
+                        expected.append((pos, cigar))
+                assert list(capped(p, 2)) == expected
+
+
+def test_best_hits() -> None:
+    """Test that we only get the best hits, once per position."""
+    for _ in range(5):
+        x = random_string(100, alpha="acgt")
+        search = bwt.approx_preprocess(x)
+        best = bwt.approx_best_preprocess(x)
+        for p in list(pick_random_patterns_len(x, 5, 8)) + ["acgtacgt"]:
+            hits = list(best(p, 3))
+            positions = [pos for pos, _ in hits]
+            assert len(positions) == len(set(positions))
+
+            costs = {
+                (pos, cigar): approx.count_edits(
+                    approx.extract_alignment(x, p, pos, cigar))
+                for pos, cigar in search(p, 3)
+            }
+            if not costs:
+                assert not hits
+                continue
+            min_cost = min(costs.values())
+            assert all(costs[hit] == min_cost for hit in hits)
+            assert set(positions) == \
+                {pos for (pos, _), cost in costs.items() if cost == min_cost}
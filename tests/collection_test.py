@@ -0,0 +1,79 @@
+"""Test the generalized suffix array and document collections."""
+
+import pytest
+
+from helpers import pick_random_patterns_len, random_string
+from pystr import approx
+from pystr.alphabet import Alphabet
+from pystr.collection import DocumentCollection, generalized_suffix_array
+from pystr.exact import naive
+from pystr.wavelet import WaveletMatrix
+
+
+def naive_hits(docs: list[str], p: str) -> list[tuple[int, int]]:
+    """Find p in all the documents with the naive algorithm."""
+    return sorted((i, j) for i, doc in enumerate(docs) for j in naive(doc, p))
+
+
+def test_suffix_array() -> None:
+    """Test that the generalized suffix array is sorted."""
+    docs = ["abab", "", "ba", "abab"]
+    alpha = Alphabet(''.join(docs))
+    x, sa = generalized_suffix_array(docs, alpha)
+    assert len(x) == len(sa) == sum(map(len, docs)) + len(docs) + 1
+    suffixes = [x[j:] for j in sa]
+    assert suffixes == sorted(x[j:] for j in range(len(x)))
+
+
+def test_search() -> None:
+    """Test exact search and document listing."""
+    docs = [random_string(50, "acgt") for _ in range(10)] + ["", "acgt"]
+    for otable in [None, WaveletMatrix]:
+        coll = DocumentCollection(docs) if otable is None else \
+            DocumentCollection(docs, otable)
+        assert coll.locate(0) == (0, 0)
+        assert coll.locate(51) == (1, 0)
+        assert coll.document(len(coll.sa) - 1) == len(docs) - 1
+        pats = [*pick_random_patterns_len(''.join(docs), 20, 3), "acgt",
+                "x", docs[0][-2:] + docs[1][:2]]
+        for p in pats:
+            hits = naive_hits(docs, p)
+            assert sorted(coll.search(p)) == hits
+            assert coll.documents(p) == sorted({i for i, _ in hits})
+            assert coll.count_documents(p) == len({i for i, _ in hits})
+
+
+def test_approx_search() -> None:
+    """Test that approximative hits stay inside documents."""
+    docs = [random_string(40, "acgt") for _ in range(5)]
+    coll = DocumentCollection(docs)
+    for p in pick_random_patterns_len(''.join(docs), 10, 6):
+        hits = list(coll.approx_search(p, 1))
+        for doc, offset, cigar in hits:
+            x = docs[doc]
+            q, y = approx.extract_alignment(x, p, offset, cigar)
+            assert approx.count_edits((q, y)) <= 1
+        exact = {(doc, offset) for doc, offset, cigar in hits
+                 if cigar == f"{len(p)}M" and
+                 docs[doc][offset:offset + len(p)] == p}
+        assert exact == set(naive_hits(docs, p))
+
+
+def test_document() -> None:
+    """Test mapping positions to documents."""
+    coll = DocumentCollection(["ab", "", "c"])
+    assert coll.n_docs == 3
+    # ab#, #, c#, and the sentinel in the last document
+    assert [coll.document(i) for i in range(7)] == [0, 0, 0, 1, 2, 2, 2]
+    assert coll.locate(4) == (2, 0)
+    for pos in [-1, 7]:
+        with pytest.raises(IndexError):
+            coll.document(pos)
+
+    empty = DocumentCollection([])
+    assert empty.n_docs == 0
+    with pytest.raises(IndexError):
+        empty.document(0)
+    assert empty.documents("") == []
+    assert empty.documents("a") == []
+    assert not list(empty.search("a"))
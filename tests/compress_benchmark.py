@@ -0,0 +1,25 @@
+"""Benchmarking throughput and compression ratio of the compressor."""
+
+import bz2
+import random
+import time
+
+from helpers import random_corpus
+from pystr.compress import compress, decompress
+
+rng = random.Random(1)
+n = 400_000
+for sigma, rep in [(4, 0.0), (4, 0.9), (26, 0.0), (26, 0.99)]:
+    data = random_corpus(n, sigma, rep, rng).encode()
+    for processes in [1, None]:
+        now = time.perf_counter()
+        z = compress(data, processes=processes)
+        ctime = time.perf_counter() - now
+        now = time.perf_counter()
+        assert decompress(z, processes=processes) == data
+        dtime = time.perf_counter() - now
+        ratio, bz2_ratio = len(z) / n, len(bz2.compress(data)) / n
+        print(f"sigma={sigma:2} rep={rep:4} processes={processes}: "
+              f"ratio {ratio:.3f} (bz2 {bz2_ratio:.3f}), "
+              f"compress {n / ctime / 1e6:.2f} MB/s, "
+              f"decompress {n / dtime / 1e6:.2f} MB/s")
@@ -0,0 +1,73 @@
+"""Test the block-sorting compressor."""
+
+import io
+import random
+
+import pytest
+
+from helpers import random_corpus
+from pystr import compress
+
+
+def test_stages() -> None:
+    """Test that each stage can be reversed."""
+    rng = random.Random(1)
+    for data in [b"a", b"banana", bytes(100), bytes(range(256)),
+                 random_corpus(1000, 4, 0.9, rng).encode()]:
+        bwt, primary = compress.block_bwt(data)
+        assert sorted(bwt) == sorted(data)
+        assert compress.reverse_block_bwt(bwt, primary) == data
+
+        mtf = compress.move_to_front(bwt)
+        assert compress.reverse_move_to_front(mtf) == bwt
+
+        symbols = compress.run_length_encode(mtf)
+        assert symbols[-1] == compress.EOB
+        assert compress.run_length_decode(symbols) == mtf
+
+        lengths, coded = compress.huffman_encode(symbols)
+        decoded = list(compress.huffman_decode(lengths, coded))
+        assert decoded[:len(symbols)] == symbols
+
+
+def test_run_length() -> None:
+    """Test the bijective base two encoding of zero runs."""
+    runa, runb = compress.RUNA, compress.RUNB
+    for k, expected in [(1, [runa]), (2, [runb]), (3, [runa, runa]),
+                        (4, [runb, runa]), (5, [runa, runb])]:
+        assert compress.run_length_encode(bytes(k)) == \
+            expected + [compress.EOB]
+    assert compress.run_length_encode(b"\1\0\0\2") == \
+        [2, runb, 3, compress.EOB]
+
+
+def test_roundtrip() -> None:
+    """Test compressing and decompressing in one or more blocks."""
+    rng = random.Random(2)
+    for data in [b"", b"x", b"mississippi" * 50,
+                 random_corpus(3000, 26, 0.5, rng).encode(),
+                 bytes(rng.randrange(256) for _ in range(500))]:
+        for block_size in [7, 1000, compress.BLOCK_SIZE]:
+            z = compress.compress(data, block_size, processes=1)
+            assert compress.decompress(z, processes=1) == data
+
+    data = b"abracadabra" * 100
+    z = compress.compress(data, 100, processes=2)
+    assert compress.decompress(z, processes=2) == data
+    assert len(z) < len(data)
+
+
+def test_streams() -> None:
+    """Test the stream interface and corrupt streams."""
+    data = b"acgt" * 1000 + b"tgca" * 1000
+    dst = io.BytesIO()
+    compress.compress_stream(io.BytesIO(data), dst, 500, processes=1)
+    z = dst.getvalue()
+    out = io.BytesIO()
+    compress.decompress_stream(io.BytesIO(z), out, processes=1)
+    assert out.getvalue() == data
+
+    with pytest.raises(ValueError):
+        compress.decompress(b"not compressed", processes=1)
+    with pytest.raises(ValueError):
+        compress.decompress(z[:-10], processes=1)
@@ -0,0 +1,72 @@
+"""
+Benchmarking the parallel suffix array construction.
+
+Besides the wall time for different numbers of processes, we time
+the serial part (in the parent) and the parallel part (refining
+ranges and placing suffixes) of a build, for the bound Amdahl's law
+gives on the speedup.
+"""
+
+import os
+import random
+import time
+
+from helpers import random_corpus
+from pystr import doubling
+from pystr.alphabet import Alphabet
+from pystr.sais import sais
+
+
+def serial_fraction(x: str, nparts: int) -> float:
+    """Get the fraction of a one-process build that is serial."""
+    x_, _ = Alphabet.mapped_string_with_sentinel(x)
+    n = len(x_)
+    suffix_ranks = doubling.SuffixRanks(bytearray(8 * n), bytearray(8 * n),
+                                        bytearray(8 * n))
+    sa, ranks = suffix_ranks.sa, suffix_ranks.ranks
+    serial = parallel = 0.0
+    now = time.perf_counter()
+    doubling.initial_order(x_, sa, ranks[0])
+    h, parity = 1, 0
+    while True:
+        then = time.perf_counter()
+        bounds = doubling.range_boundaries(sa, ranks[parity], nparts)
+        now = time.perf_counter()
+        serial += now - then
+        pending = sum(map(suffix_ranks.refine_range, bounds[:-1],
+                          bounds[1:], [h] * nparts, [parity] * nparts))
+        then = time.perf_counter()
+        parallel += then - now
+        h, parity = 2 * h, 1 - parity
+        if pending == 0:
+            break
+    now = time.perf_counter()
+    suffix_ranks.place_range(0, n, parity)
+    then = time.perf_counter()
+    parallel += then - now
+    sa.tolist()
+    serial += time.perf_counter() - then
+    return serial / (serial + parallel)
+
+
+rng = random.Random(1)
+n = 200_000
+cpus = os.cpu_count() or 1
+print(f"{cpus} cpus")
+for sigma, rep in [(4, 0.0), (26, 0.9)]:
+    x = random_corpus(n, sigma, rep, rng)
+    now = time.perf_counter()
+    expected = sais(x)
+    print(f"sigma={sigma:2} rep={rep}: sais {time.perf_counter() - now:.2f}s")
+
+    f = serial_fraction(x, doubling.PARTS_PER_PROCESS * cpus)
+    print(f"  serial fraction {f:.2f}, so at most {1 / f:.1f}x faster")
+    base = 0.0
+    for processes in sorted({1, 2, 4, cpus}):
+        now = time.perf_counter()
+        assert doubling.parallel_suffix_array(x, processes) == expected
+        t = time.perf_counter() - now
+        base = base or t
+        print(f"  processes={processes}: {t:.2f}s, "
+              f"speedup {base / t:.2f}x (Amdahl bound "
+              f"{1 / (f + (1 - f) / processes):.2f}x)")
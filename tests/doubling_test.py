@@ -0,0 +1,45 @@
+"""Test of parallel prefix doubling."""
+
+from helpers import check_sorted, fibonacci_string, random_string
+from pystr.doubling import parallel_suffix_array, refined_ranks
+from pystr.sais import sais
+
+
+def test_refined_ranks() -> None:
+    """Test splitting groups by the ranks further on."""
+    # A group at 0 with keys 1, 1, 3 and a group at 3 with keys -1, 2
+    triples = [(0, 1, 5), (0, 1, 2), (0, 3, 0), (3, -1, 4), (3, 2, 1)]
+    assert list(refined_ranks(triples)) == [
+        (5, 0, True), (2, 0, True), (0, 2, False),
+        (4, 3, False), (1, 4, False)
+    ]
+    assert not list(refined_ranks([]))
+
+
+def test_serial() -> None:
+    """Test that we get the same suffix array as sais in one process."""
+    for x in ["", "a", "aaaa", "mississippi"]:
+        assert parallel_suffix_array(x, 1) == sais(x)
+    for _ in range(10):
+        x = random_string(500)
+        assert parallel_suffix_array(x, 1) == sais(x)
+    x = fibonacci_string(15)
+    sa = parallel_suffix_array(x, 1)
+    check_sorted(x, sa)
+    assert sa == sais(x)
+
+
+def test_parallel() -> None:
+    """Test that we get the same suffix array with a process pool."""
+    x = random_string(2000, "acgt")
+    assert parallel_suffix_array(x, 2) == sais(x)
+    x = fibonacci_string(12)
+    assert parallel_suffix_array(x, 3) == sais(x)
+
+
+if __name__ == '__main__':
+    globs = list(globals().items())
+    for name, f in globs:
+        if name.startswith("test_"):
+            print(name)
+            f()
@@ -1,15 +1,21 @@
 """Test exact matching algorithms."""
 
+import mmap
+import tempfile
 from typing import Callable, Iterator
 
 from helpers import (_Test, check_equal_matches, check_matches, collect_tests,
                      fibonacci_string, pick_random_patterns,
                      pick_random_patterns_len, pick_random_prefix,
                      pick_random_suffix, random_string)
+from pystr.alphabet import Alphabet
 from pystr.bwt import exact_preprocess
 from pystr.exact import bmh, bmh_alpha
 from pystr.exact import bmh_b as _bmh_b
-from pystr.exact import border, kmp, naive
+from pystr.exact import (TEXT_CACHE_SIZE, bm, bm_galil, border,
+                         compile_bmh, compile_bmh_alpha, compile_bmh_b,
+                         find_all, find_all_b, good_suffix_table, kmp,
+                         mapped_text, naive, search, turbo_bm, two_way)
 from pystr.suffixtree import mccreight_st_construction as mccreight
 
 Algo = Callable[[str, str], Iterator[int]]
@@ -29,6 +35,23 @@ def bmh_b(x: str, p: str) -> Iterator[int]:
     yield from _bmh_b(x_b, p_b)
 
 
+# wrapper
+def find_all_mapped(x: str, p: str) -> Iterator[int]:
+    """Search using find_all_b over alphabet-mapped buffers."""
+    x_, alpha = Alphabet.mapped_string(x)
+    try:
+        p_ = alpha.map(p)
+    except KeyError:
+        return
+    yield from find_all_b(x_, memoryview(p_))
+
+
+# wrapper
+def search_b(x: str, p: str) -> Iterator[int]:
+    """Search in bytes using the auto-dispatch search."""
+    yield from search(x.encode('ascii'), p.encode('ascii'))
+
+
 # wrapper
 def bwt_search(x: str, p: str) -> Iterator[int]:
     """Search using the bwt/fmindex algorithm."""
@@ -38,6 +61,8 @@ def bwt_search(x: str, p: str) -> Iterator[int]:
 ALGOS: list[Algo] = [
     naive, border, kmp,
     bmh, bmh_b, bmh_alpha,
+    bm, bm_galil, turbo_bm, two_way,
+    find_all, find_all_mapped, search, search_b,
     bwt_search,
     suffix_tree_exact,
 ]
@@ -116,3 +141,64 @@ TestAgainstNaive = collect_tests(
     (algo.__name__, check_against_naive(algo))
     for algo in ALGOS
 )
+
+
+def test_compiled_bmh() -> None:
+    """Test that compiled matchers can be reused and are cached."""
+    p = "aba"
+    assert compile_bmh(p) is compile_bmh(p)
+    assert compile_bmh_b(b"aba") is compile_bmh_b(bytearray(b"aba"))
+    assert compile_bmh_alpha(p) is compile_bmh_alpha(p)
+
+    matchers: list[Algo] = [
+        lambda x, p: compile_bmh(p)(x),
+        lambda x, p: compile_bmh_b(p.encode())(x.encode()),
+        lambda x, p: compile_bmh_alpha(p)(x),
+    ]
+    for _ in range(10):
+        x = random_string(50, alpha="ab")
+        for matcher in matchers:
+            # Search twice to use the cached tables the second time
+            check_equal_matches(x, p, naive, matcher)
+            check_equal_matches(x, p, naive, matcher)
+            check_equal_matches(x, "c", naive, matcher)
+
+
+def test_mapped_text_cache() -> None:
+    """Test that we only keep a few mapped texts, and can't modify them."""
+    x = "mississippi"
+    x_, alpha = mapped_text(x)
+    assert isinstance(x_, bytes)
+    assert x_ == alpha.map(x)
+    for i in range(2 * TEXT_CACHE_SIZE):
+        mapped_text(random_string(1000) + str(i))
+    assert mapped_text.cache_info().currsize <= TEXT_CACHE_SIZE
+
+
+def test_good_suffix_table() -> None:
+    """Test the good suffix table against the definition."""
+    for _ in range(50):
+        p = random_string(8, alpha="ab")
+        shift = good_suffix_table(p)
+        m = len(p)
+        for j in range(m + 1):
+            # The smallest s such that p[j:] matches where it lands
+            # and p[j-1] is a different character from the one that
+            # lands on the mismatch.
+            for s in range(1, m + 1):
+                if all(p[k - s] == p[k] for k in range(max(j, s), m)) and \
+                        (j == 0 or j - 1 < s or p[j - 1 - s] != p[j - 1]):
+                    break
+            assert shift[j] == s, (p, j)
+
+
+def test_find_all_mmap() -> None:
+    """Test that we can search directly in a memory mapped file."""
+    x = random_string(200, alpha="acgt")
+    with tempfile.TemporaryFile() as f:
+        f.write(x.encode('ascii'))
+        f.flush()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for p in pick_random_patterns_len(x, 10, 3):
+                assert list(find_all_b(mapped, p.encode('ascii'))) == \
+                    list(naive(x, p))
@@ -0,0 +1,108 @@
+"""Test of suffix arrays on disk."""
+
+import os
+import tempfile
+
+import pytest
+
+from helpers import fibonacci_string, random_string
+from pystr.exact import naive
+from pystr.external import (FAN_IN, KEY_BYTES,
+                            external_exact_preprocess,
+                            external_suffix_array, load_suffix_array,
+                            text_letters)
+from pystr.sais import sais
+
+
+def build(x: str, memory: int, fan_in: int = FAN_IN) -> list[int]:
+    """Build the suffix array on disk and read it back."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        text_path = os.path.join(tmpdir, "text")
+        sa_path = os.path.join(tmpdir, "sa")
+        with open(text_path, "wb") as f:
+            f.write(x.encode())
+        n = external_suffix_array(text_path, sa_path, memory, tmpdir,
+                                  fan_in)
+        assert n == len(x) + 1
+        assert os.path.getsize(sa_path) == 8 * n
+        sa = load_suffix_array(sa_path)
+        res = list(sa)
+        sa.release()
+        return res
+
+
+def test_repetitive() -> None:
+    """Test texts that take many rounds of doubling."""
+    for x in ["a" * 1000, "ab" * 500, "abc" * 100 + "abd" * 100]:
+        assert build(x, 1000) == sais(x)
+
+
+def test_external_suffix_array() -> None:
+    """Test that we get the same suffix array as sais."""
+    for x in ["", "a", "mississippi"]:
+        assert build(x, 1024) == sais(x)
+    for _ in range(10):
+        x = random_string(300, "acgt")
+        # a small budget gives many runs to merge
+        assert build(x, 1000) == sais(x)
+        assert build(x, 10**6) == sais(x)
+    x = fibonacci_string(15)
+    assert build(x, 2000) == sais(x)
+
+
+def test_multipass_merge() -> None:
+    """Test merging more runs than we can merge at once."""
+    x = random_string(1000, "acgt")
+    runs = (len(x) + 1) // (1000 // KEY_BYTES)  # about 166 runs
+    for fan_in in [2, 3, 64]:
+        assert runs > fan_in
+        assert build(x, 1000, fan_in) == sais(x)
+
+
+def test_external_search() -> None:
+    """Test that we can search with the suffix array file."""
+    x = random_string(500, "acgt")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        text_path = os.path.join(tmpdir, "text")
+        sa_path = os.path.join(tmpdir, "sa")
+        with open(text_path, "wb") as f:
+            f.write(x.encode())
+        external_suffix_array(text_path, sa_path, 2000)
+        search = external_exact_preprocess(text_path, sa_path)
+        for p in ["a", "acg", "tt", x[100:120], "n"]:
+            assert sorted(search(p)) == list(naive(x, p))
+
+
+def test_byte_alphabet() -> None:
+    """Test that we reject byte zero, and so all 256 bytes, up front."""
+    letters = bytes(range(1, 256))
+    assert text_letters(letters[::-1] * 2) == letters
+    with tempfile.TemporaryDirectory() as tmpdir:
+        text_path = os.path.join(tmpdir, "text")
+        sa_path = os.path.join(tmpdir, "sa")
+        for x in [b"acg\x00t", bytes(range(256))]:
+            with open(text_path, "wb") as f:
+                f.write(x)
+            with pytest.raises(ValueError):
+                external_suffix_array(text_path, sa_path)
+            with pytest.raises(ValueError):
+                external_exact_preprocess(text_path, sa_path)
+
+        # 255 letters is as many as we can handle
+        x = letters[::-1] + letters
+        with open(text_path, "wb") as f:
+            f.write(x)
+        external_suffix_array(text_path, sa_path)
+        search = external_exact_preprocess(text_path, sa_path)
+        for p in [b"\x01", b"\xff", b"\x02\x01\x01\x02", b"ab\xfe"]:
+            text = x.decode('latin-1')
+            pattern = p.decode('latin-1')
+            assert sorted(search(pattern)) == list(naive(text, pattern))
+
+
+if __name__ == '__main__':
+    globs = list(globals().items())
+    for name, f in globs:
+        if name.startswith("test_"):
+            print(name)
+            f()
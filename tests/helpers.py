@@ -31,6 +31,41 @@ def random_string(n: int, alpha: str = string.ascii_uppercase) -> str:
     return ''.join(random.choices(alpha, k=n))
 
 
+def alphabet_of_size(sigma: int) -> str:
+    """Get an alphabet with sigma letters."""
+    letters = string.ascii_letters + string.digits
+    assert sigma <= len(letters), "Alphabet too large"
+    return letters[:sigma]
+
+
+def random_corpus(n: int, sigma: int, repetitiveness: float,
+                  rng: random.Random) -> str:
+    """
+    Create a random string with some repetitiveness.
+
+    The string is built from blocks. With probability repetitiveness,
+    a block is a copy of an earlier part of the string with a few
+    mutations, otherwise it is random. With repetitiveness zero we get
+    a plain random string, and close to one a highly repetitive one.
+    Use a seeded random.Random to get the same corpus every time.
+    """
+    alpha = alphabet_of_size(sigma)
+    block, mutation_rate = 100, 0.01
+    res = rng.choices(alpha, k=min(n, block))
+    while len(res) < n:
+        k = min(block, n - len(res))
+        if rng.random() < repetitiveness:
+            i = rng.randrange(0, len(res) - k + 1)
+            copy = res[i:i + k]
+            for j in range(k):
+                if rng.random() < mutation_rate:
+                    copy[j] = rng.choice(alpha)
+            res.extend(copy)
+        else:
+            res.extend(rng.choices(alpha, k=k))
+    return ''.join(res)
+
+
 def fibonacci_string(n: int) -> str:
     """Fibonacci string n; has length Fib(n+2)."""
     a, b = "a", "ab"
@@ -0,0 +1,61 @@
+"""Test hash-based multi-pattern matching."""
+
+from typing import Callable, Iterator
+
+from helpers import (fibonacci_string, pick_random_patterns,
+                     pick_random_patterns_len, random_string)
+from pystr.aho_corasick import aho_corasick
+from pystr.exact import naive
+from pystr.multipattern import rabin_karp, wu_manber
+
+MultiAlgo = Callable[..., Iterator[tuple[int, int]]]
+ALGOS: list[MultiAlgo] = [rabin_karp, wu_manber]
+
+
+def naive_multi(x: str, pats: list[str]) -> list[tuple[int, int]]:
+    """Find all patterns with the naive algorithm."""
+    res: list[tuple[int, int]] = []
+    for i, p in enumerate(pats):
+        res.extend((i, j) for j in naive(x, p))
+    return sorted(res)
+
+
+def check_algo(algo: MultiAlgo, x: str, pats: list[str]) -> None:
+    """Check an algorithm against naive search."""
+    hits = list(algo(x, *pats))
+    positions = [i for _, i in hits]
+    assert positions == sorted(positions), "Hits should come in order"
+    assert sorted(hits) == naive_multi(x, pats)
+
+
+def test_abc() -> None:
+    """Do basic tests."""
+    x = "abcabcab"
+    pats = ["abc", "a", "b", "", "x", "abc"]
+    for algo in ALGOS:
+        check_algo(algo, x, pats)
+        check_algo(algo, x, [])
+        check_algo(algo, "", pats)
+
+
+def test_same_as_aho_corasick() -> None:
+    """Test that we can swap in the algorithms for Aho-Corasick."""
+    x = random_string(200, alpha="acgt")
+    pats = list(set(pick_random_patterns(x, 20)))
+    for algo in ALGOS:
+        assert sorted(algo(x, *pats)) == sorted(aho_corasick(x, *pats))
+
+
+def test_random() -> None:
+    """Compare with naive exact matching."""
+    for algo in ALGOS:
+        for _ in range(10):
+            x = random_string(100, alpha="acgt")
+            # k-mers, mixed lengths, and patterns that might not match
+            check_algo(algo, x, list(pick_random_patterns_len(x, 20, 4)))
+            check_algo(algo, x, list(pick_random_patterns(x, 10)))
+            check_algo(algo, x, [random_string(3, alpha="acgtx")
+                                 for _ in range(10)])
+        for n in range(10, 15):
+            x = fibonacci_string(n)
+            check_algo(algo, x, list(pick_random_patterns(x, 10)))
@@ -0,0 +1,53 @@
+"""Test the run-length bwt and the r-index."""
+
+import random
+
+from helpers import (fibonacci_string, pick_random_patterns,
+                     pick_random_patterns_len, random_corpus, random_string)
+from pystr import bwt
+from pystr.exact import naive
+from pystr.rindex import RIndex, RunLengthBWT, rindex_preprocess
+
+
+def test_rank() -> None:
+    """Test that the run-length bwt gives the same ranks as the O-table."""
+    for x in ["a", "mississippi", "aaaaaa", random_string(200, "ab")]:
+        b, alpha, _ = bwt.burrows_wheeler_transform(x)
+        otab = bwt.OTable(b, len(alpha))
+        rlbwt = RunLengthBWT(b, len(alpha))
+        assert len(rlbwt) == len(b)
+        assert rlbwt.runs() == 1 + sum(b[i] != b[i - 1]
+                                       for i in range(1, len(b)))
+        for i, a in enumerate(b):
+            assert rlbwt.access(i) == a
+        for a in range(1, len(alpha)):
+            for i in range(len(b) + 1):
+                assert otab[a, i] == rlbwt[a, i]
+
+
+def test_search() -> None:
+    """Test count and locate against naive search."""
+    rng = random.Random(2)
+    texts = [
+        "mississippi", random_string(100, "acgt"), fibonacci_string(10),
+        random_corpus(2000, 4, 0.95, rng),
+    ]
+    for x in texts:
+        index = RIndex(x)
+        search = rindex_preprocess(x)
+        pats = [*pick_random_patterns(x, 10),
+                *pick_random_patterns_len(x, 10, 3),
+                *pick_random_patterns_len(x, 10, 20), "x", "acgtx"]
+        for p in pats:
+            expected = list(naive(x, p))
+            assert index.count(p) == len(expected)
+            assert sorted(search(p)) == expected
+
+
+def test_repetitive() -> None:
+    """Test that a repetitive text gives few runs and samples."""
+    x = "acgtacggtt" * 100
+    index = RIndex(x)
+    assert index.rlbwt.runs() < 20
+    assert len(index.end_samples) == index.rlbwt.runs()
+    assert sorted(index.locate("acg")) == list(naive(x, "acg"))
@@ -3,7 +3,8 @@
 from helpers import check_sorted, fibonacci_string, random_string
 from pystr.alphabet import Alphabet
 from pystr.bv import BitVector
-from pystr.sais import classify_sl, is_lms, sais
+from pystr.sais import (classify_sl, is_lms, lms_vector, peak_memory, sais,
+                        sais_lean, sais_lean_alphabet)
 
 
 def test_remap() -> None:
@@ -72,6 +73,12 @@ def test_is_lms() -> None:
         assert is_s[len(y) - 1]
         assert is_lms(is_s, len(y) - 1)
 
+        lms = lms_vector(is_s, len(y))
+        assert list(lms) == [is_lms(is_s, i) for i in range(len(y))]
+        # is_s can be longer, as it is in the recursion
+        lms = lms_vector(is_s, 13)
+        assert list(lms) == [is_lms(is_s, i) for i in range(13)]
+
 
 def test_base_case() -> None:
     """Test that we can sort base cases."""
@@ -101,6 +108,38 @@ def test_sais_sorted() -> None:
         check_sorted(x, sa)
 
 
+def test_sais_lean() -> None:
+    """Test that the memory-lean sais gives the same suffix arrays."""
+    assert list(sais_lean("abc")) == [3, 0, 1, 2]
+    assert list(sais_lean("mississippi")) == sais("mississippi")
+    for _ in range(10):
+        x = random_string(1000)
+        assert list(sais_lean(x)) == sais(x)
+        x = random_string(1000, "ab")
+        assert list(sais_lean(x)) == sais(x)
+    for n in range(10, 15):
+        x = fibonacci_string(n)
+        assert list(sais_lean(x)) == sais(x)
+
+
+def test_peak_memory() -> None:
+    """Test that the lean sais uses little more than the suffix array."""
+    x = random_string(5_000)
+    sa, peak = peak_memory(sais, x)
+    lean_sa, lean_peak = peak_memory(sais_lean, x)
+    assert list(lean_sa) == sa
+    assert lean_peak < peak
+
+    # 8 bytes per suffix, 3 / 8 bytes of S/L and LMS bits per letter,
+    # and a constant for the chunks we fill the suffix array with.
+    for x in [random_string(20_000, "acgt"), "ab" * 10_000]:
+        y, alpha = Alphabet.mapped_string_with_sentinel(x)
+        n = len(y)
+        lean_sa, lean_peak = peak_memory(sais_lean_alphabet, y, len(alpha))
+        assert list(lean_sa) == sais(x)
+        assert 8 * n <= lean_peak <= 8 * n + n // 2 + 2**14
+
+
 if __name__ == '__main__':
     globs = list(globals().items())
     for name, f in globs:
@@ -0,0 +1,124 @@
+"""Test reading sequence files and searching in them."""
+
+import io
+
+import pytest
+
+from helpers import random_string
+from pystr import approx
+from pystr.exact import naive
+from pystr.seqio import (Concatenation, Record, approx_batch_searcher,
+                         exact_batch_searcher, read_fasta, read_fastq,
+                         sequence_alphabet)
+
+FASTA = b""">chr1 first chromosome
+ACGTAC
+GTT
+
+>chr2
+GGAC
+>empty
+>chr3
+ACGT
+"""
+
+FASTQ = b"""@read1 some comment
+ACG
++
+IIII
+@read2
+GTTG
++
+IIII
+
+@read3
+TTT
++
+III
+"""
+
+
+def test_read_fasta() -> None:
+    """Test reading FASTA records."""
+    recs = list(read_fasta(io.BytesIO(FASTA)))
+    assert [r.name for r in recs] == ["chr1", "chr2", "empty", "chr3"]
+    assert [r.seq for r in recs] == [b"ACGTACGTT", b"GGAC", b"", b"ACGT"]
+    assert all(r.qual is None for r in recs)
+
+    alpha = sequence_alphabet("ACGT")
+    mapped = list(read_fasta(io.BytesIO(FASTA), alpha))
+    assert [alpha.revmap(r.seq) for r in mapped] == \
+        [r.seq.decode() for r in recs]
+
+    with pytest.raises(KeyError):
+        list(read_fasta(io.BytesIO(b">x\nACGN\n"), alpha))
+    with pytest.raises(ValueError):
+        list(read_fasta(io.BytesIO(b"ACGT\n")))
+
+
+def test_read_fastq() -> None:
+    """Test reading FASTQ records."""
+    with pytest.raises(ValueError):
+        list(read_fastq(io.BytesIO(FASTQ)))  # read1 has too many qualities
+
+    fastq = FASTQ.replace(b"IIII\n@read2", b"III\n@read2")
+    recs = list(read_fastq(io.BytesIO(fastq)))
+    assert recs == [
+        Record("read1", b"ACG", b"III"),
+        Record("read2", b"GTTG", b"IIII"),
+        Record("read3", b"TTT", b"III"),
+    ]
+
+
+def test_concatenation() -> None:
+    """Test translating positions in concatenated records."""
+    alpha = sequence_alphabet("ACGT")
+    refs = Concatenation(read_fasta(io.BytesIO(FASTA), alpha), alpha)
+    assert len(refs) == 4
+    assert alpha.revmap(refs.text) == "ACGTACGTT\x01GGAC\x01\x01ACGT"
+    assert refs.locate(0) == (0, 0)
+    assert refs.locate(8) == (0, 8)
+    assert refs.locate(10) == (1, 0)
+    assert refs.locate(16) == (3, 0)
+    for pos in (9, 14, 15, 20):
+        with pytest.raises(ValueError):
+            refs.locate(pos)
+    assert refs.within(6, 3) == (0, 6)
+    assert refs.within(6, 4) is None
+    assert refs.within(10, 4) == (1, 0)
+
+
+def test_batch_search() -> None:
+    """Test searching for reads in references."""
+    alpha = sequence_alphabet("ACGT")
+    refs = [random_string(50, "ACGT") for _ in range(5)]
+    fasta = b"".join(f">ref{i}\n{ref}\n".encode()
+                     for i, ref in enumerate(refs))
+    concat = Concatenation(read_fasta(io.BytesIO(fasta), alpha), alpha)
+
+    # Reads that span two references, reads with unknown letters,
+    # and empty reads should not be found
+    reads = [refs[0][10:20], refs[3][-3:] + refs[4][:3], "ACNT",
+             refs[2][:5], "AC", ""]
+    fastq = b"".join(f"@read{i}\n{p}\n+\n{'I' * len(p)}\n".encode()
+                     for i, p in enumerate(reads))
+
+    exact = exact_batch_searcher(concat)
+    hits = sorted(exact(read_fastq(io.BytesIO(fastq))))
+    expected = sorted(
+        (f"read{i}", f"ref{j}", pos)
+        for i, p in enumerate(reads)
+        for j, ref in enumerate(refs)
+        for pos in naive(ref, p) if p
+    )
+    assert hits == expected
+
+    search = approx_batch_searcher(concat)
+    assert not any(name == "read5" for name, *_ in
+                   search(read_fastq(io.BytesIO(fastq)), 1))
+    for name, ref, pos, cigar in search(read_fastq(io.BytesIO(fastq)), 1):
+        p, x = reads[int(name[4:])], refs[int(ref[3:])]
+        assert approx.count_edits(
+            approx.extract_alignment(x, p, pos, cigar)) <= 1
+    assert {hit[:3] for hit in search(read_fastq(io.BytesIO(fastq)), 0)} \
+        == set(hits)
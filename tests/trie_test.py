@@ -168,6 +168,64 @@ def test_suffix_links_random_bf() -> None:
     check_suffix_links_random(breadth_first_trie)
 
 
+def check_queries(trie: Trie, strings: list[str]) -> None:
+    """Check prefix and completion queries against brute force."""
+    assert len(trie) == len(strings)
+    for x in strings + [x[:len(x) // 2] + "x" for x in strings]:
+        prefixes = [(i, len(y)) for i, y in enumerate(strings)
+                    if x.startswith(y)]
+        prefixes.sort(key=lambda hit: hit[1])
+        assert list(trie.all_prefixes(x)) == prefixes
+        longest = prefixes[-1] if prefixes else None
+        assert trie.longest_prefix(x) == longest
+
+    for x in strings:
+        for i in range(len(x) + 1):
+            prefix = x[:i]
+            completions = sorted(
+                (y, j) for j, y in enumerate(strings) if y.startswith(prefix)
+            )
+            assert trie.count_completions(prefix) == len(completions)
+            for k in [0, 1, 3, len(completions) + 1]:
+                expected = [(j, y) for y, j in completions[:k]]
+                assert trie.complete(prefix, k) == expected
+
+
+def test_prefix_queries() -> None:
+    """Test prefix and completion queries on simple tries."""
+    strings = ["foo", "bar", "foobar", "fo", "baz", ""]
+    trie = Trie()
+    for i, x in enumerate(strings):
+        trie.insert(x, i)
+    check_queries(trie, strings)
+    check_queries(breadth_first_trie(*strings), strings)
+
+    assert trie.longest_prefix("foobaz") == (0, 3)
+    assert list(trie.all_prefixes("foobaz")) == [(5, 0), (3, 2), (0, 3)]
+    assert trie.complete("ba", 1) == [(1, "bar")]
+    assert trie.complete("x", 5) == []
+    assert trie.longest_prefix("x") == (5, 0)
+    assert Trie().longest_prefix("x") is None
+
+
+def test_prefix_queries_random() -> None:
+    """Test prefix and completion queries on random tries."""
+    for _ in range(5):
+        x = random_string(30, alpha="abc")
+        strings = list({x[i:i + 5] for i in range(len(x))})
+        check_queries(depth_first_trie(*strings), strings)
+        check_queries(breadth_first_trie(*strings), strings)
+
+
+def test_reinsert_count() -> None:
+    """Test that inserting a string twice doesn't count it twice."""
+    trie = Trie()
+    trie.insert("foo", 0)
+    trie.insert("foo", 1)
+    assert len(trie) == 1
+    assert trie.complete("f", 2) == [(1, "foo")]
+
+
 if __name__ == '__main__':
     globs = list(globals().items())
     for name, f in globs:
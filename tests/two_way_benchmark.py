@@ -0,0 +1,36 @@
+"""Benchmarking two-way against KMP for long patterns."""
+
+import time
+from typing import Callable, Iterator
+
+from helpers import fibonacci_string, random_string
+from pystr.exact import kmp, two_way
+
+Algo = Callable[[str, str], Iterator[int]]
+
+
+def consume(itr: Iterator[int]) -> None:
+    """Read everything from an iterator."""
+    for _ in itr:
+        pass
+
+
+def time_algo(algo: Algo, x: str, p: str) -> float:
+    """Measure the time it takes to run an algorithm."""
+    now = time.perf_counter()
+    consume(algo(x, p))
+    return time.perf_counter() - now
+
+
+for m in [1000, 10000, 100000]:
+    # A pattern that occurs in the text, so we compare all of it
+    x = random_string(200000, alpha="acgt")
+    p = x[50000:50000 + m]
+    print(f"random, m={m:6}:   KMP", time_algo(kmp, x, p),
+          "two-way", time_algo(two_way, x, p))
+
+    # A highly periodic text and pattern
+    x = fibonacci_string(25)[:200000]
+    p = x[:m]
+    print(f"periodic, m={m:6}: KMP", time_algo(kmp, x, p),
+          "two-way", time_algo(two_way, x, p))
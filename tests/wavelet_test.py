@@ -0,0 +1,59 @@
+"""Test the wavelet matrix."""
+
+import random
+
+from helpers import pick_random_patterns_len, random_string
+from pystr import bwt
+from pystr.alphabet import Alphabet
+from pystr.wavelet import WaveletMatrix
+
+
+def test_rank() -> None:
+    """Test rank and access against a linear scan."""
+    for asize in [1, 2, 3, 4, 5, 20, 100, 256]:
+        x = bytearray(random.randrange(asize) for _ in range(300))
+        wm = WaveletMatrix(x, asize)
+        assert len(wm) == len(x)
+        for i, a in enumerate(x):
+            assert wm.access(i) == a
+        for a in range(asize):
+            for i in range(0, len(x) + 1, 7):
+                assert wm[a, i] == x[:i].count(a)
+
+
+def test_otable() -> None:
+    """Test that the wavelet matrix gives the same ranks as the O-table."""
+    for x in ["a", "mississippi", random_string(200)]:
+        b, alpha, _ = bwt.burrows_wheeler_transform(x)
+        otab = bwt.OTable(b, len(alpha))
+        wm = WaveletMatrix(b, len(alpha))
+        for a in range(1, len(alpha)):
+            for i in range(len(b) + 1):
+                assert otab[a, i] == wm[a, i]
+
+
+def test_reverse_bwt() -> None:
+    """Test reversing the bwt with a wavelet matrix."""
+    for x in ["mississippi", random_string(100)]:
+        b, alpha, _ = bwt.burrows_wheeler_transform(x)
+        y = bwt.reverse_burrows_wheeler_transform(b, WaveletMatrix)
+        assert y[:-1] == alpha.map(x)
+
+
+def test_search() -> None:
+    """Test exact and approximative search with a wavelet matrix."""
+    x = random_string(200, "acgtACGT")
+    exact = bwt.exact_preprocess(x)
+    exact_wm = bwt.exact_preprocess(x, WaveletMatrix)
+    approx = bwt.approx_preprocess(x)
+    approx_wm = bwt.approx_preprocess(x, WaveletMatrix)
+    for p in pick_random_patterns_len(x, 10, 5):
+        assert sorted(exact(p)) == sorted(exact_wm(p))
+        assert sorted(approx(p, 1)) == sorted(approx_wm(p, 1))
+
+    # The mapped preprocessing takes the rank table too
+    x_, alpha = Alphabet.mapped_string(x)
+    tables = bwt.preprocess_exact_mapped(x_, alpha, WaveletMatrix)
+    search = bwt.exact_searcher_from_tables(*tables)
+    for p in pick_random_patterns_len(x, 10, 5):
+        assert sorted(exact(p)) == sorted(search(p))